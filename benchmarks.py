@@ -0,0 +1,357 @@
+"""Micro-benchmarks for the SCAC game's hot paths.
+
+Run with: python benchmarks.py [--sizes 1000 10000] [--full] [--json results.json] [--startup]
+(the default sizes stop at 10k; --full adds the 100k catalog, which takes several minutes to import)
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import scac_game
+
+# (correct answer, user answer, accepted) - the answers the game has always accepted
+ANSWER_CASES = [
+    ('fedex freight', 'FedEx Freight', True),
+    ('fedex freight', 'fedexfreight', True),
+    ('fedex freight', 'fed', True),
+    ('fedex freight', 'fe', False),
+    ('t-force freight', 'tforce', True),
+    ('t-force freight', 'TForce Freight', True),
+    ('old dominion freight line inc', 'old dominion', True),
+    ('old dominion freight line inc', 'dominion', True),
+    ('old dominion freight line inc', 'the inc', False),
+    ('ups', 'u p s', True),
+    ('ups', 'usps', True),
+    ('xpo logistics, llc', 'xpo', True),
+    ('xpo logistics, llc', 'logistics', True),
+    ('j.b. hunt', 'jb hunt', True),
+    ('j.b. hunt', 'hunt', True),
+    ('estes express lines', 'estes expres lines', True),
+    ('estes express lines', 'express', True),
+    ('estes express lines', 'saia', False),
+    ('tl imports', 'tl', True),
+    ('tl imports', 'imports', True),
+    ('sp (small parcel)', 'small parcel', True),
+    ('ltl', 'tl', True),
+    ('ltl', 'l t l', True),
+    ('FXFE', 'fxfe', True),
+    ('FXFE', 'fxf', True),
+    ('FXFE', 'fxfx', False),
+    ('ODFL', 'odfl ', True),
+    ('ABCD', '', False),
+    ('r+l carriers', 'rl carriers', True),
+    ('averitt express', 'avertt exprss', True),
+]
+
+def _best_of(repeats, func):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def bench_answer_matching(rounds=2000, repeats=5):
+    """Time AnswerMatcher on ANSWER_CASES, precompiled vs compiled per answer"""
+    matchers = [(scac_game.AnswerMatcher(correct), user) for correct, user, _ in ANSWER_CASES]
+
+    def precompiled():
+        for _ in range(rounds):
+            for matcher, user in matchers:
+                matcher.matches(user)
+
+    def per_answer():
+        for _ in range(rounds):
+            for correct, user, _ in ANSWER_CASES:
+                scac_game.AnswerMatcher(correct).matches(user)
+
+    checks = rounds * len(ANSWER_CASES)
+    results = {
+        'precompiled': _best_of(repeats, precompiled),
+        'compiled per answer': _best_of(repeats, per_answer),
+    }
+    print(f"Answer matching ({len(ANSWER_CASES)} cases x {rounds} rounds)")
+    for name, seconds in results.items():
+        print(f"  {name:<22} {seconds * 1e6 / checks:8.2f} us/check")
+    return results
+
+# Synthetic catalogs: carrier families share a base name and differ by a
+# parenthetical or corporate suffix, like real SCAC lists do
+SHIP_MODES = ['LTL', 'TL', 'SP (Small Parcel)', 'IM (Intermodal)', 'TL Imports', 'Drayage', 'Air', 'Ocean']
+NAME_SYLLABLES = ['ab', 'ar', 'bel', 'bro', 'can', 'cor', 'dal', 'den', 'el', 'fal', 'gar', 'hal', 'is',
+                  'jen', 'kel', 'lan', 'mar', 'mon', 'nor', 'os', 'pat', 'quin', 'ros', 'sal', 'tor',
+                  'ul', 'van', 'wes', 'yor', 'zan']
+NAME_KINDS = ['Freight', 'Express', 'Logistics', 'Transport', 'Trucking', 'Lines', 'Carriers', 'Cartage',
+              'Distribution', 'Shipping', 'Haulers', 'Systems']
+FAMILY_SUFFIXES = [' (LTL)', ' (TL)', ' (Imports)', ' (Intermodal)', ' Inc', ' LLC', ' - West', ' - East']
+DETAIL_PHRASES = ['Regional coverage in the {}', 'Temperature controlled loads to the {}',
+                  'Hazmat certified for the {}', 'Dedicated fleet serving the {}', 'Cross-dock hub in the {}']
+REGIONS = ['Northeast', 'Southeast', 'Midwest', 'Southwest', 'Pacific Northwest', 'Mountain West',
+           'Gulf Coast', 'Great Lakes', 'Mid-Atlantic', 'New England']
+
+def _scac_code(number):
+    letters = []
+    for _ in range(4):
+        number, letter = divmod(number, 26)
+        letters.append(chr(ord('A') + letter))
+    return ''.join(letters)
+
+def synthetic_catalog(size, seed=0):
+    """Deterministic SCAC catalog of `size` rows, in the import column layout.
+
+    Most carriers belong to families of 2-4 related names with shared ship
+    modes, a third of rows have no details, and some details are shared
+    between carriers, which exercises every question type.
+    """
+    rng = random.Random(seed)
+    codes = [_scac_code(n) for n in rng.sample(range(26 ** 4), size)]
+    shared_details = [phrase.format(region) for phrase in DETAIL_PHRASES for region in REGIONS]
+    names, modes, details = [], [], []
+    seen = set()
+    while len(names) < size:
+        base = ''.join(rng.choice(NAME_SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        base = f"{base} {rng.choice(NAME_KINDS)}"
+        if base in seen:
+            continue
+        seen.add(base)
+        family_modes = rng.sample(SHIP_MODES, 3)
+        family_size = rng.choice([1, 1, 1, 2, 2, 3, 4])
+        variants = [base] + [base + suffix for suffix in rng.sample(FAMILY_SUFFIXES, family_size - 1)]
+        for name in variants[:size - len(names)]:
+            names.append(name)
+            modes.append(rng.choice(family_modes))
+            if rng.random() < 0.35:
+                details.append(None)
+            elif rng.random() < 0.3:
+                details.append(rng.choice(shared_details))
+            else:
+                details.append(rng.choice(DETAIL_PHRASES).format(rng.choice(REGIONS)) + f", route {len(names)}")
+    return pd.DataFrame({'scac_code': codes, 'carrier_name': names, 'ship_mode': modes, 'details': details})
+
+def synthetic_scores(games, players=None, seed=0):
+    """Deterministic score history of `games` rows spread over a year, in the import column layout"""
+    rng = random.Random(seed)
+    players = players or max(1, games // 20)
+    start = datetime(2025, 1, 1)
+    rows = []
+    for i in range(games):
+        total = rng.randint(5, 40)
+        correct = rng.randint(0, total)
+        played = start + timedelta(seconds=int(i * 365 * 86400 / games) + rng.randint(0, 3600))
+        rows.append((f"player{rng.randrange(players):05d}", correct * rng.randint(40, 100) - (total - correct) * 20,
+                     correct, total, played.isoformat()))
+    return pd.DataFrame(rows, columns=['Player', 'score', 'correct_answers', 'total_questions', 'timestamp'])
+
+# Scaling benchmarks
+SCALING_SIZES = (1_000, 10_000)
+FULL_SCALING_SIZES = SCALING_SIZES + (100_000,)
+
+def _measure(func):
+    """(seconds, peak KiB allocated) for one call; memory comes from a second, traced call"""
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak / 1024
+
+def _use_fresh_database(directory, name):
+    for suffix in ('', '-wal', '-shm'):
+        path = os.path.join(directory, name + suffix)
+        if os.path.exists(path):
+            os.remove(path)
+    scac_game.DB_PATH = os.path.join(directory, name)
+    scac_game.init_database()
+    scac_game.bump_catalog_version()
+
+def bench_scaling(sizes=SCALING_SIZES, seed=0, directory=None):
+    """Time and peak memory of the hot paths against synthetic catalogs of each size"""
+    directory = directory or tempfile.mkdtemp(prefix='scac-bench-')
+    results = []
+
+    def record(size, name, calls, func):
+        seconds, peak_kib = _measure(func)
+        results.append({'size': size, 'function': name, 'calls': calls,
+                        'ms_per_call': round(seconds * 1000 / calls, 4), 'peak_kib': round(peak_kib, 1)})
+        print(f"  {size:>7} {name:<28} {seconds * 1000 / calls:10.3f} ms/call {peak_kib:10.0f} KiB peak")
+
+    print("Scaling (size, function, time per call, peak traced memory)")
+    for size in sizes:
+        catalog = synthetic_catalog(size, seed)
+        scores = synthetic_scores(size, seed=seed)
+
+        def import_catalog():
+            _use_fresh_database(directory, f"catalog-{size}.db")
+            scac_game.import_scac_data(catalog)
+        record(size, 'import_scac_data', 1, import_catalog)
+
+        def build_bank():
+            scac_game.bump_catalog_version()
+            scac_game.get_question_bank()
+        record(size, 'QuestionBank build', 1, build_bank)
+        bank = scac_game.get_question_bank()
+        catalog_df = scac_game.get_all_scacs()
+
+        rng = random.Random(seed)
+        def play_questions(rounds=500):
+            used = []
+            for _ in range(rounds):
+                question = scac_game.generate_question(bank, used)
+                used = used[-50:] + [question['scac_id']]
+        record(size, 'generate_question', 500, play_questions)
+
+        samples = catalog['carrier_name'].sample(n=min(len(catalog), max(2, 20_000 // size)), random_state=seed)
+        def scan_similar():
+            for name in samples:
+                scac_game.get_similar_carriers(name, catalog_df)
+        record(size, 'get_similar_carriers (scan)', len(samples), scan_similar)
+        def indexed_similar():
+            for i in range(len(samples)):
+                bank.similar_carriers(rng.randrange(len(bank)))
+        record(size, 'similar_carriers (index)', len(samples), indexed_similar)
+
+        def submit_answers(rounds=500):
+            session = scac_game.GameSession(bank, 'bench', record_answers=False)
+            session.start()
+            for _ in range(rounds):
+                question = session.current_question
+                if question is None:
+                    session.start()
+                    question = session.current_question
+                answer = question.get('correct_answers') or question['correct_answer']
+                session.submit(answer if rng.random() < 0.7 else 'wrong answer')
+                session.next_question()
+        record(size, 'GameSession submit + next', 500, submit_answers)
+
+        def import_history():
+            _use_fresh_database(directory, f"scores-{size}.db")
+            scac_game.import_scores_data(scores)
+        record(size, 'import_scores_data', 1, import_history)
+
+        def read_leaderboard(rounds=20):
+            for _ in range(rounds):
+                scac_game.load_leaderboard_page()
+        record(size, 'leaderboard page (top)', 20, read_leaderboard)
+        players = sorted(scores['Player'].unique())
+        def page_through(pages=20):
+            # Walks down the board, starting over at the top after the last page
+            cursor = None
+            for _ in range(pages):
+                cursor = scac_game.load_leaderboard_page(cursor)['next']
+        record(size, 'leaderboard page (paging)', 20, page_through)
+        def search_leaderboard(rounds=20):
+            for _ in range(rounds):
+                scac_game.load_leaderboard_page(prefix=rng.choice(players)[:-2])
+        record(size, 'leaderboard page (prefix)', 20, search_leaderboard)
+        def rank_players(rounds=100):
+            for _ in range(rounds):
+                scac_game.get_player_rank(rng.choice(players))
+        record(size, 'get_player_rank', 100, rank_players)
+    return results
+
+# Startup benchmarks: a fresh interpreter importing the app and serving its
+# first question, and the cost of a rerun once the server is warm
+COLD_START_SCRIPT = """
+import json, logging, sys, time
+start = time.perf_counter()
+if sys.argv[1] == 'eager':
+    import pandas
+import scac_game
+logging.getLogger('streamlit').setLevel(logging.ERROR)
+imported = time.perf_counter()
+scac_game.init_database_once()
+scac_game.generate_question(scac_game.get_question_bank(), [])
+print(json.dumps({'import': imported - start, 'first_question': time.perf_counter() - start,
+                  'pandas_loaded': 'pandas' in sys.modules}))
+"""
+def _cold_start(db_path, mode):
+    env = dict(os.environ, SCAC_DB_PATH=db_path)
+    output = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT, mode], env=env, check=True,
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def bench_startup(size=1_000, runs=5, reruns=20, seed=0, directory=None):
+    """Cold-start time with pandas loaded eagerly vs lazily, and the cost of a warm rerun.
+
+    A rerun re-executes the module body (Streamlit keeps the compiled code)
+    and then main(); the page functions are timed directly in bare mode,
+    since AppTest's polling would dominate their timings.
+    """
+    directory = directory or tempfile.mkdtemp(prefix='scac-bench-')
+    _use_fresh_database(directory, 'startup.db')
+    scac_game.import_scac_data(synthetic_catalog(size, seed))
+    scac_game.import_scores_data(synthetic_scores(size, seed=seed))
+    results = {}
+
+    print(f"Startup ({size} SCACs, best of {runs} fresh interpreters)")
+    for mode in ('eager', 'lazy'):
+        samples = [_cold_start(scac_game.DB_PATH, mode) for _ in range(runs)]
+        best = min(samples, key=lambda sample: sample['first_question'])
+        results[f'cold start ({mode} pandas)'] = best
+        print(f"  {mode + ' pandas':<14} import {best['import'] * 1000:8.1f} ms   first question "
+              f"{best['first_question'] * 1000:8.1f} ms   pandas loaded: {best['pandas_loaded']}")
+
+    print(f"Rerun pieces (best of 3 x {reruns})")
+    with open(scac_game.__file__) as f:
+        module_code = compile(f.read(), scac_game.__file__, 'exec')
+    scac_game.initialize_game_state()
+    scac_game.st.session_state.admin_authenticated = True
+    pieces = [
+        ('module body', lambda: exec(module_code, {'__name__': 'rerun', '__file__': scac_game.__file__})),
+        ('init_database', scac_game.init_database),
+        ('init_database_once', scac_game.init_database_once),
+        ('play_game_page', scac_game.play_game_page),
+        ('leaderboard_page', scac_game.leaderboard_page),
+        ('admin_page', scac_game.admin_page),
+    ]
+    # Bare mode logs a missing-context warning per element, which would be timed too
+    logging.disable(logging.WARNING)
+    try:
+        for name, func in pieces:
+            seconds = _best_of(3, lambda: [func() for _ in range(reruns)]) / reruns
+            results[name] = seconds
+            print(f"  {name:<22} {seconds * 1000:8.3f} ms")
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SCAC game benchmarks")
+    parser.add_argument('--sizes', type=int, nargs='*', default=list(SCALING_SIZES),
+                        help="catalog sizes for the scaling benchmarks (none to skip them)")
+    parser.add_argument('--full', action='store_true',
+                        help=f"run the scaling benchmarks at {', '.join(f'{n:,}' for n in FULL_SCALING_SIZES)}")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write the scaling and startup results to this file")
+    parser.add_argument('--startup', action='store_true', help="also run the cold-start and rerun benchmarks")
+    args = parser.parse_args(argv)
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    sizes = sorted(set(args.sizes) | set(FULL_SCALING_SIZES)) if args.full else args.sizes
+    results = {}
+    bench_answer_matching()
+    if sizes:
+        results['scaling'] = bench_scaling(sizes, args.seed)
+    if args.startup:
+        results['startup'] = bench_startup(seed=args.seed)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
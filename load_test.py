@@ -0,0 +1,204 @@
+"""Concurrent-player load test for the SCAC game's SQLite backend.
+
+Simulates N players on threads - the same model as one Streamlit server -
+playing full games through GameSession, saving scores and reading the
+leaderboard, then reports throughput, latency percentiles, lock retries,
+write-behind queue counters and error rates as JSON.
+
+Run with: python load_test.py --players 20 --duration 30 --db /tmp/load.db
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import string
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+OPERATIONS = ['next_question', 'submit', 'finish', 'leaderboard']
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=10, help="concurrent simulated players")
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds to run")
+    parser.add_argument('--db', default='load_test.db', help="SQLite database to run against")
+    parser.add_argument('--scacs', type=int, default=500, help="synthetic SCACs to seed if the catalog is empty")
+    parser.add_argument('--questions', type=int, default=10, help="questions per game")
+    parser.add_argument('--accuracy', type=float, default=0.7, help="chance a simulated answer is correct")
+    parser.add_argument('--finish-rate', type=float, default=0.8, help="chance a game is finished and saved")
+    parser.add_argument('--leaderboard-rate', type=float, default=0.5, help="chance of a leaderboard read after a game")
+    parser.add_argument('--think-ms', type=float, default=50.0, help="maximum pause before each answer")
+    parser.add_argument('--seed', type=int, default=None, help="random seed")
+    parser.add_argument('--flush-timeout', type=float, default=60.0, help="seconds to wait for queued writes at the end")
+    parser.add_argument('--output', help="write the JSON report here as well as printing it")
+    return parser.parse_args(argv)
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+class Recorder:
+    """Thread-safe latency and error tally per operation"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {op: [] for op in OPERATIONS}
+        self.errors = {op: 0 for op in OPERATIONS}
+        self.error_samples = []
+
+    def timed(self, op, func, *args):
+        start = time.perf_counter()
+        failed = False
+        try:
+            result = func(*args)
+        except Exception as e:
+            result, failed = None, True
+            with self.lock:
+                if len(self.error_samples) < 20:
+                    self.error_samples.append(f"{op}: {e}")
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.latencies[op].append(elapsed)
+            if failed:
+                self.errors[op] += 1
+        return result
+
+    def summary(self, seconds):
+        operations = {}
+        for op in OPERATIONS:
+            values = sorted(self.latencies[op])
+            count = len(values)
+            operations[op] = {
+                'count': count,
+                'errors': self.errors[op],
+                'error_rate': self.errors[op] / count if count else 0.0,
+                'throughput_per_s': count / seconds if seconds else 0.0,
+                'p50_ms': _ms(percentile(values, 0.50)),
+                'p95_ms': _ms(percentile(values, 0.95)),
+                'p99_ms': _ms(percentile(values, 0.99)),
+                'max_ms': _ms(values[-1] if values else None),
+            }
+        return operations
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+def seed_catalog(game, count, rng):
+    """Fill an empty catalog with synthetic SCACs"""
+    import pandas as pd
+    modes = ['LTL', 'TL', 'SP (Small Parcel)', 'IM (Intermodal)', 'TL Imports']
+    codes = set()
+    while len(codes) < count:
+        codes.add(''.join(rng.choices(string.ascii_uppercase, k=4)))
+    rows = pd.DataFrame({
+        'scac_code': sorted(codes),
+        'carrier_name': [f"Load Test Carrier {i} {''.join(rng.choices(string.ascii_lowercase, k=6))}"
+                         for i in range(count)],
+        'ship_mode': [rng.choice(modes) for _ in range(count)],
+        'details': [rng.choice([None, 'Regional coverage', 'National coverage']) for _ in range(count)],
+    })
+    return game.import_scac_data(rows)
+
+def _answer(question, correct, rng):
+    if question['type'] == 'multi_select':
+        return list(question['correct_answers']) if correct else []
+    if question['type'] == 'multiple_choice':
+        wrong = [c for c in question['choices'] if c != question['correct_answer']]
+        return question['correct_answer'] if correct or not wrong else rng.choice(wrong)
+    return question['correct_answer'] if correct else 'no idea'
+
+def play(game, args, player_id, deadline, recorder, counters):
+    rng = random.Random(None if args.seed is None else args.seed + player_id)
+    player_name = f"load-{player_id:03d}"
+    while time.time() < deadline:
+        session = game.GameSession(game.get_question_bank(), player_name)
+        recorder.timed('next_question', session.start)
+        with counters['lock']:
+            counters['games_started'] += 1
+        for _ in range(args.questions):
+            if session.is_over or time.time() >= deadline:
+                break
+            time.sleep(rng.uniform(0, args.think_ms) / 1000)
+            correct = rng.random() < args.accuracy
+            recorder.timed('submit', session.submit, _answer(session.current_question, correct, rng))
+            recorder.timed('next_question', session.next_question)
+        if rng.random() < args.finish_rate:
+            recorder.timed('finish', session.finish)
+            with counters['lock']:
+                counters['games_finished'] += 1
+        if rng.random() < args.leaderboard_rate:
+            recorder.timed('leaderboard', read_leaderboard, game, player_name)
+
+def read_leaderboard(game, player_name):
+    """What the leaderboard page reads: the top page and the player's own rank"""
+    game.load_leaderboard_page()
+    game.get_player_rank(player_name)
+
+def run(args):
+    # The database path is read at import time
+    os.environ['SCAC_DB_PATH'] = args.db
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    import scac_game as game
+
+    game.init_database()
+    if len(game.get_question_bank()) == 0:
+        seed_catalog(game, args.scacs, random.Random(args.seed))
+
+    recorder = Recorder()
+    counters = {'lock': threading.Lock(), 'games_started': 0, 'games_finished': 0}
+    db_before = game.get_db_stats()
+    writes_before = game.get_write_queue_stats()
+    start = time.perf_counter()
+    deadline = time.time() + args.duration
+    with ThreadPoolExecutor(max_workers=args.players, thread_name_prefix='player') as pool:
+        futures = [pool.submit(play, game, args, i, deadline, recorder, counters) for i in range(args.players)]
+        for future in futures:
+            future.result()
+    seconds = time.perf_counter() - start
+    # Scores and answer events are written behind the players; wait for the backlog
+    backlog = game.get_write_queue_stats()['pending']
+    flush_start = time.perf_counter()
+    flushed = game.flush_writes(timeout=args.flush_timeout)
+    flush_seconds = time.perf_counter() - flush_start
+    db_after = game.get_db_stats()
+    writes_after = game.get_write_queue_stats()
+
+    return {
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'seconds': round(seconds, 3),
+        'games_started': counters['games_started'],
+        'games_finished': counters['games_finished'],
+        'operations': recorder.summary(seconds),
+        'db': {name: db_after.get(name, 0) - db_before.get(name, 0) for name in db_after},
+        'write_queue': {
+            'backlog_at_end': backlog,
+            'flush_seconds': round(flush_seconds, 3),
+            'flushed': flushed,
+            'last_error': writes_after['last_error'],
+            **{name: writes_after[name] - writes_before[name]
+               for name in ('queued', 'written', 'batches', 'failed_batches', 'dead_lettered')},
+        },
+        'error_samples': recorder.error_samples,
+    }
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    failed = (any(stats['errors'] for stats in report['operations'].values())
+              or report['write_queue']['failed_batches'] or report['write_queue']['dead_lettered']
+              or not report['write_queue']['flushed'])
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
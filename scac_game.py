@@ -1,9 +1,51 @@
 import streamlit as st
 import sqlite3
+import os
+import atexit
+import bisect
+import csv
+import difflib
+import functools
+import gzip
+import hashlib
+import heapq
+import importlib
+import io
+import itertools
+import json
+import logging
+import mmap
+import pathlib
+import queue
+import re
+import sys
+import tempfile
+import threading
 import time
 import random
-from datetime import datetime
-import pandas as pd
+from array import array
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+class _LazyModule:
+    """Stand-in for a module that is imported on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+# pandas takes longer to import than the rest of the app; the game page
+# never needs it, so it is only loaded by the pages that show tables
+pd = _LazyModule('pandas')
 
 # Page config
 st.set_page_config(
@@ -12,9 +54,398 @@ st.set_page_config(
     layout="wide"
 )
 
+# Database settings (overridable through the environment)
+DB_PATH = os.environ.get('SCAC_DB_PATH', 'scac_game.db')
+DB_BUSY_TIMEOUT = float(os.environ.get('SCAC_DB_BUSY_TIMEOUT', '5.0'))  # seconds sqlite waits on a lock
+DB_WRITE_RETRIES = int(os.environ.get('SCAC_DB_WRITE_RETRIES', '5'))
+DB_RETRY_BASE_DELAY = 0.05  # seconds, doubled after every locked attempt
+
+# Pragmas applied to every new connection
+DB_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=67108864",
+]
+
+@st.cache_resource
+def _db_state():
+    """Process-wide connection registry (survives Streamlit reruns)"""
+    return {
+        'local': threading.local(),
+        'lock': threading.Lock(),
+        'stats': {'connections_opened': 0, 'lock_waits': 0, 'lock_timeouts': 0},
+    }
+
+def _bump_db_stat(name, amount=1):
+    state = _db_state()
+    with state['lock']:
+        state['stats'][name] += amount
+
+def get_db_stats():
+    """Snapshot of the connection layer counters"""
+    state = _db_state()
+    with state['lock']:
+        return dict(state['stats'])
+
+# SQL tracing: every app connection records, per normalized statement, how
+# often it ran, its total and max time (execute plus fetching) and the rows
+# it returned or changed. Set SCAC_SQL_TRACE=0 to open plain connections.
+SQL_TRACE = os.environ.get('SCAC_SQL_TRACE', '1') != '0'
+SQL_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+SQL_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+
+@st.cache_resource
+def _sql_trace_state():
+    return {'lock': threading.Lock(), 'statements': {}, 'since': datetime.now().isoformat(timespec='seconds')}
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(sql):
+    """Statement text with literals replaced by ? and whitespace collapsed"""
+    sql = SQL_LITERAL_RE.sub('?', ' '.join(sql.split()))
+    return SQL_IN_LIST_RE.sub('IN (?)', sql)
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that charges its execute and fetch time and rows to the statement's stats"""
+
+    _stats = None
+    _elapsed = 0.0
+
+    def _record(self, sql, parameters, run):
+        start = time.perf_counter()
+        try:
+            return run()
+        finally:
+            elapsed = time.perf_counter() - start
+            trace = self.connection.trace_state
+            key = normalize_sql(sql)
+            with trace['lock']:
+                stats = trace['statements'].get(key)
+                if stats is None:
+                    stats = trace['statements'][key] = {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                                                        'rows': 0, 'rows_changed': 0, 'sql': sql,
+                                                        'parameters': None, 'plan': None}
+                stats['count'] += 1
+                stats['seconds'] += elapsed
+                stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+                stats['rows_changed'] += max(self.rowcount, 0)
+                if parameters is not None and len(parameters) < 50:
+                    # The latest concrete statement, kept for EXPLAIN QUERY PLAN
+                    stats['sql'], stats['parameters'] = sql, parameters
+            self._stats, self._elapsed = stats, elapsed
+
+    def execute(self, sql, parameters=()):
+        return self._record(sql, parameters, lambda: super(TracedCursor, self).execute(sql, parameters))
+
+    def executemany(self, sql, seq_of_parameters):
+        # Keep the first parameter set for EXPLAIN without consuming a generator
+        rows = iter(seq_of_parameters)
+        first = next(rows, None)
+        if first is not None:
+            rows = itertools.chain([first], rows)
+        return self._record(sql, first, lambda: super(TracedCursor, self).executemany(sql, rows))
+
+    def _fetched(self, start, rows):
+        stats = self._stats
+        if stats is not None:
+            elapsed = time.perf_counter() - start
+            self._elapsed += elapsed
+            with self.connection.trace_state['lock']:
+                stats['seconds'] += elapsed
+                stats['max_seconds'] = max(stats['max_seconds'], self._elapsed)
+                stats['rows'] += rows
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        row = super().__next__()
+        self._fetched(start, 1)
+        return row
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose cursors, including execute() shortcuts, are TracedCursors"""
+
+    trace_state = None
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def get_sql_stats():
+    """Per-statement stats, slowest total time first"""
+    trace = _sql_trace_state()
+    with trace['lock']:
+        rows = [{'statement': key, **{name: value for name, value in stats.items() if name != 'parameters'}}
+                for key, stats in trace['statements'].items()]
+    for row in rows:
+        row['mean_ms'] = round(row['seconds'] * 1000 / row['count'], 3)
+        row['total_ms'] = round(row.pop('seconds') * 1000, 3)
+        row['max_ms'] = round(row.pop('max_seconds') * 1000, 3)
+        row.pop('sql')
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+def reset_sql_stats():
+    trace = _sql_trace_state()
+    with trace['lock']:
+        trace['statements'].clear()
+        trace['since'] = datetime.now().isoformat(timespec='seconds')
+
+def explain_slowest_statements(limit=5):
+    """Capture EXPLAIN QUERY PLAN for the statements with the highest max time"""
+    trace = _sql_trace_state()
+    with trace['lock']:
+        candidates = sorted(trace['statements'].values(), key=lambda stats: stats['max_seconds'], reverse=True)
+    explained = 0
+    for stats in candidates:
+        if explained >= limit:
+            break
+        if not stats['sql'].lstrip().upper().startswith(('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')):
+            continue
+        try:
+            # A plain connection, so the EXPLAIN itself is not traced
+            with closing(sqlite3.connect(DB_PATH, timeout=DB_BUSY_TIMEOUT)) as conn:
+                plan = conn.execute("EXPLAIN QUERY PLAN " + stats['sql'], stats['parameters'] or ()).fetchall()
+            stats['plan'] = '\n'.join(row[-1] for row in plan)
+        except sqlite3.Error as e:
+            stats['plan'] = f"(no plan: {e})"
+        explained += 1
+    return explained
+
+def dump_sql_stats(path=None):
+    """SQL stats as JSON, also written to path when given"""
+    text = json.dumps({'since': _sql_trace_state()['since'], 'statements': get_sql_stats()}, indent=2)
+    if path:
+        with open(path, 'w') as f:
+            f.write(text + '\n')
+    return text
+
+def get_connection():
+    """Return this thread's connection to DB_PATH, opening it on first use"""
+    local = _db_state()['local']
+    if not hasattr(local, 'connections'):
+        local.connections = {}
+    conn = local.connections.get(DB_PATH)
+    if conn is None:
+        # Autocommit mode: writes open their own transactions in run_write
+        conn = sqlite3.connect(DB_PATH, timeout=DB_BUSY_TIMEOUT, isolation_level=None,
+                               factory=TracedConnection if SQL_TRACE else sqlite3.Connection)
+        if SQL_TRACE:
+            conn.trace_state = _sql_trace_state()
+        for pragma in DB_PRAGMAS:
+            conn.execute(pragma)
+        local.connections[DB_PATH] = conn
+        _bump_db_stat('connections_opened')
+    return conn
+
+def _is_lock_error(error):
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+def run_write(work):
+    """Run work(conn) inside an immediate transaction and return its result.
+
+    Retries with exponential backoff while the database is locked. Calls made
+    while a transaction is already open simply join it.
+    """
+    for attempt in range(DB_WRITE_RETRIES + 1):
+        conn = get_connection()
+        if conn.in_transaction:
+            return work(conn)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            # data_version ignores this connection's own commits; re-read versions next time
+            getattr(_db_state()['local'], 'data_versions', {}).pop(DB_PATH, None)
+            return result
+        except sqlite3.OperationalError as e:
+            if not _is_lock_error(e):
+                raise
+            if attempt == DB_WRITE_RETRIES:
+                _bump_db_stat('lock_timeouts')
+                raise
+            _bump_db_stat('lock_waits')
+            time.sleep(DB_RETRY_BASE_DELAY * (2 ** attempt) * random.uniform(1, 1.5))
+
+# Cross-process change detection. Triggers bump a counter in table_versions on
+# every write to a tracked table, and PRAGMA data_version tells a connection
+# whether any other connection (in this process or another) has committed
+# since it last asked, so an unchanged database costs one pragma per check.
+# carrier_similarity, player_stats and lead_changes are only written in the
+# same transactions as scacs and scores, so they share those counters.
+TRACKED_TABLES = ('scacs', 'scores')
+
+@st.cache_resource
+def _table_version_state():
+    return {'lock': threading.Lock(), 'versions': {}, 'stats': {'checks': 0, 'reads': 0}}
+
+def get_table_versions():
+    """{table: stored version} for DB_PATH, re-read only after some connection has committed"""
+    state = _table_version_state()
+    local = _db_state()['local']
+    conn = get_connection()
+    if not hasattr(local, 'data_versions'):
+        local.data_versions = {}
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    known = state['versions'].get(DB_PATH)
+    read = known is None or local.data_versions.get(DB_PATH) != data_version
+    if read:
+        stored = dict(conn.execute("SELECT name, version FROM table_versions"))
+        with state['lock']:
+            # Counters only grow; never let a slower reader roll them back
+            known = {name: max(version, (state['versions'].get(DB_PATH) or {}).get(name, 0))
+                     for name, version in stored.items()}
+            state['versions'][DB_PATH] = known
+        local.data_versions[DB_PATH] = data_version
+    with state['lock']:
+        state['stats']['checks'] += 1
+        state['stats']['reads'] += read
+    return known
+
+def get_table_version_stats():
+    state = _table_version_state()
+    with state['lock']:
+        return dict(state['stats'], versions=dict(state['versions'].get(DB_PATH) or {}))
+
+# Opt-in rerun profiling: @profiled functions record wall time, calls and SQL
+# statements into the current rerun's record, kept in a ring buffer for the
+# Admin Panel. Disabled, a profiled call costs one thread-local lookup.
+PROFILE_RERUNS = 200  # Reruns kept in the ring buffer
+
+@st.cache_resource
+def _profile_state():
+    return {
+        'lock': threading.Lock(),
+        'enabled': os.environ.get('SCAC_PROFILE', '') not in ('', '0'),
+        'reruns': deque(maxlen=PROFILE_RERUNS),
+    }
+
+def set_profiling(enabled):
+    _profile_state()['enabled'] = bool(enabled)
+
+def profiling_enabled():
+    return _profile_state()['enabled']
+
+def get_profiled_reruns():
+    """Recorded reruns, oldest first"""
+    state = _profile_state()
+    with state['lock']:
+        return list(state['reruns'])
+
+def clear_profiled_reruns():
+    state = _profile_state()
+    with state['lock']:
+        state['reruns'].clear()
+
+def profiled(func):
+    """Record func's time, calls and SQL statements in the current rerun, when profiling"""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Kept on the thread, not a module global, so objects from earlier reruns report too
+        rerun = getattr(threading.current_thread(), 'scac_profile_rerun', None)
+        if rerun is None:
+            return func(*args, **kwargs)
+        sql_before = rerun['sql']
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats = rerun['functions'].setdefault(name, {'calls': 0, 'seconds': 0.0, 'sql': 0, 'times': []})
+            elapsed = time.perf_counter() - start
+            stats['calls'] += 1
+            stats['seconds'] += elapsed
+            stats['sql'] += rerun['sql'] - sql_before
+            stats['times'].append(elapsed)
+    return wrapper
+
+@contextmanager
+def profile_rerun(label=''):
+    """Collect profiled calls made on this thread into one rerun record"""
+    if not profiling_enabled():
+        yield
+        return
+    rerun = {'started': datetime.now().isoformat(timespec='seconds'), 'label': label,
+             'seconds': 0.0, 'sql': 0, 'functions': {}}
+    conn = get_connection()
+
+    def count_sql(statement):
+        rerun['sql'] += 1
+
+    thread = threading.current_thread()
+    thread.scac_profile_rerun = rerun
+    conn.set_trace_callback(count_sql)
+    start = time.perf_counter()
+    try:
+        yield rerun
+    finally:
+        rerun['seconds'] = time.perf_counter() - start
+        conn.set_trace_callback(None)
+        thread.scac_profile_rerun = None
+        state = _profile_state()
+        with state['lock']:
+            state['reruns'].append(rerun)
+
 # Database functions
+@profiled
 def init_database():
-    conn = sqlite3.connect('scac_game.db')
+    """Bring the database schema up to date; a cheap version check once it is"""
+    if _schema_version(get_connection()) < len(SCHEMA_MIGRATIONS):
+        run_write(_run_migrations)
+
+@st.cache_resource
+def _initialized_databases():
+    return {'lock': threading.Lock(), 'paths': set()}
+
+def init_database_once():
+    """init_database, run once per process and database path instead of on every rerun"""
+    state = _initialized_databases()
+    if DB_PATH in state['paths']:
+        return
+    with state['lock']:
+        if DB_PATH not in state['paths']:
+            init_database()
+            state['paths'].add(DB_PATH)
+
+def _schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def _run_migrations(conn):
+    # Re-read inside the write transaction in case another session migrated first
+    for version in range(_schema_version(conn), len(SCHEMA_MIGRATIONS)):
+        SCHEMA_MIGRATIONS[version](conn)
+        conn.execute(f"PRAGMA user_version = {version + 1}")
+
+def _create_tables(conn):
     c = conn.cursor()
     
     # SCAC data table
@@ -26,13 +457,24 @@ def init_database():
                   details TEXT)''')
     
     # Player scores table
-    c.execute('''CREATE TABLE IF NOT EXISTS scores
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  player_name TEXT,
-                  score INTEGER,
-                  correct_answers INTEGER,
-                  total_questions INTEGER,
-                  timestamp DATETIME)''')
+    c.execute(SCORES_TABLE_SQL.format(table='scores'))
+    
+    # Per-player leaderboard aggregates, kept in step with scores by save_score
+    c.execute('''CREATE TABLE IF NOT EXISTS player_stats
+                 (Player TEXT PRIMARY KEY,
+                  best_score INTEGER,
+                  best_correct INTEGER,
+                  games_played INTEGER,
+                  accuracy_sum REAL,
+                  accuracy_games INTEGER,
+                  last_played TEXT,
+                  best_score_at TEXT)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_player_stats_best_score ON player_stats (best_score DESC)")
+    score_columns = [row[1] for row in c.execute("PRAGMA table_info(scores)")]
+    needs_stats = 'Player' in score_columns and c.execute("""SELECT EXISTS (SELECT 1 FROM scores)
+                                                            AND NOT EXISTS (SELECT 1 FROM player_stats)""").fetchone()[0]
+    if needs_stats:
+        rebuild_player_stats(conn)
     
     # Insert DEMO data only (safe for public GitHub)
     # No sample data - start with empty database
@@ -40,244 +482,1197 @@ def init_database():
     
     for data in sample_data:
         c.execute("INSERT OR IGNORE INTO scacs (scac_code, carrier_name, ship_mode, details) VALUES (?, ?, ?, ?)", data)    
-    conn.commit()
-    conn.close()
+    
+    # Content hashes for diff-based imports
+    scac_columns = [row[1] for row in c.execute("PRAGMA table_info(scacs)")]
+    if 'content_hash' not in scac_columns:
+        c.execute("ALTER TABLE scacs ADD COLUMN content_hash TEXT")
+    missing_hashes = c.execute("""SELECT id, scac_code, carrier_name, ship_mode, details
+                                  FROM scacs WHERE content_hash IS NULL""").fetchall()
+    c.executemany("UPDATE scacs SET content_hash = ? WHERE id = ?",
+                  [(scac_content_hash(*row[1:]), row[0]) for row in missing_hashes])
+    
+    # Similar-carrier index: name trigrams for blocking, and the resulting pairs
+    c.execute('''CREATE TABLE IF NOT EXISTS carrier_name_grams
+                 (gram TEXT,
+                  scac_id INTEGER,
+                  PRIMARY KEY (gram, scac_id)) WITHOUT ROWID''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_carrier_name_grams_scac ON carrier_name_grams (scac_id)")
+    c.execute('''CREATE TABLE IF NOT EXISTS carrier_similarity
+                 (scac_id INTEGER,
+                  similar_id INTEGER,
+                  PRIMARY KEY (scac_id, similar_id)) WITHOUT ROWID''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_carrier_similarity_similar ON carrier_similarity (similar_id)")
+    
+    # Build the index for catalogs that predate it
+    needs_index = c.execute("""SELECT EXISTS (SELECT 1 FROM scacs)
+                               AND NOT EXISTS (SELECT 1 FROM carrier_name_grams)""").fetchone()[0]
+    if needs_index:
+        rebuild_similarity_index(conn)
+
+SCORES_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS {table}
+                      (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                       Player TEXT,
+                       score INTEGER,
+                       correct_answers INTEGER,
+                       total_questions INTEGER,
+                       timestamp TEXT)'''
+SCORES_COLUMNS = ['id', 'Player', 'score', 'correct_answers', 'total_questions', 'timestamp']
+
+def _reconcile_scores_table(conn):
+    """Convert older scores tables (player_name column, or no id) to the current layout"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(scores)")]
+    if columns == SCORES_COLUMNS:
+        return
+    player_column = 'Player' if 'Player' in columns else 'player_name'
+    conn.execute(SCORES_TABLE_SQL.format(table='scores_migrated'))
+    conn.execute(f"""INSERT INTO scores_migrated (Player, score, correct_answers, total_questions, timestamp)
+                     SELECT {player_column}, score, correct_answers, total_questions, timestamp
+                     FROM scores ORDER BY {'id' if 'id' in columns else 'rowid'}""")
+    conn.execute("DROP TABLE scores")
+    conn.execute("ALTER TABLE scores_migrated RENAME TO scores")
+    rebuild_player_stats(conn)
+
+def _create_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scores_player_score ON scores (Player, score)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scores_timestamp ON scores (timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scacs_ship_mode ON scacs (ship_mode)")
+
+def _create_answer_events(conn):
+    # Every answered question, written behind the game by the write-behind queue
+    conn.execute('''CREATE TABLE IF NOT EXISTS answer_events
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     Player TEXT,
+                     scac_id INTEGER,
+                     question_type TEXT,
+                     is_correct INTEGER,
+                     time_taken REAL,
+                     points INTEGER,
+                     is_bonus INTEGER,
+                     timestamp TEXT)''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_answer_events_player ON answer_events (Player, timestamp)")
+
+def _create_mastery(conn):
+    # Leitner box and due time per player and SCAC, updated with every answer event
+    conn.execute('''CREATE TABLE IF NOT EXISTS scac_mastery
+                    (Player TEXT,
+                     scac_id INTEGER,
+                     box INTEGER,
+                     correct_count INTEGER,
+                     wrong_count INTEGER,
+                     last_seen_at REAL,
+                     due_at REAL,
+                     PRIMARY KEY (Player, scac_id)) WITHOUT ROWID''')
+
+def _create_table_versions(conn):
+    # Per-table change counters, bumped by triggers on every write; the scacs
+    # counter also names the catalog snapshot file
+    conn.execute('''CREATE TABLE IF NOT EXISTS table_versions
+                    (name TEXT PRIMARY KEY,
+                     version INTEGER NOT NULL)''')
+    for table in TRACKED_TABLES:
+        conn.execute("INSERT OR IGNORE INTO table_versions (name, version) VALUES (?, 1)", (table,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()}
+                             AFTER {event} ON {table}
+                             BEGIN UPDATE table_versions SET version = version + 1 WHERE name = '{table}'; END""")
+
+def _create_leaderboard_indexes(conn):
+    # Leaderboard pages seek straight to a (score, reached, name) key; the name
+    # tiebreak gives every player exactly one place, so cursors never skip or repeat
+    conn.execute("DROP INDEX IF EXISTS idx_player_stats_rank")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_player_stats_rank ON player_stats ({LEADERBOARD_ORDER})")
+    # Case-insensitive name prefix search; LIKE uses it while case_sensitive_like is off
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_player_stats_player_nocase ON player_stats (Player COLLATE NOCASE)")
+
+def _create_lead_history(conn):
+    # One row per new global best score: who took the lead, with what score, and when
+    conn.execute('''CREATE TABLE IF NOT EXISTS lead_changes
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     Player TEXT,
+                     score INTEGER,
+                     lead_from TEXT)''')
+    # Ties on best score rank whoever reached it first, matching who holds the lead
+    conn.execute("DROP INDEX IF EXISTS idx_player_stats_best_score")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_player_stats_rank ON player_stats (best_score DESC, best_score_at)")
+    rebuild_lead_history(conn)
+
+# Applied in order, each exactly once; PRAGMA user_version records how many have run.
+# Append new migrations - never edit or reorder the ones already released.
+SCHEMA_MIGRATIONS = [
+    _create_tables,
+    _reconcile_scores_table,
+    _create_indexes,
+    _create_lead_history,
+    _create_answer_events,
+    _create_mastery,
+    _create_table_versions,
+    _create_leaderboard_indexes,
+]
+
+def scac_content_hash(scac_code, carrier_name, ship_mode, details):
+    """Fingerprint of a SCAC row's content, used to skip unchanged rows on import"""
+    content = '\x1f'.join(str(value) for value in (scac_code, carrier_name, ship_mode, details))
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+# SCAC catalog cache
+CATALOG_COLUMNS = ('id', 'scac_code', 'carrier_name', 'ship_mode', 'details')
+
+@st.cache_resource
+def _catalog_state():
+    """Process-wide catalog snapshot shared by every session"""
+    return {'lock': threading.Lock(), 'version': 0, 'snapshot': None}
+
+def get_catalog_version():
+    return _catalog_state()['version']
+
+def bump_catalog_version():
+    """Invalidate the cached catalog after a write to the scacs table"""
+    state = _catalog_state()
+    with state['lock']:
+        state['version'] += 1
+
+# Catalog snapshot files: the catalog compiled into a read-only columnar file
+# per stored catalog version, memory-mapped by every worker process. Strings
+# live in one blob indexed by offset arrays; ship modes, details and carrier
+# families are stored once and referenced by per-row ids. The similarity index
+# is stored with the rows, as each row's similar rows.
+CATALOG_SNAPSHOT_DIR = os.environ.get('SCAC_SNAPSHOT_DIR')  # Defaults to the database's directory
+CATALOG_SNAPSHOT_MAGIC = b'SCACSNP1'
+CATALOG_SNAPSHOT_FORMAT = 4
+
+class _StringColumn:
+    """Read-only sequence of strings packed into a blob; value k is blob[offsets[k]:offsets[k + 1]],
+    or None where nulls[k] is set"""
+
+    def __init__(self, offsets, blob, nulls):
+        self.offsets = offsets
+        self.blob = blob
+        self.nulls = nulls
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        if self.nulls[i]:
+            return None
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+class _CodedColumn:
+    """Read-only sequence of values[codes[i]], None where the code is -1"""
+
+    def __init__(self, codes, values):
+        self.codes = codes
+        self.values = values
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        code = self.codes[i]
+        return None if code < 0 else self.values[code]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+def _code_values(values):
+    """(codes, distinct values): codes[i] indexes values[i] in the distinct list, -1 for None"""
+    codes = array('i')
+    distinct = {}
+    for value in values:
+        codes.append(-1 if value is None else distinct.setdefault(value, len(distinct)))
+    return codes, list(distinct)
+
+def _pack_strings(values):
+    """(offsets, blob, nulls) for a _StringColumn; a None value takes no space and sets its nulls byte"""
+    offsets = array('Q', [0])
+    blob = bytearray()
+    nulls = bytearray(len(values))
+    for k, value in enumerate(values):
+        if value is None:
+            nulls[k] = 1
+        else:
+            blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    return offsets, bytes(blob), bytes(nulls)
+
+def _encode_catalog_snapshot(version, rows, similar_pairs=()):
+    """Snapshot file contents for (id, scac_code, carrier_name, ship_mode, details) rows in id order,
+    and the (scac_id, similar_id) pairs of the similarity index"""
+    ids, codes, names, modes, details = (list(column) for column in zip(*rows)) if rows else ([], [], [], [], [])
+    mode_ids, mode_values = _code_values(modes)
+    detail_ids, detail_values = _code_values(details)
+    # SCACs whose details match after normalizing share a detail group
+    detail_groups, _ = _code_values([d.strip().lower() if d is not None else None for d in details])
+    family_ids, family_values = _code_values([carrier_family_key(name) if name is not None else None for name in names])
+    # Row k's similar rows, by position, are similar_rows[similar_offsets[k]:similar_offsets[k + 1]]
+    position = {scac_id: k for k, scac_id in enumerate(ids)}
+    similar = [[] for _ in ids]
+    for scac_id, similar_id in similar_pairs:
+        k, j = position.get(scac_id), position.get(similar_id)
+        if k is not None and j is not None:
+            similar[k].append(j)
+    similar_offsets, similar_rows = array('Q', [0]), array('i')
+    for row in similar:
+        similar_rows.extend(sorted(row))
+        similar_offsets.append(len(similar_rows))
+    sections = {'ids': array('q', ids), 'mode_ids': mode_ids, 'detail_ids': detail_ids,
+                'detail_groups': detail_groups, 'family_ids': family_ids,
+                'similar_offsets': similar_offsets, 'similar_rows': similar_rows}
+    for name, values in (('scac_codes', codes), ('carrier_names', names), ('modes', mode_values),
+                         ('details', detail_values), ('families', family_values)):
+        sections[name + '.offsets'], sections[name + '.blob'], sections[name + '.nulls'] = _pack_strings(values)
+
+    # Section offsets are relative to the 8-byte aligned end of the header
+    layout, body = {}, bytearray()
+    for name, data in sections.items():
+        body += b'\0' * (-len(body) % 8)
+        raw = data.tobytes() if isinstance(data, array) else data
+        layout[name] = [len(body), getattr(data, 'typecode', 'B'), len(raw)]
+        body += raw
+    header = json.dumps({'format': CATALOG_SNAPSHOT_FORMAT, 'version': version, 'rows': len(ids),
+                         'byteorder': sys.byteorder, 'sections': layout}).encode('utf-8')
+    head = CATALOG_SNAPSHOT_MAGIC + len(header).to_bytes(4, 'little') + header
+    return head + b'\0' * (-len(head) % 8) + bytes(body)
+
+class CatalogSnapshot:
+    """Columnar, read-only view of the catalog over snapshot file bytes (an mmap, or bytes in memory)"""
+
+    def __init__(self, buffer, path=None):
+        view = memoryview(buffer)
+        if bytes(view[:8]) != CATALOG_SNAPSHOT_MAGIC:
+            raise ValueError("Not a catalog snapshot")
+        header_length = int.from_bytes(view[8:12], 'little')
+        header = json.loads(bytes(view[12:12 + header_length]))
+        if header['format'] != CATALOG_SNAPSHOT_FORMAT or header['byteorder'] != sys.byteorder:
+            raise ValueError("Catalog snapshot from another format or platform")
+        start = 12 + header_length + (-(12 + header_length) % 8)
+
+        def section(name):
+            offset, typecode, size = header['sections'][name]
+            data = view[start + offset:start + offset + size]
+            return data if typecode == 'B' else data.cast(typecode)
+
+        def strings(name):
+            return _StringColumn(section(name + '.offsets'), section(name + '.blob'), section(name + '.nulls'))
+
+        self.buffer = buffer
+        self.path = path
+        self.version = header['version']
+        self.nbytes = len(view)
+        self.ids = section('ids')
+        self.scac_codes = strings('scac_codes')
+        self.carrier_names = strings('carrier_names')
+        # Few distinct ship modes and families, so those are decoded once
+        self.mode_ids = section('mode_ids')
+        self.ship_modes = _CodedColumn(self.mode_ids, list(strings('modes')))
+        self.details = _CodedColumn(section('detail_ids'), strings('details'))
+        self.detail_groups = section('detail_groups')
+        self.family_keys = _CodedColumn(section('family_ids'), list(strings('families')))
+        self.similar_offsets = section('similar_offsets')
+        self.similar_rows = section('similar_rows')
+
+    def __len__(self):
+        return len(self.ids)
+
+    def columns(self):
+        """The catalog as {column: list of values}, in CATALOG_COLUMNS order"""
+        return {'id': self.ids.tolist(), 'scac_code': list(self.scac_codes),
+                'carrier_name': list(self.carrier_names), 'ship_mode': list(self.ship_modes),
+                'details': list(self.details)}
+
+def _stored_catalog_version(conn):
+    return conn.execute("SELECT version FROM table_versions WHERE name = 'scacs'").fetchone()[0]
+
+def _catalog_snapshot_path(version):
+    directory = CATALOG_SNAPSHOT_DIR or os.path.dirname(os.path.abspath(DB_PATH))
+    return os.path.join(directory, f"{os.path.basename(DB_PATH)}.catalog-{version}.snap")
+
+def _map_catalog_snapshot(path):
+    with open(path, 'rb') as f:
+        return CatalogSnapshot(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), path)
+
+def _write_catalog_snapshot(data, path):
+    """Write a snapshot file atomically and remove the older versions' files"""
+    directory, name = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    # Workers still mapping an old file keep their view of it until they move on
+    prefix = f"{os.path.basename(DB_PATH)}.catalog-"
+    for other in os.listdir(directory):
+        if other.startswith(prefix) and other.endswith('.snap') and other != name:
+            try:
+                os.remove(os.path.join(directory, other))
+            except OSError:
+                pass
+
+def load_catalog_snapshot():
+    """CatalogSnapshot for the stored catalog version, from its file or built from the database.
+
+    A worker whose snapshot file already exists maps it without reading the
+    scacs table. If the file cannot be written the snapshot is kept in memory.
+    """
+    conn = get_connection()
+    try:
+        return _map_catalog_snapshot(_catalog_snapshot_path(_stored_catalog_version(conn)))
+    except (OSError, ValueError, KeyError):
+        pass  # Not built yet, or unreadable: build it
+    # The version and the rows come from the same read transaction
+    conn.execute("BEGIN")
+    try:
+        version = _stored_catalog_version(conn)
+        rows = conn.execute(f"SELECT {', '.join(CATALOG_COLUMNS)} FROM scacs ORDER BY id").fetchall()
+        similar_pairs = get_similar_pairs()
+    finally:
+        conn.execute("COMMIT")
+    data = _encode_catalog_snapshot(version, rows, similar_pairs)
+    path = _catalog_snapshot_path(version)
+    try:
+        _write_catalog_snapshot(data, path)
+        return _map_catalog_snapshot(path)
+    except OSError as e:
+        logger.warning("Catalog snapshot not written (%s); keeping it in memory", e)
+        return CatalogSnapshot(data)
+
+@profiled
+def get_catalog_snapshot():
+    """Return (version, CatalogSnapshot) for the current catalog, loading it at most once per version.
+
+    The snapshot is shared between sessions (and, through its file, between
+    worker processes) and is read-only.
+    """
+    state = _catalog_state()
+    stored_version = get_table_versions().get('scacs', 0)
+    snapshot = state['snapshot']
+    if snapshot is not None and snapshot[0] == state['version'] and snapshot[1].version >= stored_version:
+        return snapshot
+    with state['lock']:
+        snapshot = state['snapshot']
+        if snapshot is not None and snapshot[0] == state['version'] and snapshot[1].version < stored_version:
+            state['version'] += 1  # Changed by another worker
+        version = state['version']
+        if snapshot is None or snapshot[0] != version:
+            snapshot = (version, load_catalog_snapshot())
+            state['snapshot'] = snapshot
+    return snapshot
 
 def get_all_scacs():
-    conn = sqlite3.connect('scac_game.db')
-    df = pd.read_sql_query("SELECT * FROM scacs", conn)
-    conn.close()
-    return df
+    """The catalog as a DataFrame (admin pages), built at most once per version"""
+    version, catalog = get_catalog_snapshot()
+    state = _catalog_state()
+    frame = state.get('frame')
+    if frame is None or frame[0] != version:
+        frame = (version, pd.DataFrame(catalog.columns(), columns=list(CATALOG_COLUMNS)))
+        state['frame'] = frame
+    return frame[1]
 
 def add_scac(scac_code, carrier_name, ship_mode, details):
-    conn = sqlite3.connect('scac_game.db')
-    c = conn.cursor()
     try:
-        c.execute("INSERT INTO scacs (scac_code, carrier_name, ship_mode, details) VALUES (?, ?, ?, ?)",
-                 (scac_code, carrier_name, ship_mode, details))
-        conn.commit()
-        return True
+        scac_id = run_write(lambda conn: conn.execute(
+            "INSERT INTO scacs (scac_code, carrier_name, ship_mode, details, content_hash) VALUES (?, ?, ?, ?, ?)",
+            (scac_code, carrier_name, ship_mode, details,
+             scac_content_hash(scac_code, carrier_name, ship_mode, details))).lastrowid)
     except sqlite3.IntegrityError:
         return False
+    try:
+        refresh_similarity([scac_id])
     finally:
-        conn.close()
+        bump_catalog_version()
+    return True
 
 def delete_scac(scac_id):
-    conn = sqlite3.connect('scac_game.db')
-    c = conn.cursor()
-    c.execute("DELETE FROM scacs WHERE id = ?", (scac_id,))
-    conn.commit()
-    conn.close()
+    run_write(lambda conn: conn.execute("DELETE FROM scacs WHERE id = ?", (scac_id,)))
+    try:
+        refresh_similarity([scac_id])
+    finally:
+        bump_catalog_version()
 
 def update_scac(scac_id, scac_code, carrier_name, ship_mode, details):
-    conn = sqlite3.connect('scac_game.db')
-    c = conn.cursor()
     try:
-        c.execute("UPDATE scacs SET scac_code = ?, carrier_name = ?, ship_mode = ?, details = ? WHERE id = ?",
-                 (scac_code, carrier_name, ship_mode, details, scac_id))
-        conn.commit()
-        return True
+        run_write(lambda conn: conn.execute(
+            "UPDATE scacs SET scac_code = ?, carrier_name = ?, ship_mode = ?, details = ?, content_hash = ? WHERE id = ?",
+            (scac_code, carrier_name, ship_mode, details,
+             scac_content_hash(scac_code, carrier_name, ship_mode, details), scac_id)))
     except sqlite3.IntegrityError:
         return False
+    try:
+        refresh_similarity([scac_id])
     finally:
-        conn.close()
+        bump_catalog_version()
+    return True
 
+LEADERBOARD_LEAD_ROWS = 10  # Players ranked this high get a total time-in-lead figure
+LEADERBOARD_PAGE_SIZE = 25
+# Best score first; ties go to whoever reached it first, then by name
+LEADERBOARD_ORDER = "best_score DESC, COALESCE(best_score_at, ''), Player"
+
+@profiled
 def save_score(player_name, score, correct, total):
-    conn = sqlite3.connect('scac_game.db')
+    """Save a finished game right away; the game itself queues scores with enqueue_score.
+
+    False if the database still refused the write after run_write's retries;
+    anything that is not a database error is raised.
+    """
+    timestamp = datetime.now().isoformat()
     try:
-        c = conn.cursor()
-        
-        # Ensure table exists first
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS scores (
-                Player TEXT,
-                score INTEGER,
-                correct_answers INTEGER,
-                total_questions INTEGER,
-                timestamp TEXT
-            )
-        """)
-        
-        c.execute("INSERT INTO scores (Player, score, correct_answers, total_questions, timestamp) VALUES (?, ?, ?, ?, ?)",
-                 (player_name, score, correct, total, datetime.now().isoformat()))
-        conn.commit()
+        run_write(lambda conn: _insert_score(conn, player_name, score, correct, total, timestamp))
         return True
-    except Exception as e:
-        print(f"Save score error: {e}")
+    except sqlite3.Error:
+        logger.exception("Score for %s not saved", player_name)
         return False
-    finally:
-        conn.close()
 
-def get_leaderboard():
-    conn = sqlite3.connect('scac_game.db')
-    try:
-        # First check if the scores table exists
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='scores';")
-        table_exists = cursor.fetchone()
-        
-        if not table_exists:
-            # Create the scores table if it doesn't exist - WITH total_questions column
-            cursor.execute("""
-                CREATE TABLE scores (
-                    Player TEXT,
-                    score INTEGER,
-                    correct_answers INTEGER,
-                    total_questions INTEGER,
-                    timestamp TEXT
-                )
-            """)
-            conn.commit()
-            # Return empty DataFrame
-            return pd.DataFrame(columns=['Player', 'best_score', 'best_correct', 'games_played', 'last_played'])
-        
-        # Table exists, try to read data
-        df = pd.read_sql_query("""
-            SELECT Player, MAX(score) as best_score, 
-                   MAX(correct_answers) as best_correct,
-                   COUNT(*) as games_played,
-                   MAX(timestamp) as last_played
-            FROM scores 
-            GROUP BY Player 
-            ORDER BY best_score DESC
-        """, conn)
-        
-        return df
-        
-    except Exception as e:
-        print(f"Database error: {e}")  # For debugging
-        # Return empty DataFrame as fallback
-        return pd.DataFrame(columns=['Player', 'best_score', 'best_correct', 'games_played', 'last_played'])
+def _insert_score(conn, player_name, score, correct, total, timestamp):
+    # Same value as CAST(correct_answers AS FLOAT) / total_questions * 100, NULL for empty games
+    accuracy = correct / total * 100 if total else None
+    c = conn.cursor()
+    c.execute("INSERT INTO scores (Player, score, correct_answers, total_questions, timestamp) VALUES (?, ?, ?, ?, ?)",
+             (player_name, score, correct, total, timestamp))
     
-    finally:
-        conn.close()
+    # Fold the game into the player's aggregates; SET expressions all see the old row
+    c.execute("""
+        INSERT INTO player_stats (Player, best_score, best_correct, games_played,
+                                  accuracy_sum, accuracy_games, last_played, best_score_at)
+        VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+        ON CONFLICT (Player) DO UPDATE SET
+            best_score = MAX(best_score, excluded.best_score),
+            best_correct = MAX(best_correct, excluded.best_correct),
+            games_played = games_played + 1,
+            accuracy_sum = accuracy_sum + excluded.accuracy_sum,
+            accuracy_games = accuracy_games + excluded.accuracy_games,
+            last_played = MAX(last_played, excluded.last_played),
+            best_score_at = CASE
+                WHEN excluded.best_score > best_score THEN excluded.best_score_at
+                WHEN excluded.best_score = best_score THEN MIN(best_score_at, excluded.best_score_at)
+                ELSE best_score_at
+            END
+    """, (player_name, score, correct, accuracy or 0.0, int(accuracy is not None), timestamp, timestamp))
+    
+    # A new global best hands the lead to this player
+    c.execute("""
+        INSERT INTO lead_changes (Player, score, lead_from)
+        SELECT ?, ?, ?
+        WHERE NOT EXISTS (SELECT 1 FROM lead_changes WHERE score >= ?)
+    """, (player_name, score, timestamp, score))
+
+# Write-behind persistence: finished games and per-answer events are queued
+# and committed in batches by a background worker, so the UI never waits on a
+# write lock. Nothing is dropped - batches that hit a locked database are
+# retried, records that cannot be written at all are set aside in a
+# dead-letter file, and anything still queued at shutdown is spooled to disk
+# and replayed on the next start.
+WRITE_BATCH_SIZE = 200  # Records committed per transaction
+WRITE_RETRY_MAX_DELAY = 5.0  # Seconds between attempts once a batch keeps failing
+
+@st.cache_resource
+def _write_behind_state():
+    return {
+        'queue': queue.Queue(),
+        'lock': threading.Lock(),
+        'commit_lock': threading.Lock(),  # Held while a batch commits, so it is never also spooled
+        'worker': None,
+        'exit_hook': False,
+        'in_flight': None,  # Batch the worker is committing, spooled too if we stop mid-retry
+        'stopping': False,
+        'stats': {'queued': 0, 'written': 0, 'batches': 0, 'failed_batches': 0, 'dead_lettered': 0,
+                  'spooled': 0, 'replayed': 0, 'last_error': None},
+    }
+
+def _write_spool_path():
+    return DB_PATH + '.pending.jsonl'
+
+def _dead_letter_path():
+    return DB_PATH + '.failed.jsonl'
+
+def _bump_write_stat(name, amount=1):
+    state = _write_behind_state()
+    with state['lock']:
+        state['stats'][name] += amount
+
+def get_write_queue_stats():
+    """Counters for the write-behind queue, including the current backlog"""
+    state = _write_behind_state()
+    with state['lock']:
+        stats = dict(state['stats'])
+    stats['pending'] = state['queue'].unfinished_tasks
+    return stats
+
+def enqueue_score(player_name, score, correct, total):
+    """Queue a finished game for saving; the score keeps the time it was achieved"""
+    _enqueue_write({'kind': 'score', 'Player': player_name, 'score': score, 'correct_answers': correct,
+                    'total_questions': total, 'timestamp': datetime.now().isoformat()})
+
+def enqueue_answer_event(player_name, scac_id, question_type, is_correct, time_taken, points, is_bonus=False,
+                         answered_at=None):
+    """Queue one answered question for the answer_events and scac_mastery tables"""
+    _enqueue_write({'kind': 'answer', 'Player': player_name, 'scac_id': scac_id, 'question_type': question_type,
+                    'is_correct': bool(is_correct), 'time_taken': time_taken, 'points': points,
+                    'is_bonus': bool(is_bonus), 'timestamp': datetime.now().isoformat(),
+                    'answered_at': time.time() if answered_at is None else answered_at})
+
+def _enqueue_write(record):
+    state = _write_behind_state()
+    _ensure_write_worker(state)
+    state['queue'].put(record)
+    _bump_write_stat('queued')
+
+def _ensure_write_worker(state):
+    with state['lock']:
+        worker = state['worker']
+        if worker is not None and worker.is_alive():
+            return
+        # Replay anything a previous process could not commit before it stopped
+        replayed = _read_write_spool()
+        for record in replayed:
+            state['queue'].put(record)
+        state['stats']['replayed'] += len(replayed)
+        worker = threading.Thread(target=_write_worker, args=(state,), name='write-behind', daemon=True)
+        state['worker'] = worker
+        worker.start()
+        if not state['exit_hook']:
+            atexit.register(_spool_pending_writes, state)
+            state['exit_hook'] = True
+
+def _write_worker(state):
+    pending = state['queue']
+    while True:
+        batch = [pending.get()]
+        while len(batch) < WRITE_BATCH_SIZE:
+            try:
+                batch.append(pending.get_nowait())
+            except queue.Empty:
+                break
+        _commit_write_batch(state, batch)
+        for _ in batch:
+            pending.task_done()
+
+def _commit_write_batch(state, batch):
+    """Commit one batch. A locked database keeps the batch and backs off (run_write
+    has already retried); a record that cannot be written for any other reason is
+    logged and dead-lettered so it does not hold up the records behind it."""
+    with state['lock']:
+        state['in_flight'] = batch
+    attempt = 0
+    while True:
+        with state['commit_lock']:
+            if state['stopping']:
+                return  # Shutting down - _spool_pending_writes saves the batch
+            try:
+                failed = run_write(lambda conn: _write_batch(conn, batch))
+            except Exception as e:
+                if not (isinstance(e, sqlite3.OperationalError) and _is_lock_error(e)):
+                    failed = [(record, e) for record in batch]
+                else:
+                    failed, error = None, e
+            if failed is not None:
+                with state['lock']:
+                    state['in_flight'] = None
+                    state['stats']['written'] += len(batch) - len(failed)
+                    state['stats']['dead_lettered'] += len(failed)
+                    state['stats']['batches'] += 1
+                break
+        attempt += 1
+        with state['lock']:
+            state['stats']['failed_batches'] += 1
+            state['stats']['last_error'] = f"{datetime.now().isoformat(timespec='seconds')}: {error}"
+        logger.warning("Write-behind error (attempt %d, %d records kept): %s", attempt, len(batch), error)
+        time.sleep(min(WRITE_RETRY_MAX_DELAY, DB_RETRY_BASE_DELAY * (2 ** attempt)))
+    if failed:
+        _dead_letter_writes(state, failed)
+
+def _write_batch(conn, batch):
+    """Write batch in the open transaction and return [(record, error)] for the records
+    left out because they could not be written. Lock errors are raised."""
+    def write(name, records):
+        conn.execute(f"SAVEPOINT {name}")
+        try:
+            _write_records(conn, records)
+        except Exception as e:
+            if isinstance(e, sqlite3.OperationalError) and _is_lock_error(e):
+                raise
+            conn.execute(f"ROLLBACK TO {name}")
+            return e
+        finally:
+            conn.execute(f"RELEASE {name}")
+        return None
+    
+    if write('write_batch', batch) is None:
+        return []
+    # Something in the batch is bad: write the records one at a time to find it
+    failed = []
+    for record in batch:
+        error = write('write_record', [record])
+        if error is not None:
+            failed.append((record, error))
+    return failed
+
+def _dead_letter_writes(state, failed):
+    failed_at = datetime.now().isoformat(timespec='seconds')
+    with open(_dead_letter_path(), 'a', encoding='utf-8') as dead_letters:
+        dead_letters.writelines(json.dumps({'record': record, 'error': repr(error), 'failed_at': failed_at},
+                                           default=str) + '\n'
+                                for record, error in failed)
+    with state['lock']:
+        state['stats']['last_error'] = f"{failed_at}: {failed[-1][1]!r}"
+    for record, error in failed:
+        logger.error("Write-behind: record could not be written (%r), saved to %s: %r",
+                     error, _dead_letter_path(), record)
+
+def _write_records(conn, records):
+    events = []
+    for record in records:
+        if record['kind'] == 'score':
+            _insert_score(conn, record['Player'], record['score'], record['correct_answers'],
+                          record['total_questions'], record['timestamp'])
+        else:
+            events.append((record['Player'], record['scac_id'], record['question_type'], record['is_correct'],
+                           record['time_taken'], record['points'], record['is_bonus'], record['timestamp']))
+    if events:
+        conn.executemany("""INSERT INTO answer_events (Player, scac_id, question_type, is_correct,
+                                                       time_taken, points, is_bonus, timestamp)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", events)
+        _record_mastery(conn, [record for record in records if record['kind'] == 'answer'])
+
+def _leitner_interval_sql(box_expression):
+    cases = ' '.join(f"WHEN {box} THEN {seconds}" for box, seconds in enumerate(LEITNER_INTERVALS))
+    return f"CASE {box_expression} {cases} END"
+
+def _record_mastery(conn, answers):
+    """Move each answered card between Leitner boxes - the same rule as LeitnerScheduler.record"""
+    new_box = f"CASE WHEN excluded.correct_count THEN MIN(box + 1, {LEITNER_MAX_BOX}) ELSE 1 END"
+    conn.executemany(f"""
+        INSERT INTO scac_mastery (Player, scac_id, box, correct_count, wrong_count, last_seen_at, due_at)
+        VALUES (:player, :scac_id, :box, :correct, 1 - :correct, :answered_at,
+                :answered_at + {_leitner_interval_sql(':box')})
+        ON CONFLICT (Player, scac_id) DO UPDATE SET
+            box = {new_box},
+            correct_count = correct_count + excluded.correct_count,
+            wrong_count = wrong_count + excluded.wrong_count,
+            last_seen_at = excluded.last_seen_at,
+            due_at = excluded.last_seen_at + {_leitner_interval_sql(new_box)}
+    """, [{'player': a['Player'], 'scac_id': a['scac_id'], 'correct': int(a['is_correct']),
+           'box': 2 if a['is_correct'] else 1,
+           'answered_at': a.get('answered_at') or datetime.fromisoformat(a['timestamp']).timestamp()}
+          for a in answers])
+
+def flush_writes(timeout=None):
+    """Wait until every queued record is committed; False if the timeout ran out first"""
+    pending = _write_behind_state()['queue']
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while pending.unfinished_tasks:
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def _spool_pending_writes(state, timeout=5.0):
+    """At exit: give the worker a moment, then save whatever is left for the next start"""
+    if flush_writes(timeout):
+        return
+    # Waits out a commit in progress: the in-flight batch is then either committed or saved here
+    with state['commit_lock'], state['lock']:
+        state['stopping'] = True
+        leftover = list(state['in_flight'] or [])
+        state['in_flight'] = None
+    drained = 0
+    while True:
+        try:
+            leftover.append(state['queue'].get_nowait())
+            drained += 1
+        except queue.Empty:
+            break
+    if leftover:
+        with open(_write_spool_path(), 'a', encoding='utf-8') as spool:
+            spool.writelines(json.dumps(record) + '\n' for record in leftover)
+        _bump_write_stat('spooled', len(leftover))
+        logger.warning("Write-behind: spooled %d uncommitted records to %s", len(leftover), _write_spool_path())
+    # Spooled records are accounted for
+    for _ in range(drained):
+        state['queue'].task_done()
+
+def _read_write_spool():
+    path = _write_spool_path()
+    if not os.path.exists(path):
+        return []
+    # Claim the file first so a second process cannot replay it too
+    claimed = f"{path}.{os.getpid()}"
+    try:
+        os.replace(path, claimed)
+    except OSError:
+        return []
+    with open(claimed, encoding='utf-8') as spool:
+        records = [json.loads(line) for line in spool if line.strip()]
+    os.remove(claimed)
+    return records
+
+def rebuild_player_stats(conn, players=None):
+    """Recompute player_stats from scores, for every player or just the given ones"""
+    if players is None:
+        conn.execute("DELETE FROM player_stats")
+        player_filter, params = "", ()
+    else:
+        conn.execute("DELETE FROM player_stats WHERE Player IN (SELECT value FROM json_each(?))",
+                     (json.dumps(players),))
+        player_filter, params = "WHERE Player IN (SELECT value FROM json_each(?))", (json.dumps(players),)
+    conn.execute(f"""
+        INSERT INTO player_stats (Player, best_score, best_correct, games_played,
+                                  accuracy_sum, accuracy_games, last_played, best_score_at)
+        SELECT Player, MAX(score), MAX(correct_answers), COUNT(*),
+               COALESCE(SUM(accuracy), 0), COUNT(accuracy), MAX(timestamp),
+               MIN(CASE WHEN score = top_score THEN timestamp END)
+        FROM (SELECT Player, score, correct_answers, timestamp,
+                     CAST(correct_answers AS FLOAT) / total_questions * 100 AS accuracy,
+                     MAX(score) OVER (PARTITION BY Player) AS top_score
+              FROM scores {player_filter})
+        GROUP BY Player
+    """, params)
+
+def rebuild_lead_history(conn):
+    """Recompute lead_changes by replaying scores in time order"""
+    conn.execute("DELETE FROM lead_changes")
+    conn.execute("""
+        INSERT INTO lead_changes (Player, score, lead_from)
+        SELECT Player, score, timestamp
+        FROM (SELECT Player, score, timestamp, id,
+                     MAX(score) OVER (ORDER BY timestamp, id
+                                      ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING) AS previous_best
+              FROM scores)
+        WHERE score > previous_best OR (previous_best IS NULL AND score IS NOT NULL)
+        ORDER BY timestamp, id
+    """)
+
+@profiled
+def get_current_lead(now=None):
+    """(player, seconds) for the lead holder, timed from when the current best score
+    first became the global maximum; None while there are no scores"""
+    row = get_connection().execute("""
+        SELECT Player, (julianday(?) - julianday(lead_from)) * 86400
+        FROM lead_changes ORDER BY id DESC LIMIT 1
+    """, ((now or datetime.now()).isoformat(),)).fetchone()
+    return tuple(row) if row else None
+
+@profiled
+def get_total_lead_seconds(now=None):
+    """Seconds each player has held the lead, summed over all their spells; the current one runs up to now"""
+    rows = get_connection().execute("""
+        SELECT Player, SUM(julianday(lead_until) - julianday(lead_from)) * 86400
+        FROM (SELECT Player, lead_from,
+                     COALESCE(LEAD(lead_from) OVER (ORDER BY id), ?) AS lead_until
+              FROM lead_changes)
+        GROUP BY Player
+    """, ((now or datetime.now()).isoformat(),)).fetchall()
+    return {player: seconds for player, seconds in rows if seconds}
+
+def format_lead_time(seconds):
+    days, remainder = divmod(int(seconds), 86400)
+    hours = remainder // 3600
+    return f"{days}d {hours}h" if days > 0 else f"{hours}h"
 
 def delete_leaderboard_user(player_name):
-    conn = sqlite3.connect('scac_game.db')
-    c = conn.cursor()
-    c.execute("DELETE FROM scores WHERE Player = ?", (player_name,))
-    conn.commit()
-    conn.close()
+    def work(conn):
+        conn.execute("DELETE FROM scores WHERE Player = ?", (player_name,))
+        rebuild_player_stats(conn, [player_name])
+        rebuild_lead_history(conn)
+    run_write(work)
 
-def get_enhanced_leaderboard():
-    conn = sqlite3.connect('scac_game.db')
+# Players ranked ahead of the key (:score, :reached, :player), as two index range counts
+PLAYERS_AHEAD_SQL = """
+    SELECT (SELECT COUNT(*) FROM player_stats WHERE best_score > :score)
+         + (SELECT COUNT(*) FROM player_stats
+            WHERE best_score = :score AND (COALESCE(best_score_at, ''), Player) < (:reached, :player))
+"""
+LEADERBOARD_COLUMNS = ['rank', 'Player', 'best_score', 'best_correct', 'games_played', 'accuracy_pct',
+                       'last_played', 'time_in_lead', 'total_lead_time']
+
+def escape_like(text):
+    """Escape LIKE wildcards so text matches literally (with ESCAPE '\\')"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+@profiled
+def load_leaderboard_page(after=None, limit=LEADERBOARD_PAGE_SIZE, prefix=None, lead_rows=LEADERBOARD_LEAD_ROWS):
+    """One page of the leaderboard in rank order, with the leader's time in lead and
+    the top players' total time in lead.
+
+    `after` is the previous page's `next` cursor, or None for the top; `prefix` keeps
+    only players whose name starts with it, ignoring case. Returns {'rows', 'next'},
+    where `next` is None on the last page. Raises on database errors.
+    """
+    conditions, params = [], {'limit': limit + 1}
+    if after is not None:
+        conditions.append("""(best_score < :score OR (best_score = :score
+                               AND (COALESCE(best_score_at, ''), Player) > (:reached, :player)))""")
+        params.update(score=after[0], reached=after[1], player=after[2])
+    if prefix:
+        conditions.append("Player LIKE :pattern ESCAPE '\\'")
+        params['pattern'] = escape_like(prefix) + '%'
+    conn = get_connection()
+    rows = conn.execute(f"""
+        SELECT Player, best_score, best_correct, games_played,
+               ROUND(accuracy_sum / NULLIF(accuracy_games, 0), 1) as accuracy_pct,
+               last_played, COALESCE(best_score_at, '')
+        FROM player_stats
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        ORDER BY {LEADERBOARD_ORDER}
+        LIMIT :limit
+    """, params).fetchall()
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    
+    if prefix:
+        # Matches are scattered through the board, so each one counts who is ahead of it
+        ranks = [1 + conn.execute(PLAYERS_AHEAD_SQL, {'score': row[1], 'reached': row[6], 'player': row[0]}).fetchone()[0]
+                 for row in rows]
+    else:
+        first = after[3] + 1 if after is not None else 1
+        ranks = list(range(first, first + len(rows)))
+    
+    # time_in_lead is the leader's current spell only; total_lead_time adds up every
+    # spell the top players have held the lead, including earlier ones
+    current_lead = get_current_lead() if ranks and ranks[0] == 1 else None
+    lead_totals = get_total_lead_seconds() if ranks and ranks[0] <= lead_rows else {}
+    records = []
+    for rank, row in zip(ranks, rows):
+        leading = rank == 1 and current_lead is not None and current_lead[0] == row[0]
+        records.append((rank, *row[:6],
+                        format_lead_time(current_lead[1]) if leading else '',
+                        format_lead_time(lead_totals[row[0]]) if rank <= lead_rows and row[0] in lead_totals else ''))
+    df = pd.DataFrame.from_records(records, columns=LEADERBOARD_COLUMNS)
+    # The cursor is the last row's sort key, plus its rank to number the next page from
+    return {'rows': df, 'next': (rows[-1][1], rows[-1][6], rows[-1][0], ranks[-1]) if has_next else None}
+
+@profiled
+def get_player_rank(player_name):
+    """The player's leaderboard place and best game, or None if they have no scores; raises on database errors"""
+    conn = get_connection()
+    row = conn.execute("""
+        SELECT best_score, COALESCE(best_score_at, ''), best_correct, games_played,
+               ROUND(accuracy_sum / NULLIF(accuracy_games, 0), 1)
+        FROM player_stats WHERE Player = ?
+    """, (player_name,)).fetchone()
+    if row is None:
+        return None
+    ahead = conn.execute(PLAYERS_AHEAD_SQL, {'score': row[0], 'reached': row[1], 'player': player_name}).fetchone()[0]
+    return {
+        'rank': ahead + 1,
+        'players': conn.execute("SELECT COUNT(*) FROM player_stats").fetchone()[0],
+        'best_score': row[0],
+        'best_correct': row[2],
+        'games_played': row[3],
+        'accuracy_pct': row[4],
+    }
+
+# Time in lead keeps growing, so a cached leaderboard also ages out
+LEADERBOARD_CACHE_SECONDS = 60
+
+@st.cache_resource
+def _leaderboard_cache():
+    """Process-wide top pages by (database, limit, lead_rows), with the scores version they were read at"""
+    return {'lock': threading.Lock(), 'entries': {}}
+
+def get_leaderboard_page(after=None, limit=LEADERBOARD_PAGE_SIZE, prefix=None, lead_rows=LEADERBOARD_LEAD_ROWS):
+    """load_leaderboard_page, with the top page - what nearly everyone looks at - reloaded
+    only after scores change (in any process) or the cache ages out.
+
+    The page is shared between sessions and must be treated as read-only.
+    """
     try:
-        # First ensure the table exists
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='scores';")
-        table_exists = cursor.fetchone()
-        
-        if not table_exists:
-            # Create the scores table if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE scores (
-                    Player TEXT,
-                    score INTEGER,
-                    correct_answers INTEGER,
-                    total_questions INTEGER,
-                    timestamp TEXT
-                )
-            """)
-            conn.commit()
-            conn.close()
-            # Return empty DataFrame with expected columns
-            return pd.DataFrame(columns=['Player', 'best_score', 'best_correct', 'games_played', 'accuracy_pct', 'last_played', 'time_in_lead'])
-        
-        df = pd.read_sql_query("""
-            SELECT Player, 
-                   MAX(score) as best_score, 
-                   MAX(correct_answers) as best_correct,
-                   COUNT(*) as games_played,
-                   ROUND(AVG(CAST(correct_answers AS FLOAT) / total_questions * 100), 1) as accuracy_pct,
-                   MAX(timestamp) as last_played
-            FROM scores 
-            GROUP BY Player 
-            ORDER BY best_score DESC
-        """, conn)
-        conn.close()
-        
-        # Add time in lead for top player
-        if len(df) > 0:
-            df['time_in_lead'] = ''
-            top_player = df.iloc[0]['Player']
-            
-            # Get when this player first achieved the top score
-            try:
-                conn = sqlite3.connect('scac_game.db')
-                first_top_score = pd.read_sql_query("""
-                    SELECT MIN(timestamp) as first_top
-                    FROM scores 
-                    WHERE Player = ? AND score = (
-                        SELECT MAX(score) FROM scores WHERE Player = ?
-                    )
-                """, conn, params=[top_player, top_player])
-                conn.close()
-                
-                if not first_top_score.empty and first_top_score.iloc[0]['first_top']:
-                    from datetime import datetime
-                    first_top_time = datetime.fromisoformat(first_top_score.iloc[0]['first_top'])
-                    time_diff = datetime.now() - first_top_time
-                    days = time_diff.days
-                    hours = time_diff.seconds // 3600
-                    
-                    if days > 0:
-                        df.loc[0, 'time_in_lead'] = f"{days}d {hours}h"
-                    else:
-                        df.loc[0, 'time_in_lead'] = f"{hours}h"
-            except:
-                # If time calculation fails, just leave it empty
-                pass
+        if after is not None or prefix:
+            return load_leaderboard_page(after, limit, prefix, lead_rows)
+        cache = _leaderboard_cache()
+        key = (DB_PATH, limit, lead_rows)
+        version = get_table_versions().get('scores')
+        entry = cache['entries'].get(key)
+        if entry is None or entry[0] != version or time.monotonic() - entry[1] > LEADERBOARD_CACHE_SECONDS:
+            entry = (version, time.monotonic(), load_leaderboard_page(None, limit, None, lead_rows))
+            with cache['lock']:
+                cache['entries'][key] = entry
+        return entry[2]
+    except Exception:
+        logger.exception("Leaderboard page not loaded")
+        # Return an empty page as fallback
+        return {'rows': pd.DataFrame(columns=LEADERBOARD_COLUMNS), 'next': None}
+
+# Game functions
+def initialize_game_state():
+    if 'player_name' not in st.session_state:
+        st.session_state.player_name = ""
+    if 'game' not in st.session_state:
+        st.session_state.game = GameSession(None)
+
+NO_DETAILS_TEXT = 'No additional details provided'
+
+# Ship modes that always get a bonus question
+ALWAYS_BONUS_SHIP_MODES = {"TL Imports", "SP (Small Parcel)", "IM (intermodal)"}
+
+# Words in a carrier name, ignoring parentheses
+def has_meaningful_details(details):
+    return details is not None and details.strip() != '' and details != NO_DETAILS_TEXT
+
+def carrier_family_key(carrier_name):
+    """First word of the cleaned carrier name, lower-cased; carriers whose name contains it form its family"""
+    words = clean_carrier_name(carrier_name).lower().split()
+    return words[0] if words else ''
+
+def _nth_available(position, excluded_sorted):
+    """Map a position among the non-excluded rows back to a row index"""
+    index = position
+    for excluded in excluded_sorted:
+        if excluded <= index:
+            index += 1
         else:
-            # If no data, add the time_in_lead column
-            df['time_in_lead'] = ''
+            break
+    return index
+
+# Words that don't matter when comparing answers word by word
+ANSWER_STOP_WORDS = frozenset({'the', 'and', 'or', 'of', 'in', 'to', 'a', 'an', 'is', 'are', 'was', 'were',
+                               'inc', 'llc', 'corp', 'company', 'co'})
+
+ANSWER_SIMILARITY_THRESHOLD = 0.8
+
+def _strip_separators(text):
+    return text.replace(' ', '').replace('-', '').replace('_', '')
+
+class AnswerMatcher:
+    """Text-answer check for one correct answer, with its normalized forms precomputed.
+
+    Accepts exactly what the game has always accepted: an exact match, a match
+    ignoring spaces/hyphens/underscores, containment either way, word-level
+    matches, 60% word overlap, or 80% difflib similarity.
+    """
+
+    __slots__ = ('answer', 'clean', 'words', 'clean_words', 'long_clean_words', 'char_counts')
+
+    def __init__(self, correct_answer):
+        self.answer = correct_answer.lower().strip()
+        self.clean = _strip_separators(self.answer)
+        self.words = set(self.answer.split()) - ANSWER_STOP_WORDS
+        self.clean_words = {word.replace('-', '').replace('_', '') for word in self.words}
+        self.long_clean_words = [word for word in self.clean_words if len(word) >= 4]
+        self.char_counts = None  # Only needed for the fuzzy check, filled on first use
+
+    def matches(self, user_answer):
+        user_input = user_answer.lower().strip()
+        answer = self.answer
+        if not user_input:
+            return False
+        if user_input == answer:
+            return True
         
-        return df
+        # Ignoring spaces, hyphens and underscores, or one containing the other
+        user_clean = _strip_separators(user_input)
+        if user_clean == self.clean:
+            return True
+        if len(user_clean) >= 3 and user_clean in self.clean:
+            return True
+        if len(self.clean) >= 3 and self.clean in user_clean:
+            return True
+        if len(user_input) >= 3 and (user_input in answer or answer in user_input):
+            return True
         
-    except Exception as e:
-        print(f"Enhanced leaderboard error: {e}")
-        conn.close()
-        # Return empty DataFrame as fallback
-        return pd.DataFrame(columns=['Player', 'best_score', 'best_correct', 'games_played', 'accuracy_pct', 'last_played', 'time_in_lead'])
+        # Word-based matching (handles "tforce" vs "t-force")
+        user_words = set(user_input.split()) - ANSWER_STOP_WORDS
+        if self.clean_words:
+            for user_word in user_words:
+                user_word_clean = user_word.replace('-', '').replace('_', '')
+                if user_word_clean in self.clean_words:
+                    return True
+                if len(user_word_clean) >= 4 and any(user_word_clean in word for word in self.clean_words):
+                    return True
+                if any(word in user_word_clean for word in self.long_clean_words):
+                    return True
+            if len(user_words & self.words) >= len(self.words) * 0.6:
+                return True
+        
+        return self._is_close(user_input)
 
-# Game functions
-def initialize_game_state():
-    if 'game_active' not in st.session_state:
-        st.session_state.game_active = False
-    if 'current_question' not in st.session_state:
-        st.session_state.current_question = None
-    if 'question_start_time' not in st.session_state:
-        st.session_state.question_start_time = None
-    if 'score' not in st.session_state:
-        st.session_state.score = 0
-    if 'correct_answers' not in st.session_state:
-        st.session_state.correct_answers = 0
-    if 'total_questions' not in st.session_state:
-        st.session_state.total_questions = 0
-    if 'used_questions' not in st.session_state:
-        st.session_state.used_questions = []
-
-def generate_question(scacs_df):
-    available_scacs = scacs_df    
-    # Separate SCACs with meaningful details for bonus questions
-    scacs_with_details = available_scacs[
-        (available_scacs['details'].notna()) & 
-        (available_scacs['details'].str.strip() != '') & 
-        (available_scacs['details'] != 'No additional details provided')
-    ]
-    
-    # Rest of your function...
-    available_scacs = scacs_df[~scacs_df['id'].isin(st.session_state.used_questions)]
-    
-    if len(available_scacs) == 0:
+    def _is_close(self, user_input):
+        """difflib ratio >= 0.8, skipping difflib when a cheap upper bound already fails"""
+        total = len(user_input) + len(self.answer)
+        if 2 * min(len(user_input), len(self.answer)) < ANSWER_SIMILARITY_THRESHOLD * total:
+            return False
+        if self.char_counts is None:
+            self.char_counts = Counter(self.answer)
+        common = sum((Counter(user_input) & self.char_counts).values())
+        if 2 * common < ANSWER_SIMILARITY_THRESHOLD * total:
+            return False
+        return difflib.SequenceMatcher(None, user_input, self.answer).ratio() >= ANSWER_SIMILARITY_THRESHOLD
+
+class QuestionBank:
+    """Lookup tables for question generation, built once per catalog version.
+
+    Rows are addressed by their position in the catalog snapshot. Everything
+    generate_question needs is precomputed here so that picking a question
+    never scans the catalog.
+    """
+
+    def __init__(self, catalog, version=None):
+        self.version = version
+        # Columns are views over the shared CatalogSnapshot, not copies
+        self.ids = catalog.ids
+        self.scac_codes = catalog.scac_codes
+        self.carrier_names = catalog.carrier_names
+        self.ship_modes = catalog.ship_modes
+        self.details = catalog.details
+        self.family_keys = catalog.family_keys
+        self.index_by_id = {scac_id: i for i, scac_id in enumerate(self.ids)}
+
+        # Rows missing a SCAC code, carrier name or ship mode (NULLs in older
+        # databases) are never asked about or offered as choices
+        code_nulls, name_nulls, mode_ids = catalog.scac_codes.nulls, catalog.carrier_names.nulls, catalog.mode_ids
+        self.incomplete = array('i', (i for i in range(len(self.ids))
+                                      if code_nulls[i] or name_nulls[i] or mode_ids[i] < 0))
+        self.skipped = skipped = frozenset(self.incomplete)
+
+        # Per-SCAC flags, worked out once per distinct details text and ship mode
+        meaningful = [has_meaningful_details(d) for d in self.details.values]
+        self.has_details = bytearray(code >= 0 and meaningful[code] for code in self.details.codes)
+        bonus_modes = [mode.strip() in ALWAYS_BONUS_SHIP_MODES for mode in self.ship_modes.values]
+        self.always_bonus = bytearray(code >= 0 and bonus_modes[code] for code in self.ship_modes.codes)
+
+        # Ship-mode buckets, in order of first appearance
+        buckets = [array('i') for _ in self.ship_modes.values]
+        for i, code in enumerate(self.ship_modes.codes):
+            if i not in skipped:
+                buckets[code].append(i)
+        self.mode_buckets = {mode: bucket for mode, bucket in zip(self.ship_modes.values, buckets) if bucket}
+
+        # Groups of SCACs sharing the same (normalized) details
+        self.detail_group_of = catalog.detail_groups
+        self.detail_groups = [array('i') for _ in range(max(self.detail_group_of, default=-1) + 1)]
+        for i, group_id in enumerate(self.detail_group_of):
+            if group_id >= 0 and i not in skipped:
+                self.detail_groups[group_id].append(i)
+
+        # Similar carriers (from the similarity index), by row index
+        self.similar_offsets = catalog.similar_offsets
+        self.similar_rows = catalog.similar_rows
+
+        # Carrier families, counted per family key on first use (see family_mode_counts)
+        self.family_counts = {}
+        self.family_search = None
+
+        # Matchers for the text answers asked so far, built on first use
+        self.answer_matchers = {}
+
+    def __len__(self):
+        """How many SCACs questions can be asked about"""
+        return len(self.ids) - len(self.incomplete)
+
+    def is_askable(self, i):
+        return i not in self.skipped
+
+    def scac_info(self, scac_id):
+        i = self.index_by_id.get(scac_id)
+        if i is None:
+            return None
+        return {
+            'scac_code': self.scac_codes[i],
+            'carrier_name': self.carrier_names[i],
+            'ship_mode': self.ship_modes[i],
+            'details': self.details[i]
+        }
+
+    def sample_indices(self, k, excluded=()):
+        """Pick up to k distinct row indices outside excluded (sorted indices) and the incomplete rows"""
+        if self.skipped:
+            excluded = sorted(self.skipped.union(excluded))
+        available = len(self.ids) - len(excluded)
+        if available <= 0:
+            return []
+        if available <= k:
+            return [_nth_available(p, excluded) for p in range(available)]
+        return [_nth_available(p, excluded) for p in random.sample(range(available), k)]
+
+    def pick_unused(self, used_ids):
+        """Random row index whose SCAC id is not in used_ids, or None"""
+        used = sorted({self.index_by_id[scac_id] for scac_id in used_ids if scac_id in self.index_by_id})
+        picked = self.sample_indices(1, used)
+        return picked[0] if picked else None
+
+    def family_mode_counts(self, family_key):
+        """{ship mode: number of carriers whose name contains family_key, ignoring case}"""
+        counts = self.family_counts.get(family_key)
+        if counts is not None:
+            return counts
+        if self.family_search is None:
+            # Lower-cased names, one per line; a key never contains whitespace, so a
+            # match never runs into the next name. starts[k] is where rows[k] begins.
+            rows = array('i', (i for i in range(len(self.ids)) if i not in self.skipped))
+            names = [self.carrier_names[i].lower() for i in rows]
+            starts = array('q', itertools.accumulate((len(name) + 1 for name in names[:-1]), initial=0))
+            self.family_search = ('\n'.join(names), rows, starts)
+        text, rows, starts = self.family_search
+        counts = {}
+        position = text.find(family_key) if rows else -1
+        while position >= 0:
+            k = bisect.bisect_right(starts, position) - 1
+            mode = self.ship_modes[rows[k]]
+            counts[mode] = counts.get(mode, 0) + 1
+            # One count per carrier, however often its name contains the key
+            position = text.find(family_key, starts[k + 1]) if k + 1 < len(rows) else -1
+        self.family_counts[family_key] = counts
+        return counts
+
+    def distractor_ship_modes(self, family_key):
+        """Ship modes offered by at least one carrier outside the family"""
+        family_counts = self.family_mode_counts(family_key)
+        return [mode for mode, bucket in self.mode_buckets.items()
+                if len(bucket) > family_counts.get(mode, 0)]
+
+    def answer_matcher(self, correct_answer):
+        """AnswerMatcher for a text question's correct answer"""
+        matcher = self.answer_matchers.get(correct_answer)
+        if matcher is None:
+            matcher = AnswerMatcher(correct_answer)
+            self.answer_matchers[correct_answer] = matcher
+        return matcher
+
+    def similar_carriers(self, i):
+        """Row indices of carriers similar to row i (see get_similar_carriers)"""
+        if i in self.skipped:
+            return []
+        similar = self.similar_rows[self.similar_offsets[i]:self.similar_offsets[i + 1]]
+        return [j for j in similar if j not in self.skipped]
+
+    def duplicate_details(self, i):
+        """Sorted indices of every SCAC sharing row i's details (including i)"""
+        group_id = self.detail_group_of[i]
+        return list(self.detail_groups[group_id]) if group_id >= 0 else [i]
+
+@profiled
+def get_question_bank():
+    """QuestionBank for the current catalog version, shared by every session"""
+    version, catalog = get_catalog_snapshot()
+    state = _catalog_state()
+    bank = state.get('question_bank')
+    if bank is None or bank.version != version:
+        with state['lock']:
+            bank = state.get('question_bank')
+            if bank is None or bank.version != version:
+                bank = QuestionBank(catalog, version)
+                state['question_bank'] = bank
+    return bank
+
+@profiled
+def generate_question(bank, used_ids, index=None):
+    """Question about a random unused SCAC, or about bank row `index` when given"""
+    i = bank.pick_unused(used_ids) if index is None else index
+    if i is None:
         return None
     
-    # Separate SCACs with meaningful details for bonus questions
-    scacs_with_details = available_scacs[
-        (available_scacs['details'].notna()) & 
-        (available_scacs['details'].str.strip() != '') & 
-        (available_scacs['details'] != 'No additional details provided')
-    ]
-    
     # Regular question types
     regular_question_types = [
         "carrier_from_scac",
@@ -292,18 +1687,19 @@ def generate_question(scacs_df):
     ]
     
     # First select a SCAC, then decide question type based on ship mode
-    correct_scac = available_scacs.sample(1).iloc[0]
-    ship_mode = correct_scac['ship_mode'].strip()
+    scac_id = bank.ids[i]
+    scac_code = bank.scac_codes[i]
+    carrier_name = bank.carrier_names[i]
+    ship_mode = bank.ship_modes[i]
+    details = bank.details[i]
+    has_details = bool(bank.has_details[i])
 
     # Determine if this should be a bonus question based on ship mode
-    if ship_mode == "TL Imports" or ship_mode == "SP (Small Parcel)" or ship_mode == "IM (intermodal)":
+    if bank.always_bonus[i]:
         # Always bonus for TL Imports, SP, and IM (intermodal)
         is_bonus = True
     else:
         # All other ship modes: lower chance (15% instead of 30%)
-        has_details = (pd.notna(correct_scac['details']) and 
-                      correct_scac['details'].strip() != '' and 
-                      correct_scac['details'] != 'No additional details provided')
         is_bonus = has_details and random.random() < 0.15
 
     # Select question type based on bonus status
@@ -317,37 +1713,36 @@ def generate_question(scacs_df):
         return {
             'type': 'text',
             'is_bonus': False,
-            'question': f"What is the carrier name for SCAC code: {correct_scac['scac_code']}?",
-            'correct_answer': correct_scac['carrier_name'].lower(),
-            'scac_id': correct_scac['id'],
-            'hint': f"Ship Mode: {correct_scac['ship_mode']}"
+            'question': f"What is the carrier name for SCAC code: {scac_code}?",
+            'correct_answer': carrier_name.lower(),
+            'scac_id': scac_id,
+            'hint': f"Ship Mode: {ship_mode}"
         }
     
     elif question_type == "scac_from_carrier":
         return {
             'type': 'text',
             'is_bonus': False,
-            'question': f"What is the SCAC code for: {correct_scac['carrier_name']}?",
-            'correct_answer': correct_scac['scac_code'].upper(),
-            'scac_id': correct_scac['id'],
-            'hint': f"Ship Mode: {correct_scac['ship_mode']}"
+            'question': f"What is the SCAC code for: {carrier_name}?",
+            'correct_answer': scac_code.upper(),
+            'scac_id': scac_id,
+            'hint': f"Ship Mode: {ship_mode}"
         }
     
     elif question_type == "ship_mode_from_scac":
         # Check for similar carrier names
-        similar_carriers = get_similar_carriers(correct_scac['carrier_name'], scacs_df)
+        similar_carriers = bank.similar_carriers(i)
         
         if len(similar_carriers) > 0:
             # Similar carriers found - use "select all that apply" format
-            cleaned_name = clean_carrier_name(correct_scac['carrier_name'])
+            cleaned_name = clean_carrier_name(carrier_name)
             
             # Get all ship modes for similar carriers (including the correct one)
-            all_similar = similar_carriers + [correct_scac]
-            all_ship_modes = [carrier['ship_mode'] for carrier in all_similar]
+            all_ship_modes = [bank.ship_modes[j] for j in similar_carriers] + [ship_mode]
             correct_ship_modes = list(set(all_ship_modes))  # Remove duplicates
             
-            # Get some wrong ship modes from other carriers
-            other_ship_modes = scacs_df[~scacs_df['carrier_name'].str.contains(cleaned_name.split()[0], case=False, na=False)]['ship_mode'].unique().tolist()
+            # Get some wrong ship modes from carriers outside this family
+            other_ship_modes = bank.distractor_ship_modes(bank.family_keys[i])
             wrong_ship_modes = random.sample(other_ship_modes, min(2, len(other_ship_modes)))
             
             # Combine all options
@@ -360,91 +1755,69 @@ def generate_question(scacs_df):
                 'question': f"What are ALL the ship modes that {cleaned_name} handles? (Select all that apply)",
                 'choices': all_options,
                 'correct_answers': correct_ship_modes,  # Multiple correct answers
-                'scac_id': correct_scac['id'],
+                'scac_id': scac_id,
                 'hint': f"Think about all the different services {cleaned_name} might offer"
             }
         else:
             # No similar carriers - use regular single answer format
-            display_name = correct_scac['carrier_name']
+            display_name = carrier_name
             if has_parenthetical_text(display_name):
                 display_name = clean_carrier_name(display_name)
             
             return {
                 'type': 'text',
                 'is_bonus': False,
-                'question': f"What is the ship mode for {correct_scac['scac_code']} ({display_name})?",
-                'correct_answer': correct_scac['ship_mode'].lower(),
-                'scac_id': correct_scac['id'],
+                'question': f"What is the ship mode for {scac_code} ({display_name})?",
+                'correct_answer': ship_mode.lower(),
+                'scac_id': scac_id,
                 'hint': "Think about the type of transportation service"
             }
     
     elif question_type == "multiple_choice_carrier":
         # Get 3 wrong answers
-        wrong_answers = scacs_df[scacs_df['id'] != correct_scac['id']]['carrier_name'].tolist()
-        if len(wrong_answers) >= 3:
-            wrong_answers = random.sample(wrong_answers, 3)
+        wrong_answers = [bank.carrier_names[j] for j in bank.sample_indices(3, [i])]
         
-        choices = [correct_scac['carrier_name']] + wrong_answers
+        choices = [carrier_name] + wrong_answers
         random.shuffle(choices)
         
         return {
             'type': 'multiple_choice',
             'is_bonus': False,
-            'question': f"Which carrier has the SCAC code: {correct_scac['scac_code']}?",
+            'question': f"Which carrier has the SCAC code: {scac_code}?",
             'choices': choices,
-            'correct_answer': correct_scac['carrier_name'],
-            'scac_id': correct_scac['id'],
-            'hint': f"Ship Mode: {correct_scac['ship_mode']}"
+            'correct_answer': carrier_name,
+            'scac_id': scac_id,
+            'hint': f"Ship Mode: {ship_mode}"
         }
     
     # BONUS QUESTIONS (multiple choice only)
     elif question_type == "bonus_multiple_choice":
-        # Check if this SCAC has meaningful details
-        has_meaningful_details = (pd.notna(correct_scac['details']) and 
-                                correct_scac['details'].strip() != '' and 
-                                correct_scac['details'] != 'No additional details provided')
+        same_details = bank.duplicate_details(i) if has_details else [i]
         
-        if has_meaningful_details:
+        if has_details:
             # Check for duplicate details before using details-based question
-            current_details = correct_scac['details'].strip().lower()
-            duplicate_details = scacs_df[
-                (scacs_df['id'] != correct_scac['id']) & 
-                (scacs_df['details'].str.strip().str.lower() == current_details)
-            ]
-            
-            if len(duplicate_details) > 0:
+            if len(same_details) > 1:
                 # Details are not unique, fall back to ship mode question
-                question_text = f"🌟 BONUS: Which carrier has the SCAC code {correct_scac['scac_code']} ?"
+                question_text = f"🌟 BONUS: Which carrier has the SCAC code {scac_code} ?"
                 # Add warning in hint
-                hint_text = f"SCAC: {correct_scac['scac_code']}, Ship Mode: {correct_scac['ship_mode']} (Note: Multiple carriers have similar details)"
+                hint_text = f"SCAC: {scac_code}, Ship Mode: {ship_mode} (Note: Multiple carriers have similar details)"
             else:
                 # Details are unique, use details-based question
-                details_clue = correct_scac['details'][:200] + "..." if len(correct_scac['details']) > 200 else correct_scac['details']
+                details_clue = details[:200] + "..." if len(details) > 200 else details
                 question_text = f"🌟 BONUS: Which carrier is associated with this service/detail: '{details_clue}'?"
-                hint_text = f"SCAC: {correct_scac['scac_code']}, Ship Mode: {correct_scac['ship_mode']}"
+                hint_text = f"SCAC: {scac_code}, Ship Mode: {ship_mode}"
         else:
             # Use ship mode-based question for TL Imports/SP without details
-            question_text = f"🌟 BONUS: Which carrier has the SCAC code {correct_scac['scac_code']}?"
-            hint_text = f"SCAC: {correct_scac['scac_code']}, Ship Mode: {correct_scac['ship_mode']}"
+            question_text = f"🌟 BONUS: Which carrier has the SCAC code {scac_code}?"
+            hint_text = f"SCAC: {scac_code}, Ship Mode: {ship_mode}"
         
         # Get wrong answers - avoid carriers with same details
-        if has_meaningful_details:
-            # Exclude carriers with identical details from wrong answers
-            current_details = correct_scac['details'].strip().lower()
-            other_carriers = scacs_df[
-                (scacs_df['id'] != correct_scac['id']) & 
-                (scacs_df['details'].str.strip().str.lower() != current_details)
-            ]['carrier_name'].tolist()
-            
-            # If not enough unique carriers, fall back to all others
-            if len(other_carriers) < 3:
-                other_carriers = scacs_df[scacs_df['id'] != correct_scac['id']]['carrier_name'].tolist()
-        else:
-            other_carriers = scacs_df[scacs_df['id'] != correct_scac['id']]['carrier_name'].tolist()
-        
-        wrong_answers = random.sample(other_carriers, min(3, len(other_carriers)))
+        # If not enough unique carriers, fall back to all others
+        if len(bank) - len(same_details) < 3:
+            same_details = [i]
+        wrong_answers = [bank.carrier_names[j] for j in bank.sample_indices(3, same_details)]
         
-        choices = [correct_scac['carrier_name']] + wrong_answers
+        choices = [carrier_name] + wrong_answers
         random.shuffle(choices)
         
         return {
@@ -452,11 +1825,137 @@ def generate_question(scacs_df):
             'is_bonus': True,
             'question': question_text,
             'choices': choices,
-            'correct_answer': correct_scac['carrier_name'],
-            'scac_id': correct_scac['id'],
+            'correct_answer': carrier_name,
+            'scac_id': scac_id,
             'hint': hint_text
         }
 
+# Question prefetch: GameSession generates the next few questions in the background
+# while the player reads feedback, so "Next Question" only pops a queue
+QUESTION_PREFETCH_SIZE = 3
+
+@st.cache_resource
+def _prefetch_executor():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix='question-prefetch')
+
+def _generate_questions(bank, used_ids, count):
+    used = set(used_ids)
+    questions = []
+    for _ in range(count):
+        question = generate_question(bank, used)
+        if question is None:
+            break
+        questions.append(question)
+        used.add(question['scac_id'])
+    return questions
+
+# Spaced repetition: Leitner boxes 1-5 per player and SCAC. A correct answer
+# moves a card up a box, a wrong one sends it back to box 1; higher boxes
+# come due later. Box 0 means the player has not seen the card yet.
+LEITNER_INTERVALS = (0, 10 * 60, 24 * 3600, 3 * 24 * 3600, 7 * 24 * 3600, 21 * 24 * 3600)  # Seconds, by box
+LEITNER_MAX_BOX = len(LEITNER_INTERVALS) - 1
+
+def load_mastery(player_name):
+    """{scac_id: (box, due_at, correct_count, wrong_count)} for one player"""
+    rows = get_connection().execute("""SELECT scac_id, box, due_at, correct_count, wrong_count
+                                       FROM scac_mastery WHERE Player = ?""", (player_name,))
+    return {scac_id: (box, due_at, correct, wrong) for scac_id, box, due_at, correct, wrong in rows}
+
+class LeitnerScheduler:
+    """Picks the next card for one player: due reviews first, weakest first, then unseen cards.
+
+    Seen cards sit in a heap keyed by due time; once due they move to a second
+    heap keyed by weakness (box, then miss rate), so each pick and each
+    recorded answer is O(log n). Stale heap entries are skipped lazily. Works
+    on SCAC ids, so it survives catalog reloads, and needs no Streamlit.
+    """
+
+    def __init__(self, scac_ids, mastery=None, now=None, rng=random):
+        now = time.time() if now is None else now
+        mastery = mastery or {}
+        self.cards = {}  # scac_id -> [box, due_at, correct, wrong]
+        self.waiting = []  # (due_at, scac_id) not yet due
+        self.due = []  # (box, -miss_rate, due_at, scac_id) due now
+        self.unseen = []
+        for scac_id in scac_ids:
+            if scac_id in mastery:
+                box, due_at, correct, wrong = mastery[scac_id]
+                self.cards[scac_id] = [box, due_at, correct, wrong]
+                self.waiting.append((due_at, scac_id))
+            else:
+                self.unseen.append(scac_id)
+        heapq.heapify(self.waiting)
+        rng.shuffle(self.unseen)
+        self._release(now)
+
+    def _release(self, now):
+        # Move cards whose time has come from the waiting heap to the due heap
+        while self.waiting and self.waiting[0][0] <= now:
+            due_at, scac_id = heapq.heappop(self.waiting)
+            card = self.cards.get(scac_id)
+            if card is None or card[1] != due_at:
+                continue  # Superseded by a later answer
+            box, _, correct, wrong = card
+            heapq.heappush(self.due, (box, -wrong / max(1, correct + wrong), due_at, scac_id))
+
+    def next_card(self, excluded=(), now=None):
+        """SCAC id to ask next, skipping ids in excluded; None when nothing is left.
+
+        Due reviews come first, then unseen cards; once both run out the
+        earliest waiting card is brought forward. The card stays scheduled
+        until record() is called for it.
+        """
+        self._release(time.time() if now is None else now)
+        scac_id = self._peek(self.due, excluded, due_at_position=2)
+        if scac_id is None:
+            scac_id = self._next_unseen(excluded)
+        if scac_id is None:
+            scac_id = self._peek(self.waiting, excluded, due_at_position=0)
+        return scac_id
+
+    def _peek(self, heap, excluded, due_at_position):
+        skipped = []
+        picked = None
+        while heap:
+            entry = heap[0]
+            scac_id = entry[-1]
+            card = self.cards.get(scac_id)
+            if card is None or card[1] != entry[due_at_position]:
+                heapq.heappop(heap)  # Stale entry
+            elif scac_id in excluded:
+                skipped.append(heapq.heappop(heap))
+            else:
+                picked = scac_id
+                break
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return picked
+
+    def _next_unseen(self, excluded):
+        skipped = []
+        picked = None
+        while self.unseen:
+            scac_id = self.unseen.pop()
+            if scac_id in self.cards:
+                continue  # Answered since the scheduler was built
+            if scac_id in excluded:
+                skipped.append(scac_id)
+                continue
+            picked = scac_id
+            self.unseen.append(scac_id)  # Unseen until answered
+            break
+        self.unseen.extend(skipped)
+        return picked
+
+    def record(self, scac_id, is_correct, now=None):
+        """Apply one answer (the same rule _record_mastery stores) and reschedule the card"""
+        now = time.time() if now is None else now
+        box, _, correct, wrong = self.cards.get(scac_id, [1, 0, 0, 0])
+        box = min(box + 1, LEITNER_MAX_BOX) if is_correct else 1
+        due_at = now + LEITNER_INTERVALS[box]
+        self.cards[scac_id] = [box, due_at, correct + bool(is_correct), wrong + (not is_correct)]
+        heapq.heappush(self.waiting, (due_at, scac_id))
+
 def calculate_score(time_taken, is_correct, is_bonus=False):
     if is_correct:
         # Base score calculation
@@ -475,80 +1974,273 @@ def calculate_score(time_taken, is_correct, is_bonus=False):
             penalty = min(50, max(10, 50 - (time_taken * 1)))
             return -int(penalty)
 
-def display_sand_timer(elapsed_time):
-    # Calculate time remaining
-    time_remaining = max(0, 60 - elapsed_time)
-    
-    # Simple display
-    st.write("⏳ Timer")
-    st.write(f"**{time_remaining:.0f} seconds left**")
-    
-    # Progress bar (remaining time)
-    progress = time_remaining / 60
-    st.progress(progress)
-    
-    # Color-coded message
-    if time_remaining > 30:
-        st.success("Plenty of time!")
-    elif time_remaining > 10:
-        st.warning("Time running out!")
-    elif time_remaining > 0:
-        st.error("Hurry up!")
-    else:
-        st.error("Time's up!")
+QUESTION_TIME_LIMIT = 60  # Seconds per question before it is auto-submitted as blank
+QUESTION_DEADLINE_GRACE = 1.0  # Seconds allowed past the deadline for the answer to reach the server
+
+class GameSession:
+    """One player's game - question flow, scoring and game over - without Streamlit.
+
+    The Streamlit page keeps one in st.session_state and only renders it, so
+    the same rules can be driven directly by load tests and benchmarks. Pass a
+    fresh QuestionBank via `bank` whenever the catalog changes; `clock` lets
+    callers simulate answer times. Each question gets a deadline that submit
+    enforces, so a late answer scores as a timeout whatever the browser
+    showed. Answers and finished games are persisted
+    through the write-behind queue; record_answers=False skips answer events.
+    With a LeitnerScheduler, cards are picked by spaced repetition instead of
+    at random.
+    """
+
+    def __init__(self, bank, player_name="", clock=time.time, record_answers=True, scheduler=None):
+        self.bank = bank
+        self.player_name = player_name
+        self.clock = clock
+        self.record_answers = record_answers
+        self.scheduler = scheduler
+        self.active = False
+        self.score = 0
+        self.correct_answers = 0
+        self.total_questions = 0
+        self.used_questions = []
+        self.current_question = None
+        self.question_start_time = None
+        self.deadline = None
+        self.answer_submitted = False
+        self.last_result = None
+        self._prefetch = None  # (catalog version, Future of a list of questions)
+
+    @property
+    def is_over(self):
+        return self.active and self.current_question is None
+
+    @profiled
+    def start(self, player_name=None):
+        """Reset the scores and deal the first question"""
+        if player_name is not None:
+            self.player_name = player_name
+        self.active = True
+        self.score = 0
+        self.correct_answers = 0
+        self.total_questions = 0
+        self.used_questions = []
+        return self.next_question()
+
+    @profiled
+    def next_question(self):
+        """Move on to the next question; None once every SCAC has been used"""
+        if self.scheduler is not None:
+            self.current_question = self._scheduled_question()
+        else:
+            self.current_question = self._pop_prefetched() or generate_question(self.bank, self.used_questions)
+        self.answer_submitted = False
+        self.last_result = None
+        if self.current_question:
+            self.question_start_time = self.clock()
+            self.deadline = self.question_start_time + QUESTION_TIME_LIMIT
+        return self.current_question
+
+    def _scheduled_question(self):
+        used = set(self.used_questions)
+        while True:
+            scac_id = self.scheduler.next_card(used, now=self.clock())
+            if scac_id is None:
+                return None
+            i = self.bank.index_by_id.get(scac_id)
+            if i is not None and self.bank.is_askable(i):
+                return generate_question(self.bank, self.used_questions, i)
+            used.add(scac_id)  # Deleted from the catalog since the scheduler was built, or incomplete
+
+    def elapsed(self):
+        return self.clock() - self.question_start_time if self.question_start_time else 0
+
+    def time_remaining(self):
+        """Seconds left until the current question's deadline"""
+        return max(0.0, self.deadline - self.clock()) if self.deadline is not None else 0.0
+
+    def time_expired(self):
+        return not self.answer_submitted and self.deadline is not None and self.clock() >= self.deadline
+
+    @profiled
+    def submit(self, user_answer, timed_out=False):
+        """Score an answer to the current question and return the result.
+
+        Answers arriving after the deadline (plus QUESTION_DEADLINE_GRACE), or
+        submitted with timed_out=True, score as a wrong answer at the time limit.
+        """
+        question = self.current_question
+        answered_at = self.clock()
+        time_taken = self.elapsed()
+        if self.deadline is not None and answered_at > self.deadline + QUESTION_DEADLINE_GRACE:
+            timed_out = True
+        
+        # Check if answer is correct
+        if timed_out:
+            is_correct = False
+            time_taken = QUESTION_TIME_LIMIT
+        
+        elif question['type'] == 'text':
+            is_correct = self.bank.answer_matcher(question['correct_answer']).matches(user_answer)
+        
+        elif question['type'] == 'multi_select':
+            # Handle multiple correct answers
+            correct_answers = set(question['correct_answers'])
+            user_answers = set(user_answer) if isinstance(user_answer, list) else set()
+            
+            # Check if user selected exactly the right answers
+            is_correct = user_answers == correct_answers
+            
+        else:  # multiple choice
+            is_correct = user_answer == question['correct_answer']
+        
+        # Calculate score (check if it's a bonus question)
+        points = calculate_score(time_taken, is_correct, question.get('is_bonus', False))
+        self.score += points
+        self.total_questions += 1
+        if is_correct:
+            self.correct_answers += 1
+        
+        self.last_result = {
+            'is_correct': is_correct,
+            'points': points,
+            'time_taken': time_taken,
+            'question_type': question['type'],
+            # List for multi-select, single answer otherwise
+            'correct_answer': question['correct_answers'] if question['type'] == 'multi_select' else question['correct_answer'],
+            'user_answer': user_answer,
+            'timed_out': timed_out,
+            'scac_info': self.bank.scac_info(question['scac_id']),
+        }
+        
+        if self.scheduler is not None:
+            self.scheduler.record(question['scac_id'], is_correct, now=answered_at)
+        if self.record_answers:
+            enqueue_answer_event(self.player_name, question['scac_id'], question['type'], is_correct,
+                                 time_taken, points, question.get('is_bonus', False), answered_at)
+        
+        # Mark this question as used and set answer as submitted
+        self.used_questions.append(question['scac_id'])
+        self.answer_submitted = True
+        return self.last_result
+
+    @profiled
+    def finish(self, save=True):
+        """End the game, queueing the score for saving unless save is False"""
+        if save:
+            enqueue_score(self.player_name, self.score, self.correct_answers, self.total_questions)
+        self.active = False
+        self.used_questions = []
+        self.current_question = None
+
+    def prefetch(self, executor, count=QUESTION_PREFETCH_SIZE):
+        """Start generating the next questions unless a usable batch is already queued"""
+        if self.scheduler is not None:
+            return  # The next card depends on this answer, and picking it is O(log n) anyway
+        if self._prefetch and self._prefetch[0] == self.bank.version:
+            future = self._prefetch[1]
+            if not future.done() or (future.exception() is None and future.result()):
+                return
+        used_ids = list(self.used_questions)
+        if self.current_question:
+            used_ids.append(self.current_question['scac_id'])
+        self._prefetch = (self.bank.version,
+                          executor.submit(_generate_questions, self.bank, used_ids, count))
+
+    def _pop_prefetched(self):
+        prefetch, self._prefetch = self._prefetch, None
+        if not prefetch or prefetch[0] != self.bank.version:
+            return None
+        try:
+            questions = prefetch[1].result()
+        except Exception:
+            logger.exception("Question prefetch failed; generating the question now")
+            return None
+        used = set(self.used_questions)
+        questions = [q for q in questions if q['scac_id'] not in used]
+        if not questions:
+            return None
+        # Keep the rest of the batch queued for the following questions
+        remaining = Future()
+        remaining.set_result(questions[1:])
+        self._prefetch = (prefetch[0], remaining)
+        return questions[0]
+
+def display_countdown(time_remaining, timer_id, time_limit=QUESTION_TIME_LIMIT):
+    """Question timer that counts down in the browser, without reruns.
+
+    It only displays the time left; GameSession.submit enforces the deadline.
+    timer_id keeps the element ids unique, since st.html is not iframed.
+    """
+    st.html(f"""
+    <div style="font-size: 12px; color: #ffffff; text-align: center; background: #1e1e1e;
+                border: 1px solid #444; border-radius: 8px; padding: 6px 10px;">
+        <div id="timer-label-{timer_id}"></div>
+        <div style="background: #444; border-radius: 3px; height: 6px; margin-top: 4px;">
+            <div id="timer-bar-{timer_id}" style="height: 6px; border-radius: 3px;"></div>
+        </div>
+    </div>
+    <script>
+        (() => {{
+            const limit = {time_limit}, end = Date.now() + {time_remaining * 1000:.0f};
+            const label = document.getElementById("timer-label-{timer_id}");
+            const bar = document.getElementById("timer-bar-{timer_id}");
+            function tick() {{
+                if (!label || !label.isConnected) return;  // Replaced by a rerun
+                const left = Math.max(0, (end - Date.now()) / 1000);
+                label.textContent = left > 0 ? "⏰ " + Math.ceil(left) + "s left" : "⏰ Time's up!";
+                bar.style.width = (100 * left / limit) + "%";
+                bar.style.background = left > 30 ? "#2e7d32" : left > 10 ? "#f9a825" : "#c62828";
+                if (left > 0) setTimeout(tick, 250);
+            }}
+            tick();
+        }})();
+    </script>
+    """, unsafe_allow_javascript=True)
 
 # Main app
 def main():
-    init_database()
-    initialize_game_state()
-    
-    st.title("🚚 SCAC Learning Game")
-    
-    # Sidebar for navigation
-    st.sidebar.title("Navigation")
-    page = st.sidebar.selectbox("Choose a page:", ["Play Game", "Leaderboard", "Admin Panel"])
-    
-    if page == "Play Game":
-        play_game_page()
-    elif page == "Leaderboard":
-        leaderboard_page()
-    elif page == "Admin Panel":
-        admin_page()
+    with profile_rerun() as rerun:
+        init_database_once()
+        initialize_game_state()
+        
+        st.title("🚚 SCAC Learning Game")
+        
+        # Sidebar for navigation
+        st.sidebar.title("Navigation")
+        page = st.sidebar.selectbox("Choose a page:", ["Play Game", "Leaderboard", "Admin Panel"])
+        if rerun is not None:
+            rerun['label'] = page
+        
+        if page == "Play Game":
+            play_game_page()
+        elif page == "Leaderboard":
+            leaderboard_page()
+        elif page == "Admin Panel":
+            admin_page()
 
+@profiled
 def play_game_page():
-    scacs_df = get_all_scacs()
-    if len(scacs_df) == 0:
+    bank = get_question_bank()
+    if len(bank) == 0:
         st.error("No SCAC data available. Please add some data in the Admin Panel first.")
         return
     
+    game = st.session_state.game
+    game.bank = bank  # Pick up catalog changes between reruns
+    
     # Only show header and name input when game is not active
-    if not st.session_state.game_active:
+    if not game.active:
         st.header("🚚 Flash Card Game")
         st.write("Test your knowledge of SCACs, carriers, and ship modes!")
         
-        # player_name name input
-        if 'player_name' not in st.session_state:
-            st.session_state.player_name = ""
-        
         player_name = st.text_input("Enter your name:", value=st.session_state.player_name)
         st.session_state.player_name = player_name
-    
-    if not st.session_state.game_active:
+        adaptive = st.checkbox("🧠 Adaptive practice (review the SCACs you miss first)", key="adaptive_practice")
+        
         col1, col2 = st.columns([1, 3])
         with col1:
             if st.button("🎮 Start Game", disabled=not player_name):
-                # Reset everything for new game
-                st.session_state.game_active = True
-                st.session_state.score = 0
-                st.session_state.correct_answers = 0
-                st.session_state.total_questions = 0
-                st.session_state.used_questions = []
-                st.session_state.answer_submitted = False
-                
-                # Generate first question
-                st.session_state.current_question = generate_question(scacs_df)
-                st.session_state.question_start_time = time.time()
-                
+                game.scheduler = LeitnerScheduler(bank.ids, load_mastery(player_name)) if adaptive else None
+                game.start(player_name)
                 st.rerun()
         
         with col2:
@@ -556,38 +2248,29 @@ def play_game_page():
     
     else:
         # Game is active
-        if st.session_state.current_question is None:
+        if game.is_over:
             # Game over
             st.success("🎉 Game Complete!")
-            st.write(f"**Final Score:** {st.session_state.score}")
-            st.write(f"**Correct Answers:** {st.session_state.correct_answers}/{st.session_state.total_questions}")
+            st.write(f"**Final Score:** {game.score}")
+            st.write(f"**Correct Answers:** {game.correct_answers}/{game.total_questions}")
             
             if st.button("Save Score & Play Again"):
-                save_score(st.session_state.player_name, st.session_state.score, 
-                          st.session_state.correct_answers, st.session_state.total_questions)
-                st.session_state.game_active = False
-                # Reset the used questions list for new game
-                st.session_state.used_questions = []
+                game.finish()
                 st.rerun()
             return
         
+        # Queue up the following questions while this one is on screen
+        game.prefetch(_prefetch_executor())
+        
         # Compact stats box in upper right corner
         col1, col2 = st.columns([3, 1])
         
         with col2:
-            # Get timer info
-            if st.session_state.question_start_time and not getattr(st.session_state, 'answer_submitted', False):
-                elapsed = time.time() - st.session_state.question_start_time
-                time_remaining = max(0, 60 - elapsed)
-                timer_display = f"{time_remaining:.0f}s left"
-                
-                # Auto-submit if time runs out
-                if elapsed >= 60:
-                    st.error("⏰ Time's up!")
-                    process_answer("", scacs_df)
-                    st.rerun()
-            else:
-                timer_display = f"{getattr(st.session_state, 'last_answer_time', 0):.1f}s"
+            # A rerun after the deadline (e.g. a hint) scores the question as a timeout
+            if game.time_expired():
+                st.error("⏰ Time's up!")
+                game.submit("", timed_out=True)
+                st.rerun()
             
             # Compact stats box
             st.markdown(f"""
@@ -599,24 +2282,20 @@ def play_game_page():
                 text-align: center;
                 color: #ffffff;
                 box-shadow: 0 2px 4px rgba(0,0,0,0.3);">
-                <div style="font-weight: bold; margin-bottom: 5px;">👤 {st.session_state.player_name}</div>
-                <div>🏆 Score: {st.session_state.score}</div>
-                <div>✅ Correct: {st.session_state.correct_answers}</div>
-                <div>📊 Total: {st.session_state.total_questions}</div>
-                <div>⏰ {timer_display}</div>
+                <div style="font-weight: bold; margin-bottom: 5px;">👤 {game.player_name}</div>
+                <div>🏆 Score: {game.score}</div>
+                <div>✅ Correct: {game.correct_answers}</div>
+                <div>📊 Total: {game.total_questions}</div>
             </div>
             """, unsafe_allow_html=True)
+            if game.answer_submitted:
+                st.caption(f"⏰ {game.last_result['time_taken']:.1f}s")
+            else:
+                display_countdown(game.time_remaining(), f"{id(game)}-{game.total_questions}")
         
-        # Check SCACs with details for bonus questions
-        scacs_with_details = scacs_df[
-            (scacs_df['details'].notna()) & 
-            (scacs_df['details'].str.strip() != '') & 
-            (scacs_df['details'] != 'No additional details provided')
-        ]
-    
         with col1:
             # Display question
-            question = st.session_state.current_question
+            question = game.current_question
             
             # Add bonus indicator
             if question.get('is_bonus', False):
@@ -625,16 +2304,12 @@ def play_game_page():
             
             st.subheader(question['question'])
             
-            # Initialize answer_submitted if it doesn't exist
-            if 'answer_submitted' not in st.session_state:
-                st.session_state.answer_submitted = False
-            
             # Show answer input only if answer hasn't been submitted yet
-            if not st.session_state.answer_submitted:
+            if not game.answer_submitted:
                 # Answer input based on question type
                 if question['type'] == 'text':
-                    with st.form(key=f"answer_form_{st.session_state.total_questions}"):
-                        answer = st.text_input("Your answer:", key=f"answer_{st.session_state.total_questions}")
+                    with st.form(key=f"answer_form_{game.total_questions}"):
+                        answer = st.text_input("Your answer:", key=f"answer_{game.total_questions}")
                         
                         col_a, col_b = st.columns([1, 1])
                         with col_a:
@@ -643,14 +2318,14 @@ def play_game_page():
                             hint_clicked = st.form_submit_button("Show Hint")
                         
                         if submitted and answer.strip():
-                            process_answer(answer, scacs_df)
+                            game.submit(answer)
                             st.rerun()
                         elif hint_clicked:
                             st.info(f"💡 Hint: {question['hint']}")
                 
                 elif question['type'] == 'multiple_choice':
-                    with st.form(key=f"mc_form_{st.session_state.total_questions}"):
-                        answer = st.radio("Choose your answer:", question['choices'], key=f"mc_{st.session_state.total_questions}")
+                    with st.form(key=f"mc_form_{game.total_questions}"):
+                        answer = st.radio("Choose your answer:", question['choices'], key=f"mc_{game.total_questions}")
                         
                         col_a, col_b = st.columns([1, 1])
                         with col_a:
@@ -659,13 +2334,13 @@ def play_game_page():
                             hint_clicked = st.form_submit_button("Show Hint")
                         
                         if submitted:
-                            process_answer(answer, scacs_df)
+                            game.submit(answer)
                             st.rerun()
                         elif hint_clicked:
                             st.info(f"💡 Hint: {question['hint']}")
                 
                 elif question['type'] == 'multi_select':
-                   with st.form(key=f"ms_form_{st.session_state.total_questions}"):
+                   with st.form(key=f"ms_form_{game.total_questions}"):
                         st.write("**Select ALL correct answers:**")
                         selected_answers = []
 
@@ -674,7 +2349,7 @@ def play_game_page():
 
         
                         for i, choice in enumerate(unique_choices):
-                            if st.checkbox(choice, key=f"ms_{choice}_{i}_{st.session_state.total_questions}"):
+                            if st.checkbox(choice, key=f"ms_{choice}_{i}_{game.total_questions}"):
                                 selected_answers.append(choice)
         
                         col_a, col_b = st.columns([1, 1])
@@ -684,66 +2359,68 @@ def play_game_page():
                             hint_clicked = st.form_submit_button("Show Hint")
         
                         if submitted:
-                            process_answer(selected_answers, scacs_df)
+                            game.submit(selected_answers)
                             st.rerun()
                         elif hint_clicked:
                             st.info(f"💡 Hint: {question['hint']}")
 
             else:
                 # Answer has been submitted, show results
+                result = game.last_result
 
                 # Display the result with visual indicators
-                if hasattr(st.session_state, 'last_answer_correct'):
-                    if st.session_state.last_answer_correct:
-                        st.success(f"✅ Correct! +{st.session_state.last_points} points (answered in {st.session_state.last_answer_time:.1f}s)")
+                if result['timed_out']:
+                    correct = result['correct_answer']
+                    correct = ", ".join(correct) if isinstance(correct, list) else correct
+                    st.error(f"⏰ Time's up! {result['points']} points (correct answer: {correct})")
+                elif result['is_correct']:
+                    st.success(f"✅ Correct! +{result['points']} points (answered in {result['time_taken']:.1f}s)")
+                else:
+                    # Handle different question types for wrong answers
+                    if result['question_type'] == 'multi_select':
+                        # Show detailed multi-select results
+                        user_answers = result['user_answer']
+                        correct_answers = result['correct_answer']
+                        
+                        st.error(f"❌ Wrong! {result['points']} points")
+                        
+                        # Show what they got right/wrong
+                        st.write("**Answer Breakdown:**")
+                        
+                        user_set = set(user_answers) if isinstance(user_answers, list) else set()
+                        correct_set = set(correct_answers) if isinstance(correct_answers, list) else set()
+                        
+                        # Show correctly selected
+                        correctly_selected = user_set.intersection(correct_set)
+                        if correctly_selected:
+                            st.write("✅ **Correctly selected:** " + ", ".join(sorted(correctly_selected)))
+                        
+                        # Show incorrectly selected
+                        incorrectly_selected = user_set - correct_set
+                        if incorrectly_selected:
+                            st.write("❌ **Incorrectly selected:** " + ", ".join(sorted(incorrectly_selected)))
+                        
+                        # Show missed answers
+                        missed_answers = correct_set - user_set
+                        if missed_answers:
+                            st.write("⚠️ **Missed correct answers:** " + ", ".join(sorted(missed_answers)))
+                        
+                        st.write(f"**All correct answers:** {', '.join(sorted(correct_answers))}")
+                        
                     else:
-                        # Handle different question types for wrong answers
-                        question_type = getattr(st.session_state, 'last_question_type', 'text')
+                        # Regular single answer display
+                        user_answer_display = result['user_answer']
+                        if isinstance(user_answer_display, list):
+                            user_answer_display = ", ".join(user_answer_display)
+                        elif str(user_answer_display).strip() == "":
+                            user_answer_display = "No answer"
                         
-                        if question_type == 'multi_select':
-                            # Show detailed multi-select results
-                            user_answers = getattr(st.session_state, 'last_user_answer', [])
-                            correct_answers = getattr(st.session_state, 'last_correct_answer', [])
-                            
-                            st.error(f"❌ Wrong! {st.session_state.last_points} points")
-                            
-                            # Show what they got right/wrong
-                            st.write("**Answer Breakdown:**")
-                            
-                            user_set = set(user_answers) if isinstance(user_answers, list) else set()
-                            correct_set = set(correct_answers) if isinstance(correct_answers, list) else set()
-                            
-                            # Show correctly selected
-                            correctly_selected = user_set.intersection(correct_set)
-                            if correctly_selected:
-                                st.write("✅ **Correctly selected:** " + ", ".join(sorted(correctly_selected)))
-                            
-                            # Show incorrectly selected
-                            incorrectly_selected = user_set - correct_set
-                            if incorrectly_selected:
-                                st.write("❌ **Incorrectly selected:** " + ", ".join(sorted(incorrectly_selected)))
-                            
-                            # Show missed answers
-                            missed_answers = correct_set - user_set
-                            if missed_answers:
-                                st.write("⚠️ **Missed correct answers:** " + ", ".join(sorted(missed_answers)))
-                            
-                            st.write(f"**All correct answers:** {', '.join(sorted(correct_answers))}")
-                            
-                        else:
-                            # Regular single answer display
-                            user_answer_display = getattr(st.session_state, 'last_user_answer', 'No answer')
-                            if isinstance(user_answer_display, list):
-                                user_answer_display = ", ".join(user_answer_display)
-                            elif str(user_answer_display).strip() == "":
-                                user_answer_display = "No answer (time expired)"
-                            
-                            st.error(f"❌ Wrong! {st.session_state.last_points} points (correct answer: {st.session_state.last_correct_answer}, your answer: {user_answer_display})")                
+                        st.error(f"❌ Wrong! {result['points']} points (correct answer: {result['correct_answer']}, your answer: {user_answer_display})")                
 
                 # Show SCAC details
-                if hasattr(st.session_state, 'last_scac_info'):
+                scac_info = result['scac_info']
+                if scac_info is not None:
                     with st.expander("📋 SCAC Details"):
-                        scac_info = st.session_state.last_scac_info
                         st.write(f"**SCAC:** {scac_info['scac_code']}")
                         st.write(f"**Carrier:** {scac_info['carrier_name']}")
                         st.write(f"**Ship Mode:** {scac_info['ship_mode']}")
@@ -752,173 +2429,300 @@ def play_game_page():
                 # Next question button
                 st.write("")  # Add some space
             if st.button("Next Question ➡️", use_container_width=True):
-                
-                # Reset for next question
-                st.session_state.current_question = generate_question(scacs_df)               
-                if st.session_state.current_question:
-                    st.session_state.question_start_time = time.time()
-                    st.session_state.answer_submitted = False
-                    # Clear the last answer info
-                    if hasattr(st.session_state, 'last_answer_correct'):
-                        delattr(st.session_state, 'last_answer_correct')
-                    if hasattr(st.session_state, 'last_scac_info'):
-                        delattr(st.session_state, 'last_scac_info')
-                else:
-                    st.error("DEBUG: Failed to generate next question!")
-                
+                # An empty pool ends the game on the rerun
+                game.next_question()
                 st.rerun()
 
-def process_answer(user_answer, scacs_df):
-    question = st.session_state.current_question
-    time_taken = time.time() - st.session_state.question_start_time
-    
-    # Store the answer time for display
-    st.session_state.last_answer_time = time_taken
-    
-    # Check if answer is correct
-    if question['type'] == 'text':
-        user_input = user_answer.lower().strip()
-        correct_answer = question['correct_answer'].lower().strip()
-        
-        # For text questions, check multiple validation methods
-        if len(user_input) == 0:
-            is_correct = False
-        elif user_input == correct_answer:
-            # Exact match
-            is_correct = True
-        else:
-            # Try multiple validation approaches
-            is_correct = False
-            
-            # Method 1: Remove spaces, hyphens, and check similarity
-            user_clean = user_input.replace(' ', '').replace('-', '').replace('_', '')
-            correct_clean = correct_answer.replace(' ', '').replace('-', '').replace('_', '')
-            
-            if user_clean == correct_clean:
-                is_correct = True
-            elif len(user_clean) >= 3 and user_clean in correct_clean:
-                is_correct = True
-            elif len(correct_clean) >= 3 and correct_clean in user_clean:
-                is_correct = True
-            
-            # Method 2: Check if user input matches significant parts
-            if not is_correct and len(user_input) >= 3:
-                if user_input in correct_answer or correct_answer in user_input:
-                    is_correct = True
-            
-            # Method 3: Word-based matching with enhanced logic
-            if not is_correct:
-                user_words = set(user_input.split())
-                correct_words = set(correct_answer.split())
-                
-                # Remove common words that don't matter
-                common_words = {'the', 'and', 'or', 'of', 'in', 'to', 'a', 'an', 'is', 'are', 'was', 'were', 'inc', 'llc', 'corp', 'company', 'co'}
-                user_words_clean = user_words - common_words
-                correct_words_clean = correct_words - common_words
-                
-                # Check for partial word matches (handles "tforce" vs "t-force")
-                for user_word in user_words_clean:
-                    for correct_word in correct_words_clean:
-                        # Remove hyphens and spaces for comparison
-                        user_word_clean = user_word.replace('-', '').replace('_', '')
-                        correct_word_clean = correct_word.replace('-', '').replace('_', '')
-                        
-                        if user_word_clean == correct_word_clean:
-                            is_correct = True
-                            break
-                        elif len(user_word_clean) >= 4 and user_word_clean in correct_word_clean:
-                            is_correct = True
-                            break
-                        elif len(correct_word_clean) >= 4 and correct_word_clean in user_word_clean:
-                            is_correct = True
-                            break
-                    if is_correct:
-                        break
-                
-                # If still not correct, check overall word overlap
-                if not is_correct and len(correct_words_clean) > 0:
-                    overlap = len(user_words_clean.intersection(correct_words_clean))
-                    is_correct = overlap >= len(correct_words_clean) * 0.6  # Increased threshold
-            
-            # Method 4: Fuzzy string matching for close matches
-            if not is_correct:
-                import difflib
-                similarity = difflib.SequenceMatcher(None, user_input, correct_answer).ratio()
-                if similarity >= 0.8:  # 80% similarity threshold
-                    is_correct = True
-                
-            
-    elif question['type'] == 'multi_select':
-        # Handle multiple correct answers
-        correct_answers = set(question['correct_answers'])
-        user_answers = set(user_answer) if isinstance(user_answer, list) else set()
-        
-        # Check if user selected exactly the right answers
-        is_correct = user_answers == correct_answers
-        
-    else:  # multiple choice
-        is_correct = user_answer == question['correct_answer']
-    
-    # Calculate score (check if it's a bonus question)
-    is_bonus = question.get('is_bonus', False)
-    points = calculate_score(time_taken, is_correct, is_bonus)
-    st.session_state.score += points
-    st.session_state.total_questions += 1
-    
-    # Store results for display
-    st.session_state.last_answer_correct = is_correct
-    st.session_state.last_points = points
-    st.session_state.last_question_type = question['type']  # Store question type
-    
-    # Store correct answer(s) - handle both single and multiple answers
-    if question['type'] == 'multi_select':
-        st.session_state.last_correct_answer = question['correct_answers']  # List for multi-select
-    else:
-        st.session_state.last_correct_answer = question['correct_answer']  # Single answer
-    
-    st.session_state.last_user_answer = user_answer  # Store what user actually answered    
- 
-    # Store SCAC info for display
-    scac_info = scacs_df[scacs_df['id'] == question['scac_id']].iloc[0]
-    st.session_state.last_scac_info = {
-        'scac_code': scac_info['scac_code'],
-        'carrier_name': scac_info['carrier_name'],
-        'ship_mode': scac_info['ship_mode'],
-        'details': scac_info['details']
-    }
-    
-    if is_correct:
-        st.session_state.correct_answers += 1
-    
-    # Mark this question as used and set answer as submitted
-    st.session_state.used_questions.append(question['scac_id'])
-    st.session_state.answer_submitted = True
+def leaderboard_pager(key, prefix):
+    """Current page of a leaderboard view, with the cursors of the pages visited so far.
+
+    A new search starts over at the top.
+    """
+    view = st.session_state.get(key)
+    if view is None or view['prefix'] != prefix:
+        view = st.session_state[key] = {'prefix': prefix, 'cursors': [None]}
+    page = get_leaderboard_page(view['cursors'][-1], prefix=prefix or None)
+    # Everyone on this page may since have been deleted
+    while len(page['rows']) == 0 and len(view['cursors']) > 1:
+        view['cursors'].pop()
+        page = get_leaderboard_page(view['cursors'][-1], prefix=prefix or None)
+    return view, page
+
+def leaderboard_page_buttons(view, page, key):
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("◀ Previous page", key=f"{key}_prev", disabled=len(view['cursors']) == 1):
+            view['cursors'].pop()
+            st.rerun()
+    with col2:
+        if st.button("Next page ▶", key=f"{key}_next", disabled=page['next'] is None):
+            view['cursors'].append(page['next'])
+            st.rerun()
 
+@profiled
 def leaderboard_page():
     st.header("🏆 Leaderboard")
     
-    leaderboard = get_enhanced_leaderboard()
-    if len(leaderboard) > 0:
+    player_name = st.session_state.get('player_name')
+    if player_name:
+        try:
+            standing = get_player_rank(player_name)
+        except sqlite3.Error:
+            logger.exception("Leaderboard rank for %s not loaded", player_name)
+            standing = None
+        if standing:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Your Rank", f"#{standing['rank']:,}", help=f"Out of {standing['players']:,} players")
+            col2.metric("Your Best Score", f"{standing['best_score']:,}")
+            col3.metric("Games Played", f"{standing['games_played']:,}")
+    
+    prefix = st.text_input("Search players:", placeholder="Start of a player name").strip()
+    view, page = leaderboard_pager('leaderboard_view', prefix)
+    if len(page['rows']) > 0:
         st.dataframe(
-            leaderboard,
+            page['rows'],
             column_config={
+                "rank": "Rank",
                 "Player": "Player",
                 "best_score": "Best Score",
                 "best_correct": "Best Correct",
                 "games_played": "Games Played",
                 "accuracy_pct": "Accuracy %",
                 "time_in_lead": "Time in Lead",
+                "total_lead_time": "Total Time in Lead",
                 "last_played": "Last Played"
             },
             hide_index=True
         )
+        leaderboard_page_buttons(view, page, 'leaderboard')
+    elif prefix:
+        st.info(f"No players found starting with '{prefix}'.")
     else:
         st.info("No scores yet. Play some games to see the leaderboard!")
 
-def get_similar_carriers(carrier_name, scacs_df, similarity_threshold=0.95):
-    """Find carriers with similar names"""
-    import difflib
+# Similar-carrier index
+SIMILARITY_THRESHOLD = 0.95
+
+def carrier_name_grams(carrier_name):
+    """Distinct trigrams of the lowercased name (the whole name if it is shorter)"""
+    lowered = carrier_name.lower()
+    if len(lowered) < 3:
+        return {lowered}
+    return {lowered[k:k + 3] for k in range(len(lowered) - 2)}
+
+def _similarity_probe_size(name_length, threshold=SIMILARITY_THRESHOLD):
+    """How many of a name's rarest trigrams must be probed to find every similar name.
+
+    A pair scoring at least `threshold` has at most d unmatched characters, and
+    each one breaks at most three trigram positions, so no more than 3*d of the
+    name's distinct trigrams can be missing from the other name.
+    """
+    longest_other = int(name_length * (2 - threshold) / threshold + 1e-9)
+    max_unmatched = int((1 - threshold) * (name_length + longest_other) + 1e-9)
+    return 3 * max_unmatched + 1
+
+def _is_similar_carrier(carrier_name, other_name, threshold=SIMILARITY_THRESHOLD):
+    """Same test as get_similar_carriers: does other_name show up for carrier_name?"""
+    if other_name == carrier_name:
+        return False
+    matcher = difflib.SequenceMatcher(None, carrier_name.lower(), other_name.lower())
+    # The cheap upper bounds reject most candidates before the full ratio
+    return (matcher.real_quick_ratio() >= threshold and
+            matcher.quick_ratio() >= threshold and
+            matcher.ratio() >= threshold)
+
+def _name_profile(carrier_name):
+    """(length, trigrams, character counts) of the lowercased name, for _may_be_similar"""
+    lowered = carrier_name.lower()
+    return len(lowered), carrier_name_grams(carrier_name), Counter(lowered)
+
+def _may_be_similar(profile_a, profile_b, threshold=SIMILARITY_THRESHOLD):
+    """Necessary conditions for either direction of _is_similar_carrier.
+
+    Checks the length bound, the trigram bound from _similarity_probe_size and
+    the character-count bound (difflib's quick_ratio), cheapest first.
+    """
+    length_a, grams_a, chars_a = profile_a
+    length_b, grams_b, chars_b = profile_b
+    total = length_a + length_b
+    if 2 * min(length_a, length_b) < threshold * total:
+        return False
+    max_missing = 3 * int((1 - threshold) * total + 1e-9)
+    if len(grams_a - grams_b) > max_missing or len(grams_b - grams_a) > max_missing:
+        return False
+    return 2 * sum((chars_a & chars_b).values()) >= threshold * total
+
+def _similar_pairs(carrier_name, scac_id, candidates):
+    """Directed (scac_id, similar_id) pairs between one carrier and its candidates"""
+    profile = _name_profile(carrier_name)
+    pairs = []
+    for other_id, other_name in candidates:
+        if other_id == scac_id or other_name is None:
+            continue
+        if not _may_be_similar(profile, _name_profile(other_name)):
+            continue
+        if _is_similar_carrier(carrier_name, other_name):
+            pairs.append((scac_id, other_id))
+        if _is_similar_carrier(other_name, carrier_name):
+            pairs.append((other_id, scac_id))
+    return pairs
+
+def _similarity_index_rows(catalog_rows):
+    """(gram rows, pair rows) of the similarity index for a whole catalog of (id, carrier_name) rows.
+
+    Pure computation - run it outside any write transaction.
+    """
+    ids_by_name = {}
+    for scac_id, name in catalog_rows:
+        if name is not None:
+            ids_by_name.setdefault(name, []).append(scac_id)
+    
+    # Similarity only depends on the name, so compare each distinct name once,
+    # shortest first so that the length bound is a contiguous range
+    names = sorted(ids_by_name, key=lambda name: len(name.lower()))
+    profiles = [_name_profile(name) for name in names]
+    lengths = [profile[0] for profile in profiles]
+    grams = [profile[1] for profile in profiles]
+    frequency = Counter(gram for name_grams in grams for gram in name_grams)
+    
+    # Prefix filtering: order every name's trigrams rarest first (one global
+    # order) and index only a prefix one longer than _similarity_probe_size.
+    # A similar pair then shares two trigrams within both prefixes, unless the
+    # names are so short that they may only share one.
+    prefix_postings = {}
+    prefixes = []
+    for n, name_grams in enumerate(grams):
+        ordered = sorted(name_grams, key=lambda gram: (frequency[gram], gram))
+        prefix = ordered[:_similarity_probe_size(lengths[n]) + 1]
+        prefixes.append(prefix)
+        for gram in prefix:
+            prefix_postings.setdefault(gram, []).append(n)
+    
+    pairs = set()
+    for n, name in enumerate(names):
+        # Only later (so at least as long) names within the length bound
+        end = bisect.bisect_right(lengths, int(lengths[n] * (2 - SIMILARITY_THRESHOLD) / SIMILARITY_THRESHOLD + 1e-9))
+        shared = Counter()
+        for gram in prefixes[n]:
+            posting = prefix_postings[gram]
+            shared.update(posting[bisect.bisect_right(posting, n):bisect.bisect_left(posting, end)])
+        min_shared = 2 if len(grams[n]) > _similarity_probe_size(lengths[n]) else 1
+        for m in [m for m, count in shared.items() if count >= min_shared]:
+            if not _may_be_similar(profiles[n], profiles[m]):
+                continue
+            if _is_similar_carrier(name, names[m]):
+                pairs.add((n, m))
+            if _is_similar_carrier(names[m], name):
+                pairs.add((m, n))
+    
+    gram_rows = [(gram, scac_id) for n, name_grams in enumerate(grams)
+                 for scac_id in ids_by_name[names[n]] for gram in name_grams]
+    pair_rows = sorted((scac_id, similar_id) for n, m in pairs
+                       for scac_id in ids_by_name[names[n]] for similar_id in ids_by_name[names[m]])
+    return gram_rows, pair_rows
+
+def _score_similarity(conn, scac_ids):
+    """(gram rows, pair rows) of the similarity index for the given SCACs against the rest of the catalog.
+
+    Only reads: the stored trigrams of the given SCACs may be out of date, so
+    those come from their current names instead. Deleted SCACs get no rows.
+    """
+    touched = set(scac_ids)
+    names = dict(conn.execute("SELECT id, carrier_name FROM scacs WHERE id IN (SELECT value FROM json_each(?))",
+                              (json.dumps(sorted(touched)),)))
+    touched_grams = {scac_id: carrier_name_grams(name) for scac_id, name in names.items() if name is not None}
+    gram_rows = [(gram, scac_id) for scac_id, grams in touched_grams.items() for gram in grams]
+    pairs = set()
+    for scac_id, grams in touched_grams.items():
+        carrier_name = names[scac_id]
+        # Probe only the rarest trigrams of this name; any that many are enough
+        counts = Counter({gram: 0 for gram in grams})
+        counts.update(gram for other_grams in touched_grams.values() for gram in other_grams & grams)
+        placeholders = ','.join('?' * len(grams))
+        counts.update(dict(conn.execute(f"""
+            SELECT gram, COUNT(*) FROM carrier_name_grams
+            WHERE gram IN ({placeholders}) GROUP BY gram
+        """, list(grams))))
+        probe = sorted(grams, key=lambda gram: (counts[gram], gram))[:_similarity_probe_size(len(carrier_name.lower()))]
+        
+        placeholders = ','.join('?' * len(probe))
+        candidates = conn.execute(f"""
+            SELECT id, carrier_name FROM scacs
+            WHERE id IN (SELECT scac_id FROM carrier_name_grams WHERE gram IN ({placeholders}))
+              AND id NOT IN (SELECT value FROM json_each(?))
+        """, probe + [json.dumps(sorted(touched))]).fetchall()
+        candidates.extend((other_id, names[other_id]) for other_id, other_grams in touched_grams.items()
+                          if not other_grams.isdisjoint(probe))
+        pairs.update(_similar_pairs(carrier_name, scac_id, candidates))
+    return gram_rows, sorted(pairs)
+
+def _store_similarity(conn, scac_ids, gram_rows, pair_rows):
+    """Swap computed rows into the similarity index: for the given SCACs, or all of it when scac_ids is None"""
+    if scac_ids is None:
+        conn.execute("DELETE FROM carrier_name_grams")
+        conn.execute("DELETE FROM carrier_similarity")
+    else:
+        ids = json.dumps(sorted(set(scac_ids)))
+        conn.execute("DELETE FROM carrier_name_grams WHERE scac_id IN (SELECT value FROM json_each(?))", (ids,))
+        conn.execute("""DELETE FROM carrier_similarity WHERE scac_id IN (SELECT value FROM json_each(?))
+                                                       OR similar_id IN (SELECT value FROM json_each(?))""", (ids, ids))
+    conn.executemany("INSERT INTO carrier_name_grams (gram, scac_id) VALUES (?, ?)", gram_rows)
+    conn.executemany("INSERT INTO carrier_similarity (scac_id, similar_id) VALUES (?, ?)", pair_rows)
+
+def rebuild_similarity_index(conn):
+    """Recompute the whole similarity index inside the caller's transaction (schema migrations)"""
+    _store_similarity(conn, None, *_similarity_index_rows(conn.execute("SELECT id, carrier_name FROM scacs").fetchall()))
+
+SIMILARITY_REFRESH_ATTEMPTS = 3  # Scoring passes before the last one runs under the write lock
+
+@profiled
+def refresh_similarity(scac_ids=None):
+    """Bring the similarity index up to date after SCACs were added, edited or deleted.
+
+    Rebuilds the whole index when scac_ids is None. The trigram and difflib
+    work runs on a consistent read of the catalog, outside any write
+    transaction, so scores and answers keep being saved meanwhile; the write
+    only swaps in the results. If the catalog changed in between, the scoring
+    is redone, and the final attempt holds the write lock throughout.
+    """
+    def score(conn):
+        if scac_ids is None:
+            return _similarity_index_rows(conn.execute("SELECT id, carrier_name FROM scacs").fetchall())
+        return _score_similarity(conn, scac_ids)
+    
+    def store(conn, rows):
+        _store_similarity(conn, scac_ids, *rows)
+        # Catalog snapshots carry the pairs, so every process must reload them too
+        conn.execute("UPDATE table_versions SET version = version + 1 WHERE name = 'scacs'")
+    
+    def score_and_store(conn):
+        store(conn, score(conn))
     
+    conn = get_connection()
+    if conn.in_transaction:
+        return score_and_store(conn)
+    for _ in range(SIMILARITY_REFRESH_ATTEMPTS):
+        conn.execute("BEGIN")
+        try:
+            version = _stored_catalog_version(conn)
+            rows = score(conn)
+        finally:
+            conn.execute("COMMIT")
+        
+        def store_unchanged(conn):
+            if _stored_catalog_version(conn) != version:
+                return False
+            store(conn, rows)
+            return True
+        if run_write(store_unchanged):
+            return
+    run_write(score_and_store)
+
+def get_similar_pairs():
+    return get_connection().execute("SELECT scac_id, similar_id FROM carrier_similarity").fetchall()
+
+def get_similar_carriers(carrier_name, scacs_df, similarity_threshold=SIMILARITY_THRESHOLD):
+    """Find carriers with similar names (full scan; the question bank uses the similarity index)"""
     similar_carriers = []
     for _, row in scacs_df.iterrows():
         if row['carrier_name'] != carrier_name:
@@ -929,11 +2733,12 @@ def get_similar_carriers(carrier_name, scacs_df, similarity_threshold=0.95):
     
     return similar_carriers
 
+PARENTHETICAL_RE = re.compile(r'\([^)]*\)')
+
 def clean_carrier_name(carrier_name):
     """Remove text in parentheses from carrier name"""
-    import re
     # Remove anything in parentheses and extra spaces
-    cleaned = re.sub(r'\([^)]*\)', '', carrier_name).strip()
+    cleaned = PARENTHETICAL_RE.sub('', carrier_name).strip()
     # Remove extra spaces
     cleaned = ' '.join(cleaned.split())
     return cleaned
@@ -942,6 +2747,7 @@ def has_parenthetical_text(carrier_name):
     """Check if carrier name contains parentheses"""
     return '(' in carrier_name and ')' in carrier_name
 
+@profiled
 def admin_page():
     if 'admin_authenticated' not in st.session_state:
         st.session_state.admin_authenticated = False
@@ -991,7 +2797,7 @@ def admin_page():
     # Add admin notice
     st.info("🔒 **Admin Instructions:** Add and manage your SCAC data here. The data will only exist in the app, not in the public code.")
     
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Add New SCAC", "View All SCACs", "Edit SCAC", "Manage Data", "Debug Queries", "Import/Export"])
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["Add New SCAC", "View All SCACs", "Edit SCAC", "Manage Data", "Debug Queries", "Import/Export", "Profiling"])
 
     with tab1:
         st.subheader("Add New SCAC")
@@ -1101,10 +2907,11 @@ def admin_page():
         
         with col2:
             st.write("### Leaderboard Management")
-            leaderboard_df = get_leaderboard()
-            if len(leaderboard_df) > 0:
+            prefix = st.text_input("Find user:", placeholder="Start of a player name").strip()
+            view, page = leaderboard_pager('manage_users_view', prefix)
+            if len(page['rows']) > 0:
                 st.write("**Delete Individual Users:**")
-                for _, row in leaderboard_df.iterrows():
+                for _, row in page['rows'].iterrows():
                     user_col1, user_col2 = st.columns([3, 1])
                     with user_col1:
                         st.write(f"{row['Player']} - Score: {row['best_score']}")
@@ -1112,36 +2919,14 @@ def admin_page():
                         if st.button("Delete", key=f"del_user_{row['Player']}"):
                             delete_leaderboard_user(row['Player'])
                             st.rerun()
+                leaderboard_page_buttons(view, page, 'manage_users')
+            elif prefix:
+                st.info(f"No users found starting with '{prefix}'.")
             else:
                 st.info("No users in leaderboard to delete.")
 
     with tab5:
-        st.subheader("Debug Queries")
-        st.info("Run custom queries to debug issues.")
-    
-        st.write("**Database Tables:**")
-        conn = sqlite3.connect('scac_game.db')
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA table_info(scores)")
-        columns = cursor.fetchall()
-        conn.close()
-        st.write("Scores table columns:", columns)
-    
-        query_code = st.text_area("Enter your query:", 
-                             placeholder="Example: scacs_df[scacs_df['carrier_name'].str.contains('RXO', case=False, na=False)][['carrier_name', 'ship_mode']]",
-                             height=100)
-
-        if st.button("Run Query"):
-            if query_code.strip():
-                try:
-                    scacs_df = get_all_scacs()
-                    result = eval(query_code)
-                    st.write("**Query Result:**")
-                    st.write(result)
-                except Exception as e:
-                    st.error(f"Query error: {str(e)}")
-            else:
-                st.warning("Please enter a query to run.")
+        show_sql_console()
 
     with tab6:
         st.subheader("Import/Export Data")
@@ -1152,29 +2937,31 @@ def admin_page():
         with col1:
             st.write("### SCAC Database")
             
-            # Export SCAC data
-            if st.button("📤 Export SCAC Data to CSV"):
-                scacs_df = get_all_scacs()
-                if len(scacs_df) > 0:
-                    csv = scacs_df.to_csv(index=False)
-                    st.download_button(
-                        label="Download SCAC Data",
-                        data=csv,
-                        file_name="scac_data.csv",
-                        mime="text/csv"
-                    )
-                else:
-                    st.warning("No SCAC data to export")
+            # Export SCAC data, generated only when the download is clicked
+            scac_format = st.radio("Export format", list(EXPORT_FORMATS), format_func=EXPORT_FORMATS.get,
+                                   horizontal=True, key="scac_export_format")
+            scac_modes = st.multiselect("Ship modes (all if empty)", get_ship_modes(), key="scac_export_modes")
+            st.download_button(
+                label="📤 Export SCAC Data",
+                data=functools.partial(export_scacs, scac_format, scac_modes),
+                file_name=f"scac_data.{scac_format}.gz",
+                mime="application/gzip"
+            )
             
             # Import SCAC data
             st.write("**Import SCAC Data:**")
-            uploaded_scac_file = st.file_uploader("Choose SCAC CSV file", type="csv", key="scac_upload")
+            if 'scac_import_report' in st.session_state:
+                show_import_report(st.session_state.pop('scac_import_report'), "SCAC")
+            uploaded_scac_file = st.file_uploader("Choose SCAC CSV or JSON Lines file", type=["csv", "jsonl", "gz"], key="scac_upload")
             if uploaded_scac_file is not None:
+                if st.button("Preview Changes"):
+                    try:
+                        show_import_report(import_scac_data(uploaded_scac_file, dry_run=True), "SCAC")
+                    except Exception as e:
+                        st.error(f"Error reading SCAC data: {str(e)}")
                 if st.button("Import SCAC Data", type="primary"):
                     try:
-                        import_df = pd.read_csv(uploaded_scac_file)
-                        success_count = import_scac_data(import_df)
-                        st.success(f"Successfully imported {success_count} SCAC records!")
+                        st.session_state.scac_import_report = import_scac_data(uploaded_scac_file)
                         st.rerun()
                     except Exception as e:
                         st.error(f"Error importing SCAC data: {str(e)}")
@@ -1182,90 +2969,567 @@ def admin_page():
         with col2:
             st.write("### Leaderboard Data")
             
-            # Export leaderboard data
-            if st.button("📤 Export Leaderboard to CSV"):
-                scores_df = get_all_scores()
-                if len(scores_df) > 0:
-                    csv = scores_df.to_csv(index=False)
-                    st.download_button(
-                        label="Download Leaderboard Data",
-                        data=csv,
-                        file_name="leaderboard_data.csv",
-                        mime="text/csv"
-                    )
-                else:
-                    st.warning("No leaderboard data to export")
+            # Export leaderboard data, generated only when the download is clicked
+            scores_format = st.radio("Export format", list(EXPORT_FORMATS), format_func=EXPORT_FORMATS.get,
+                                     horizontal=True, key="scores_export_format")
+            played_between = st.date_input("Played between (all dates if empty)", value=(), key="scores_export_dates")
+            start_date = played_between[0] if len(played_between) > 0 else None
+            end_date = played_between[1] if len(played_between) > 1 else start_date
+            st.download_button(
+                label="📤 Export Leaderboard Data",
+                data=functools.partial(export_scores, scores_format, start_date, end_date),
+                file_name=f"leaderboard_data.{scores_format}.gz",
+                mime="application/gzip"
+            )
             
             # Import leaderboard data
             st.write("**Import Leaderboard Data:**")
-            uploaded_scores_file = st.file_uploader("Choose Leaderboard CSV file", type="csv", key="scores_upload")
+            if 'scores_import_report' in st.session_state:
+                show_import_report(st.session_state.pop('scores_import_report'), "score")
+            uploaded_scores_file = st.file_uploader("Choose Leaderboard CSV or JSON Lines file", type=["csv", "jsonl", "gz"], key="scores_upload")
             if uploaded_scores_file is not None:
                 if st.button("Import Leaderboard Data", type="primary"):
                     try:
-                        import_df = pd.read_csv(uploaded_scores_file)
-                        success_count = import_scores_data(import_df)
-                        st.success(f"Successfully imported {success_count} score records!")
+                        st.session_state.scores_import_report = import_scores_data(uploaded_scores_file)
                         st.rerun()
                     except Exception as e:
                         st.error(f"Error importing leaderboard data: {str(e)}")
+        
+        export_log = get_export_log()
+        if export_log:
+            with st.expander("Recent exports"):
+                st.dataframe(pd.DataFrame(export_log[::-1]), hide_index=True)
+    
+    with tab7:
+        show_profiling_tab()
+        st.divider()
+        show_sql_stats()
 
-def get_all_scores():
-    conn = sqlite3.connect('scac_game.db')
-    df = pd.read_sql_query("SELECT * FROM scores", conn)
-    conn.close()
-    return df
+PROFILE_BUCKETS_MS = [0, 1, 5, 20, 100, 500, float('inf')]  # Latency histogram bucket edges
 
-def import_scac_data(import_df):
-    conn = sqlite3.connect('scac_game.db')
-    c = conn.cursor()
-    success_count = 0
-    error_count = 0
-    error_messages = []
+def summarize_profile(reruns):
+    """Per-function totals across the recorded reruns, slowest total first"""
+    totals = {}
+    for rerun in reruns:
+        for name, stats in rerun['functions'].items():
+            total = totals.setdefault(name, {'calls': 0, 'seconds': 0.0, 'sql': 0, 'times': []})
+            total['calls'] += stats['calls']
+            total['seconds'] += stats['seconds']
+            total['sql'] += stats['sql']
+            total['times'].extend(stats['times'])
+    rows = []
+    for name, total in totals.items():
+        times = sorted(total['times'])
+        rows.append({
+            'function': name,
+            'calls': total['calls'],
+            'total_ms': round(total['seconds'] * 1000, 1),
+            'mean_ms': round(total['seconds'] * 1000 / total['calls'], 2),
+            'p95_ms': round(times[min(len(times) - 1, int(len(times) * 0.95))] * 1000, 2),
+            'sql_per_call': round(total['sql'] / total['calls'], 1),
+        })
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True), totals
+
+def show_profiling_tab():
+    st.subheader("Rerun Profiling")
+    enabled = st.toggle("Record reruns", value=profiling_enabled(),
+                        help="Times instrumented functions and counts their SQL statements on every rerun")
+    if enabled != profiling_enabled():
+        set_profiling(enabled)
+        st.rerun()
+    if st.button("Clear recorded reruns"):
+        clear_profiled_reruns()
+        st.rerun()
     
-    for i, row in import_df.iterrows():
-        try:
-            # Check if all required columns exist
-            if all(col in row.index for col in ['scac_code', 'carrier_name', 'ship_mode']):
-                details = row.get('details', 'No additional details provided')
-                c.execute("INSERT OR REPLACE INTO scacs (scac_code, carrier_name, ship_mode, details) VALUES (?, ?, ?, ?)",
-                         (row['scac_code'], row['carrier_name'], row['ship_mode'], details))
-                success_count += 1
+    reruns = get_profiled_reruns()
+    if not reruns:
+        st.info("No reruns recorded yet. Turn recording on and use the app.")
+        return
+    
+    rows, totals = summarize_profile(reruns)
+    st.write(f"**{len(reruns)} recent reruns** (of up to {PROFILE_RERUNS} kept)")
+    st.dataframe(pd.DataFrame(rows), hide_index=True)
+    
+    function = st.selectbox("Latency histogram for", [row['function'] for row in rows])
+    times_ms = pd.Series(totals[function]['times']) * 1000
+    labels = [f"{low:g}-{high:g} ms" if high != float('inf') else f"{low:g}+ ms"
+              for low, high in zip(PROFILE_BUCKETS_MS, PROFILE_BUCKETS_MS[1:])]
+    histogram = pd.cut(times_ms, PROFILE_BUCKETS_MS, labels=labels, right=False).value_counts(sort=False)
+    st.bar_chart(histogram)
+    
+    st.write("**Slowest recent reruns:**")
+    slowest = sorted(reruns, key=lambda rerun: rerun['seconds'], reverse=True)[:10]
+    st.dataframe(pd.DataFrame([{
+        'started': rerun['started'],
+        'page': rerun['label'],
+        'total_ms': round(rerun['seconds'] * 1000, 1),
+        'sql': rerun['sql'],
+        'slowest_function': max(rerun['functions'], key=lambda name: rerun['functions'][name]['seconds'], default=''),
+    } for rerun in slowest]), hide_index=True)
+
+def show_sql_stats():
+    st.subheader("SQL Statements")
+    if not SQL_TRACE:
+        st.info("SQL tracing is off (SCAC_SQL_TRACE=0).")
+        return
+    stats = get_sql_stats()
+    st.write(f"**{len(stats)} distinct statements** since {_sql_trace_state()['since']}")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Explain slowest statements", help="Runs EXPLAIN QUERY PLAN on the 5 statements with the highest max time"):
+            explain_slowest_statements()
+            st.rerun()
+    with col2:
+        if st.button("Reset SQL stats"):
+            reset_sql_stats()
+            st.rerun()
+    if not stats:
+        return
+    
+    st.dataframe(pd.DataFrame(stats)[['statement', 'count', 'total_ms', 'mean_ms', 'max_ms', 'rows', 'rows_changed']],
+                 hide_index=True)
+    # Full scans show up as "SCAN <table>" without "USING ... INDEX"
+    for row in stats:
+        if row['plan']:
+            with st.expander(row['statement'][:120]):
+                st.code(row['plan'])
+    st.download_button("Download SQL stats (JSON)", dump_sql_stats, file_name="sql_stats.json",
+                       mime="application/json")
+
+# Bulk import settings
+IMPORT_CHUNK_SIZE = 5000
+SCAC_IMPORT_COLUMNS = ['scac_code', 'carrier_name', 'ship_mode']
+SCORE_IMPORT_COLUMNS = ['Player', 'score', 'correct_answers', 'total_questions', 'timestamp']
+MAX_IMPORT_ERRORS = 100  # Error messages kept in an import report
+SIMILARITY_REFRESH_LIMIT = 500  # Above this many changed SCACs, rebuild the similarity index instead
+
+def _iter_import_chunks(source, chunksize):
+    """Yield DataFrame chunks from a DataFrame or a CSV / JSON Lines path or uploaded file"""
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+        return
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    # Accept our own gzip exports in either format as well as plain files
+    name = str(getattr(source, 'name', source if isinstance(source, str) else ''))
+    compression = 'gzip' if name.endswith('.gz') else None
+    if name.removesuffix('.gz').endswith('.jsonl'):
+        # Values stay as written - no guessing numbers or dates from column names
+        with pd.read_json(source, lines=True, chunksize=chunksize, compression=compression,
+                          dtype=False, convert_dates=False) as reader:
+            yield from reader
+        return
+    yield from pd.read_csv(source, chunksize=chunksize, compression=compression)
+
+def _check_import_columns(chunk, required):
+    missing = [col for col in required if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {missing}")
+
+def _blank(series):
+    return series.isna() | (series.astype(str).str.strip() == '')
+
+def _new_import_report():
+    return {'inserted': 0, 'updated': 0, 'skipped': 0, 'failed': 0, 'errors': [], 'seconds': 0.0}
+
+def _report_errors(report, messages):
+    room = MAX_IMPORT_ERRORS - len(report['errors'])
+    if room > 0:
+        report['errors'].extend(messages[:room])
+
+def _skip_blank_rows(chunk, required, report):
+    """Drop rows with a blank required field, recording them as skipped"""
+    invalid = pd.Series(False, index=chunk.index)
+    for col in required:
+        blank = _blank(chunk[col])
+        if blank.any():
+            _report_errors(report, [f"Row {i}: missing {col}" for i in chunk.index[blank]])
+        invalid |= blank
+    report['skipped'] += int(invalid.sum())
+    return chunk[~invalid]
+
+@profiled
+def import_scac_data(source, chunksize=IMPORT_CHUNK_SIZE, dry_run=False):
+    """Bulk-upsert SCACs from a DataFrame, CSV or JSON Lines file, one transaction per chunk.
+
+    Each row is hashed and compared with the stored content_hash for its SCAC
+    code; only new or changed rows are written, and existing rows keep their
+    id. Returns a report with inserted (added), updated (changed), unchanged,
+    removed (in the database but not in the file - left in place), skipped and
+    failed row counts, the first error messages and the time taken. With
+    dry_run=True nothing is written and the report is the diff preview.
+    """
+    report = _new_import_report()
+    report.update({'unchanged': 0, 'removed': 0, 'dry_run': dry_run})
+    start = time.perf_counter()
+    stored_hashes = dict(get_connection().execute("SELECT scac_code, content_hash FROM scacs"))
+    original_codes = set(stored_hashes)
+    seen_codes = set()
+    touched_codes = []
+    
+    for chunk in _iter_import_chunks(source, chunksize):
+        _check_import_columns(chunk, SCAC_IMPORT_COLUMNS)
+        chunk = _skip_blank_rows(chunk, SCAC_IMPORT_COLUMNS, report)
+        if len(chunk) == 0:
+            continue
+        
+        rows = pd.DataFrame({col: chunk[col].astype(str).str.strip() for col in SCAC_IMPORT_COLUMNS})
+        if 'details' in chunk.columns:
+            rows['details'] = chunk['details'].where(~_blank(chunk['details']), NO_DETAILS_TEXT).astype(str)
+        else:
+            rows['details'] = NO_DETAILS_TEXT
+        rows['content_hash'] = [scac_content_hash(*values) for values in
+                                rows[['scac_code', 'carrier_name', 'ship_mode', 'details']].itertuples(index=False, name=None)]
+        
+        # Classify against the stored hashes (later duplicates in the file win)
+        added = changed = 0
+        write_mask = []
+        for code, content_hash in zip(rows['scac_code'], rows['content_hash']):
+            stored = stored_hashes.get(code)
+            if code not in stored_hashes:
+                added += 1
+            elif stored != content_hash:
+                changed += 1
             else:
-                missing = [col for col in ['scac_code', 'carrier_name', 'ship_mode'] if col not in row.index]
-                error_messages.append(f"Row {i}: Missing columns: {missing}")
-                error_count += 1
-        except Exception as e:
-            error_messages.append(f"Row {i}: Error: {str(e)}")
-            error_count += 1
+                report['unchanged'] += 1
+                write_mask.append(False)
+                continue
+            write_mask.append(True)
+            stored_hashes[code] = content_hash
+        seen_codes.update(rows['scac_code'])
+        to_write = rows[write_mask]
+        if dry_run or len(to_write) == 0:
+            report['inserted'] += added
+            report['updated'] += changed
+            continue
+        
+        try:
+            run_write(lambda conn: conn.executemany("""
+                INSERT INTO scacs (scac_code, carrier_name, ship_mode, details, content_hash)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (scac_code) DO UPDATE SET
+                    carrier_name = excluded.carrier_name,
+                    ship_mode = excluded.ship_mode,
+                    details = excluded.details,
+                    content_hash = excluded.content_hash
+            """, to_write.itertuples(index=False, name=None)))
+        except sqlite3.Error as e:
+            report['failed'] += len(to_write)
+            _report_errors(report, [f"Rows {to_write.index[0]}-{to_write.index[-1]}: {e}"])
+            continue
+        report['inserted'] += added
+        report['updated'] += changed
+        touched_codes.extend(to_write['scac_code'])
+    
+    report['removed'] = len(original_codes - seen_codes)
+    if touched_codes:
+        # The chunks are already committed, so the cached catalog is stale even if the refresh fails
+        try:
+            _refresh_similarity_for_codes(touched_codes)
+        finally:
+            bump_catalog_version()
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+def _refresh_similarity_for_codes(scac_codes):
+    """Update the similarity index for imported rows, rebuilding it for large imports"""
+    if len(scac_codes) > SIMILARITY_REFRESH_LIMIT:
+        refresh_similarity()
+        return
+    scac_ids = [scac_id for (scac_id,) in get_connection().execute(
+        "SELECT id FROM scacs WHERE scac_code IN (SELECT value FROM json_each(?))", (json.dumps(list(set(scac_codes))),))]
+    refresh_similarity(scac_ids)
+
+@profiled
+def import_scores_data(source, chunksize=IMPORT_CHUNK_SIZE):
+    """Bulk-import score rows from a DataFrame, CSV or JSON Lines file, one transaction per chunk.
+
+    Returns the same kind of report as import_scac_data.
+    """
+    report = _new_import_report()
+    start = time.perf_counter()
+    numeric_columns = ['score', 'correct_answers', 'total_questions']
     
-    conn.commit()
-    conn.close()
+    for chunk in _iter_import_chunks(source, chunksize):
+        _check_import_columns(chunk, SCORE_IMPORT_COLUMNS)
+        chunk = _skip_blank_rows(chunk, SCORE_IMPORT_COLUMNS, report)
+        
+        rows = pd.DataFrame({'Player': chunk['Player'].astype(str)})
+        invalid = pd.Series(False, index=chunk.index)
+        fractional = pd.Series(False, index=chunk.index)
+        for col in numeric_columns:
+            rows[col] = pd.to_numeric(chunk[col], errors='coerce')
+            invalid |= rows[col].isna()
+            # Casting to int64 would silently truncate 12.5 to 12
+            fractional |= rows[col].notna() & (rows[col] % 1 != 0)
+        fractional &= ~invalid
+        rows['timestamp'] = chunk['timestamp'].astype(str)
+        if invalid.any():
+            _report_errors(report, [f"Row {i}: non-numeric score values" for i in chunk.index[invalid]])
+        if fractional.any():
+            _report_errors(report, [f"Row {i}: non-integer score values" for i in chunk.index[fractional]])
+        invalid |= fractional
+        if invalid.any():
+            report['skipped'] += int(invalid.sum())
+            rows = rows[~invalid]
+        if len(rows) == 0:
+            continue
+        rows = rows.astype({col: 'int64' for col in numeric_columns})
+        
+        def work(conn):
+            conn.executemany(
+                "INSERT INTO scores (Player, score, correct_answers, total_questions, timestamp) VALUES (?, ?, ?, ?, ?)",
+                rows.itertuples(index=False, name=None))
+            rebuild_player_stats(conn, rows['Player'].unique().tolist())
+        try:
+            run_write(work)
+        except sqlite3.Error as e:
+            report['failed'] += len(rows)
+            _report_errors(report, [f"Rows {rows.index[0]}-{rows.index[-1]}: {e}"])
+            continue
+        report['inserted'] += len(rows)
     
-    if error_count > 0:
-        st.error(f"Encountered {error_count} errors during import")
-        for msg in error_messages[:10]:  # Show first 10 errors
+    # Imported games can land anywhere in the timeline, so replay the lead history once
+    if report['inserted']:
+        run_write(rebuild_lead_history)
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+def show_import_report(report, label):
+    written = report['inserted'] + report['updated']
+    verb = "Would import" if report.get('dry_run') else "Imported"
+    summary = f"{report['inserted']} new, {report['updated']} changed"
+    if 'unchanged' in report:
+        summary += f", {report['unchanged']} unchanged"
+    st.success(f"{verb} {written} {label} records ({summary}) in {report['seconds']:.1f}s")
+    if report.get('removed'):
+        st.info(f"{report['removed']} {label} records in the database are not in the file (they are kept)")
+    problems = report['skipped'] + report['failed']
+    if problems > 0:
+        st.error(f"{report['skipped']} rows skipped and {report['failed']} rows failed")
+        for msg in report['errors'][:10]:  # Show first 10 errors
             st.write(msg)
-        if len(error_messages) > 10:
-            st.write(f"...and {len(error_messages) - 10} more errors")
+        if problems > 10:
+            st.write(f"...and {problems - 10} more errors")
+
+# Streaming export
+EXPORT_CHUNK_SIZE = 5000  # Rows fetched from the cursor per batch
+EXPORT_FORMATS = {'csv': 'CSV', 'jsonl': 'JSON Lines'}
+
+@st.cache_resource
+def _export_log():
+    """Timing and row counts of recent exports, newest last"""
+    return deque(maxlen=20)
+
+def get_export_log():
+    return list(_export_log())
+
+def _scac_export_query(ship_modes=None):
+    query = "SELECT id, scac_code, carrier_name, ship_mode, details FROM scacs"
+    params = []
+    if ship_modes:
+        query += " WHERE ship_mode IN (SELECT value FROM json_each(?))"
+        params.append(json.dumps(list(ship_modes)))
+    return query + " ORDER BY id", params
+
+def _score_export_query(start_date=None, end_date=None):
+    query = "SELECT Player, score, correct_answers, total_questions, timestamp FROM scores"
+    conditions, params = [], []
+    # ISO timestamps sort as text, so whole-day bounds use the timestamp index
+    if start_date:
+        conditions.append("timestamp >= ?")
+        params.append(start_date.isoformat())
+    if end_date:
+        conditions.append("timestamp < ?")
+        params.append((end_date + timedelta(days=1)).isoformat())
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query + " ORDER BY id", params
+
+@profiled
+def export_query(query, params, fmt='csv', label='export'):
+    """Stream a query's rows into gzip-compressed CSV or JSON Lines bytes.
+
+    Rows are fetched from the cursor in batches and compressed as they are
+    written, so only the compressed output is ever held in full - never the
+    rows or the uncompressed text. Returns bytes, ready for st.download_button.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    start = time.perf_counter()
+    output = io.BytesIO()
+    cursor = get_connection().execute(query, params)
+    columns = [column[0] for column in cursor.description]
+    rows_written = 0
+    
+    with gzip.GzipFile(fileobj=output, mode='wb') as compressed:
+        text = io.TextIOWrapper(compressed, encoding='utf-8', newline='')
+        writer = csv.writer(text)
+        if fmt == 'csv':
+            writer.writerow(columns)
+        while True:
+            batch = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not batch:
+                break
+            if fmt == 'csv':
+                writer.writerows(batch)
+            else:
+                text.writelines(json.dumps(dict(zip(columns, row))) + '\n' for row in batch)
+            rows_written += len(batch)
+        text.flush()
+        text.detach()
     
-    return success_count
+    _export_log().append({
+        'export': label,
+        'format': fmt,
+        'rows': rows_written,
+        'bytes': output.tell(),
+        'seconds': round(time.perf_counter() - start, 3),
+        'at': datetime.now().isoformat(timespec='seconds'),
+    })
+    return output.getvalue()
 
-def import_scores_data(import_df):
-    conn = sqlite3.connect('scac_game.db')
-    c = conn.cursor()
-    success_count = 0
+def export_scacs(fmt='csv', ship_modes=None):
+    query, params = _scac_export_query(ship_modes)
+    return export_query(query, params, fmt, label='scacs')
+
+def export_scores(fmt='csv', start_date=None, end_date=None):
+    query, params = _score_export_query(start_date, end_date)
+    return export_query(query, params, fmt, label='scores')
+
+def get_ship_modes():
+    return [row[0] for row in get_connection().execute(
+        "SELECT DISTINCT ship_mode FROM scacs WHERE ship_mode IS NOT NULL ORDER BY ship_mode")]
+
+# Read-only SQL console for the Debug Queries tab
+CONSOLE_TIMEOUT = float(os.environ.get('SCAC_CONSOLE_TIMEOUT', '5'))  # Seconds before a query is interrupted
+CONSOLE_ROW_CAP = 10_000  # Rows a query may page through
+CONSOLE_PAGE_SIZE = 100
+CONSOLE_PROGRESS_STEPS = 10_000  # SQLite VM steps between timeout checks
+
+def _console_authorizer(action, *args):
+    # mode=ro already refuses writes; also keep other database files out
+    if action in (sqlite3.SQLITE_ATTACH, sqlite3.SQLITE_DETACH):
+        return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
+
+def _console_connection(deadline):
+    # as_uri() percent-encodes the path, so '?', '#' and '%' in it stay part of the file name
+    uri = pathlib.Path(DB_PATH).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=DB_BUSY_TIMEOUT)
+    conn.execute("PRAGMA query_only=ON")
+    conn.set_authorizer(_console_authorizer)
+    # A non-zero return aborts the statement with "interrupted"
+    conn.set_progress_handler(lambda: time.monotonic() > deadline, CONSOLE_PROGRESS_STEPS)
+    return conn
+
+@profiled
+def run_console_query(sql, page=0, page_size=CONSOLE_PAGE_SIZE, timeout=CONSOLE_TIMEOUT,
+                      row_cap=CONSOLE_ROW_CAP, explain=False):
+    """Run one read-only statement and return a page of its rows.
+
+    Rows are streamed from the cursor and only the requested page is kept,
+    so memory is bounded by page_size; later pages re-run the query. Raises
+    ValueError for empty or rejected queries and TimeoutError past timeout.
+    """
+    sql = sql.strip().rstrip(';').strip()
+    if not sql:
+        raise ValueError("Enter a query to run")
+    if explain:
+        sql = "EXPLAIN QUERY PLAN " + sql
+    first_row = page * page_size
+    if first_row >= row_cap:
+        raise ValueError(f"Only the first {row_cap} rows can be paged through")
+    start = time.monotonic()
+    conn = _console_connection(start + timeout)
+    try:
+        cursor = conn.execute(sql)
+        if cursor.description is None:
+            raise ValueError("Only queries that return rows can be run here")
+        columns = [column[0] for column in cursor.description]
+        # Skip to the page, then read one extra row to know if another page follows
+        skipped = 0
+        while skipped < first_row:
+            batch = cursor.fetchmany(min(page_size, first_row - skipped))
+            if not batch:
+                break
+            skipped += len(batch)
+        # The last page before the cap is cut short so no row past the cap is shown
+        take = min(page_size, row_cap - first_row)
+        rows = cursor.fetchmany(take + 1)
+    except sqlite3.OperationalError as e:
+        if str(e) == 'interrupted':
+            raise TimeoutError(f"Query stopped after {timeout:g}s") from e
+        raise ValueError(str(e)) from e
+    except sqlite3.DatabaseError as e:
+        # Includes writes refused by the read-only connection
+        raise ValueError(str(e)) from e
+    finally:
+        conn.close()
+    has_next = len(rows) > take and first_row + take < row_cap
+    return {
+        'columns': columns,
+        'rows': rows[:take],
+        'page': page,
+        'first_row': first_row,
+        'has_next': has_next,
+        'capped': len(rows) > take and not has_next,
+        'seconds': time.monotonic() - start,
+    }
+
+def show_sql_console():
+    st.subheader("Debug Queries")
+    st.info(f"Run read-only SQL against the database. Queries stop after the timeout "
+            f"and only the first {CONSOLE_ROW_CAP:,} rows can be paged through.")
     
-    for _, row in import_df.iterrows():
-        try:
-            c.execute("INSERT INTO scores (Player, score, correct_answers, total_questions, timestamp) VALUES (?, ?, ?, ?, ?)",
-                     (row['Player'], row['score'], row['correct_answers'], row['total_questions'], row['timestamp']))
-            success_count += 1
-        except Exception as e:
-            continue  # Skip problematic rows
+    with st.expander("Database tables"):
+        conn = get_connection()
+        for (table,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"):
+            columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+            st.write(f"**{table}**: {', '.join(columns)}")
     
-    conn.commit()
-    conn.close()
-    return success_count
+    query = st.text_area("Enter your query:",
+                         placeholder="Example: SELECT carrier_name, ship_mode FROM scacs WHERE carrier_name LIKE '%RXO%'",
+                         height=100)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        timeout = st.number_input("Timeout (seconds)", min_value=0.1, max_value=60.0, value=CONSOLE_TIMEOUT, step=0.5)
+    with col2:
+        page_size = st.number_input("Rows per page", min_value=10, max_value=1000, value=CONSOLE_PAGE_SIZE, step=10)
+    with col3:
+        explain = st.checkbox("Show query plan", help="Runs EXPLAIN QUERY PLAN instead of the query")
+    
+    if st.button("Run Query"):
+        st.session_state.console = {'sql': query, 'page': 0}
+    console = st.session_state.get('console')
+    if not console:
+        return
+    
+    try:
+        result = run_console_query(console['sql'], console['page'], int(page_size), timeout, explain=explain)
+    except (ValueError, TimeoutError, sqlite3.Error) as e:
+        st.error(f"Query error: {e}")
+        return
+    
+    first = result['first_row'] + 1
+    st.write(f"**Rows {first}-{first + len(result['rows']) - 1}** ({result['seconds'] * 1000:.0f} ms)"
+             if result['rows'] else "**No rows**")
+    st.dataframe(pd.DataFrame.from_records(result['rows'], columns=result['columns']), hide_index=True)
+    if result['capped']:
+        st.warning(f"Results stop at the row cap of {CONSOLE_ROW_CAP:,}")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("◀ Previous page", disabled=console['page'] == 0):
+            console['page'] -= 1
+            st.rerun()
+    with col2:
+        if st.button("Next page ▶", disabled=not result['has_next']):
+            console['page'] += 1
+            st.rerun()
 
 if __name__ == "__main__":
     main()
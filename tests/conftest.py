@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The database path is read at import time; keep the import away from any real database
+os.environ.setdefault('SCAC_DB_PATH', os.path.join(tempfile.mkdtemp(prefix='scac-tests-'), 'import.db'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scac_game
+
+
+@pytest.fixture
+def fresh_db(tmp_path):
+    """Point the app at an empty, fully migrated database for one test"""
+    previous = scac_game.DB_PATH
+    scac_game.DB_PATH = str(tmp_path / 'scac.db')
+    scac_game.init_database()
+    scac_game.bump_catalog_version()
+    yield scac_game.DB_PATH
+    scac_game.flush_writes(timeout=10)
+    scac_game.DB_PATH = previous
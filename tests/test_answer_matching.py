@@ -0,0 +1,91 @@
+"""AnswerMatcher against the text-answer rules process_answer used before the matcher was precompiled"""
+import difflib
+import random
+import string
+
+import pytest
+
+import scac_game
+from benchmarks import ANSWER_CASES
+
+def original_rules(correct, user):
+    """The text branch of the original process_answer, kept verbatim as the reference"""
+    user_input = user.lower().strip()
+    correct_answer = correct.lower().strip()
+    if len(user_input) == 0:
+        return False
+    if user_input == correct_answer:
+        return True
+    is_correct = False
+    user_clean = user_input.replace(' ', '').replace('-', '').replace('_', '')
+    correct_clean = correct_answer.replace(' ', '').replace('-', '').replace('_', '')
+    if user_clean == correct_clean:
+        is_correct = True
+    elif len(user_clean) >= 3 and user_clean in correct_clean:
+        is_correct = True
+    elif len(correct_clean) >= 3 and correct_clean in user_clean:
+        is_correct = True
+    if not is_correct and len(user_input) >= 3:
+        if user_input in correct_answer or correct_answer in user_input:
+            is_correct = True
+    if not is_correct:
+        common_words = {'the', 'and', 'or', 'of', 'in', 'to', 'a', 'an', 'is', 'are', 'was', 'were',
+                        'inc', 'llc', 'corp', 'company', 'co'}
+        user_words_clean = set(user_input.split()) - common_words
+        correct_words_clean = set(correct_answer.split()) - common_words
+        for user_word in user_words_clean:
+            for correct_word in correct_words_clean:
+                user_word_clean = user_word.replace('-', '').replace('_', '')
+                correct_word_clean = correct_word.replace('-', '').replace('_', '')
+                if user_word_clean == correct_word_clean:
+                    is_correct = True
+                    break
+                elif len(user_word_clean) >= 4 and user_word_clean in correct_word_clean:
+                    is_correct = True
+                    break
+                elif len(correct_word_clean) >= 4 and correct_word_clean in user_word_clean:
+                    is_correct = True
+                    break
+            if is_correct:
+                break
+        if not is_correct and len(correct_words_clean) > 0:
+            overlap = len(user_words_clean.intersection(correct_words_clean))
+            is_correct = overlap >= len(correct_words_clean) * 0.6
+    if not is_correct:
+        if difflib.SequenceMatcher(None, user_input, correct_answer).ratio() >= 0.8:
+            is_correct = True
+    return is_correct
+
+@pytest.mark.parametrize('correct, user, accepted', ANSWER_CASES)
+def test_answer_cases(correct, user, accepted):
+    assert original_rules(correct, user) == accepted
+    assert scac_game.AnswerMatcher(correct).matches(user) == accepted
+
+def _mangle(rng, text):
+    """A typo'd, truncated, re-spaced or unrelated answer"""
+    kind = rng.choice(['typo', 'prefix', 'word', 'spacing', 'random', 'case'])
+    if kind == 'typo' and text:
+        chars = list(text)
+        for _ in range(rng.randint(1, 3)):
+            k = rng.randrange(len(chars))
+            chars[k] = rng.choice(string.ascii_lowercase + ' -_')
+        return ''.join(chars)
+    if kind == 'prefix':
+        return text[:rng.randint(0, len(text))]
+    if kind == 'word' and text.split():
+        return rng.choice(text.split())
+    if kind == 'spacing':
+        return rng.choice([' ', '-', '_', '']).join(text.split())
+    if kind == 'case':
+        return text.upper() + rng.choice(['', ' ', ' inc', ' llc'])
+    return ''.join(rng.choices(string.ascii_lowercase + ' ', k=rng.randint(0, 12)))
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_answers_match_original_rules(seed):
+    rng = random.Random(seed)
+    answers = [correct for correct, _, _ in ANSWER_CASES]
+    for _ in range(2000):
+        correct = rng.choice(answers)
+        user = _mangle(rng, rng.choice(answers if rng.random() < 0.2 else [correct]))
+        expected = original_rules(correct, user)
+        assert scac_game.AnswerMatcher(correct).matches(user) == expected, (correct, user)
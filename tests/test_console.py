@@ -0,0 +1,59 @@
+import pytest
+
+import scac_game
+
+@pytest.mark.parametrize('name', ['plain.db', 'what?.db', 'hash#1.db', '100%20.db', 'with space.db'])
+def test_console_opens_awkward_paths(fresh_db, tmp_path, name):
+    directory = tmp_path / 'odd?dir#%41'
+    directory.mkdir()
+    scac_game.DB_PATH = str(directory / name)
+    scac_game.init_database()
+    scac_game.add_scac('ABCD', 'Alpha Freight', 'LTL', None)
+    result = scac_game.run_console_query("SELECT scac_code FROM scacs")
+    assert [tuple(row) for row in result['rows']] == [('ABCD',)]
+    # The query read the real database rather than creating a truncated name next to it
+    assert sorted(p.name for p in directory.iterdir() if p.suffix == '.db') == [name]
+
+
+def test_console_stops_long_queries(fresh_db):
+    endless = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT max(i) FROM n"
+    with pytest.raises(TimeoutError):
+        scac_game.run_console_query(endless, timeout=0.2)
+
+
+def test_console_pages_stop_at_row_cap(fresh_db):
+    numbers = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n LIMIT 100) SELECT i FROM n"
+    first = scac_game.run_console_query(numbers, page_size=10, row_cap=25)
+    assert [row[0] for row in first['rows']] == list(range(1, 11))
+    assert first['has_next'] and not first['capped']
+    last = scac_game.run_console_query(numbers, page=2, page_size=10, row_cap=25)
+    assert [row[0] for row in last['rows']] == list(range(21, 26))
+    assert not last['has_next'] and last['capped']
+    with pytest.raises(ValueError):
+        scac_game.run_console_query(numbers, page=3, page_size=10, row_cap=25)
+
+
+def test_console_short_result_is_not_capped(fresh_db):
+    result = scac_game.run_console_query("SELECT 1", row_cap=1)
+    assert [tuple(row) for row in result['rows']] == [(1,)]
+    assert not result['has_next'] and not result['capped']
+
+
+@pytest.mark.parametrize('sql', [
+    "INSERT INTO scacs (scac_code) VALUES ('WXYZ')",
+    "DELETE FROM scacs RETURNING scac_code",
+    "ATTACH DATABASE '{tmp}/other.db' AS other",
+    "SELECT load_extension('{tmp}/missing')",
+    "VACUUM INTO '{tmp}/copy.db'",
+    "PRAGMA query_only = OFF",
+    "SELECT 1; DELETE FROM scacs",
+    "",
+])
+def test_console_rejects_writes_and_escapes(fresh_db, tmp_path, sql):
+    scac_game.add_scac('ABCD', 'Alpha Freight', 'LTL', None)
+    with pytest.raises(ValueError):
+        scac_game.run_console_query(sql.format(tmp=tmp_path))
+    result = scac_game.run_console_query("SELECT scac_code FROM scacs")
+    assert [tuple(row) for row in result['rows']] == [('ABCD',)]
+    assert not (tmp_path / 'other.db').exists()
+    assert not (tmp_path / 'copy.db').exists()
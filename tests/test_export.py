@@ -0,0 +1,72 @@
+import functools
+import gzip
+
+import pandas as pd
+import pytest
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+import scac_game
+
+SCACS = pd.DataFrame({
+    'scac_code': ['ABCD', 'EFGH', 'IJKL'],
+    'carrier_name': ['Alpha Freight', 'Echo "Quoted" Lines, Inc.', 'India Logistics'],
+    'ship_mode': ['LTL', 'TL', 'LTL'],
+    'details': ['Regional coverage', None, 'Ships, with commas'],
+})
+SCORES = pd.DataFrame({
+    'Player': ['ann', 'bob', 'ann'],
+    'score': [120, 80, 150],
+    'correct_answers': [4, 3, 5],
+    'total_questions': [5, 5, 5],
+    'timestamp': ['2025-03-01T10:00:00', '2025-03-02T11:30:00', '2025-03-04T09:15:00'],
+})
+
+def _table(query):
+    return scac_game.get_connection().execute(query).fetchall()
+
+def _scac_rows():
+    return _table("SELECT scac_code, carrier_name, ship_mode, details FROM scacs ORDER BY scac_code")
+
+def _score_rows():
+    return _table("SELECT Player, score, correct_answers, total_questions, timestamp FROM scores ORDER BY id")
+
+@pytest.mark.parametrize('fmt', list(scac_game.EXPORT_FORMATS))
+def test_export_downloads_through_streamlit(fresh_db, fmt):
+    """Run the deferred download the way st.download_button does when it is clicked"""
+    scac_game.import_scac_data(SCACS)
+    scac_game.import_scores_data(SCORES)
+    storage = MemoryMediaFileStorage('/media')
+    manager = MediaFileManager(storage)
+    for export in (functools.partial(scac_game.export_scacs, fmt, []),
+                   functools.partial(scac_game.export_scores, fmt, None, None)):
+        file_id = manager.add_deferred(export, 'application/gzip', 'export', file_name=f"export.{fmt}.gz")
+        url = manager.execute_deferred(file_id)
+        content = storage.get_file(url.rsplit('/', 1)[-1]).content
+        assert gzip.decompress(content)
+
+@pytest.mark.parametrize('fmt', list(scac_game.EXPORT_FORMATS))
+def test_scac_export_round_trips(fresh_db, tmp_path, fmt):
+    scac_game.import_scac_data(SCACS)
+    expected = _scac_rows()
+    path = tmp_path / f"scac_data.{fmt}.gz"
+    path.write_bytes(scac_game.export_scacs(fmt))
+
+    scac_game.DB_PATH = str(tmp_path / 'restored.db')
+    scac_game.init_database()
+    report = scac_game.import_scac_data(str(path))
+    assert report['inserted'] == len(SCACS) and report['failed'] == report['skipped'] == 0
+    assert _scac_rows() == expected
+
+@pytest.mark.parametrize('fmt', list(scac_game.EXPORT_FORMATS))
+def test_score_export_round_trips(fresh_db, tmp_path, fmt):
+    scac_game.import_scores_data(SCORES)
+    expected = _score_rows()
+    path = tmp_path / f"leaderboard_data.{fmt}.gz"
+    path.write_bytes(scac_game.export_scores(fmt))
+
+    scac_game.DB_PATH = str(tmp_path / 'restored.db')
+    scac_game.init_database()
+    report = scac_game.import_scores_data(str(path))
+    assert report['inserted'] == len(SCORES) and report['failed'] == report['skipped'] == 0
+    assert _score_rows() == expected
@@ -0,0 +1,112 @@
+import concurrent.futures
+
+import pandas as pd
+
+import scac_game
+
+def _catalog(prefix, size=12):
+    return pd.DataFrame({
+        'scac_code': [f"{prefix}{i:03d}" for i in range(size)],
+        'carrier_name': [f"{prefix} Carrier {i}" for i in range(size)],
+        'ship_mode': ['LTL', 'TL'] * (size // 2),
+    })
+
+def test_catalog_change_discards_prefetched_questions(fresh_db):
+    scac_game.import_scac_data(_catalog('OLD'))
+    old_bank = scac_game.get_question_bank()
+    session = scac_game.GameSession(old_bank, 'ann', record_answers=False)
+    session.start()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        session.prefetch(executor)
+        session._prefetch[1].result(10)
+        # The catalog is replaced while the prefetched batch waits
+        for scac_id in old_bank.ids:
+            scac_game.delete_scac(scac_id)
+        scac_game.import_scac_data(_catalog('NEW'))
+        session.bank = scac_game.get_question_bank()
+        assert session.bank.version != old_bank.version
+        new_ids = set(session.bank.ids)
+        session.submit('')
+        assert session.next_question()['scac_id'] in new_ids
+        # Prefetching again builds a batch from the new bank
+        session.prefetch(executor)
+        assert session._prefetch[0] == session.bank.version
+        assert {q['scac_id'] for q in session._prefetch[1].result(10)} <= new_ids
+
+def test_failed_prefetch_is_logged_and_the_question_generated(fresh_db, caplog):
+    scac_game.import_scac_data(_catalog('OLD'))
+    session = scac_game.GameSession(scac_game.get_question_bank(), 'ann', record_answers=False)
+    session.start()
+    failed = concurrent.futures.Future()
+    failed.set_exception(RuntimeError("worker died"))
+    session._prefetch = (session.bank.version, failed)
+    session.submit('')
+    assert session.next_question() is not None
+    assert 'Question prefetch failed' in caplog.text
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def _correct_answer(question):
+    return question['correct_answers'] if question['type'] == 'multi_select' else question['correct_answer']
+
+def _timed_session(fresh_db):
+    scac_game.import_scac_data(_catalog('OLD'))
+    clock = FakeClock()
+    session = scac_game.GameSession(scac_game.get_question_bank(), 'ann', clock=clock, record_answers=False)
+    session.start()
+    return session, clock
+
+def test_each_question_gets_its_own_deadline(fresh_db):
+    session, clock = _timed_session(fresh_db)
+    limit = scac_game.QUESTION_TIME_LIMIT
+    assert session.deadline == 1000.0 + limit
+    clock.now += 15
+    assert session.time_remaining() == limit - 15 and not session.time_expired()
+    clock.now += limit
+    assert session.time_remaining() == 0.0 and session.time_expired()
+    session.submit('')
+    assert not session.time_expired()  # Answered, even if late
+    session.next_question()
+    assert session.deadline == clock.now + limit and session.time_remaining() == limit
+
+def test_answer_within_the_time_limit_scores_by_time(fresh_db):
+    session, clock = _timed_session(fresh_db)
+    clock.now += 10
+    result = session.submit(_correct_answer(session.current_question))
+    assert result['is_correct'] and not result['timed_out']
+    assert result['time_taken'] == 10 and result['points'] == scac_game.calculate_score(10, True)
+    assert session.score == result['points'] and session.correct_answers == session.total_questions == 1
+
+def test_answer_inside_the_grace_period_still_counts(fresh_db):
+    session, clock = _timed_session(fresh_db)
+    clock.now += scac_game.QUESTION_TIME_LIMIT + scac_game.QUESTION_DEADLINE_GRACE / 2
+    result = session.submit(_correct_answer(session.current_question))
+    assert result['is_correct'] and not result['timed_out']
+
+def test_late_answer_scores_as_a_timeout(fresh_db):
+    session, clock = _timed_session(fresh_db)
+    clock.now += scac_game.QUESTION_TIME_LIMIT + scac_game.QUESTION_DEADLINE_GRACE + 0.01
+    result = session.submit(_correct_answer(session.current_question))
+    assert result['timed_out'] and not result['is_correct']
+    assert result['time_taken'] == scac_game.QUESTION_TIME_LIMIT
+    assert result['points'] == scac_game.calculate_score(scac_game.QUESTION_TIME_LIMIT, False)
+    assert session.score == result['points'] < 0 and session.correct_answers == 0
+
+def test_browser_timeout_scores_as_a_timeout_even_when_early(fresh_db):
+    session, clock = _timed_session(fresh_db)
+    clock.now += 5
+    result = session.submit(_correct_answer(session.current_question), timed_out=True)
+    assert result['timed_out'] and not result['is_correct']
+    assert result['time_taken'] == scac_game.QUESTION_TIME_LIMIT
+
+def test_timed_out_bonus_question_costs_nothing(fresh_db):
+    session, clock = _timed_session(fresh_db)
+    session.current_question = dict(session.current_question, is_bonus=True)
+    clock.now += 2 * scac_game.QUESTION_TIME_LIMIT
+    result = session.submit(_correct_answer(session.current_question))
+    assert result['timed_out'] and result['points'] == 0 and session.score == 0
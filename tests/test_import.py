@@ -0,0 +1,87 @@
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+import pytest
+
+import scac_game
+
+def _catalog(size, prefix='Carrier'):
+    return pd.DataFrame({
+        'scac_code': [f"C{i:04d}" for i in range(size)],
+        'carrier_name': [f"{prefix} Freight Lines {i}" for i in range(size)],
+        'ship_mode': ['LTL'] * size,
+    })
+
+@pytest.mark.parametrize('size', [5, 40])
+def test_import_scores_similarity_outside_the_write_lock(fresh_db, monkeypatch, size):
+    # 5 rows take the incremental refresh, 40 the full rebuild
+    monkeypatch.setattr(scac_game, 'SIMILARITY_REFRESH_LIMIT', 20)
+    scores = []
+    def scorer(original):
+        def score_while_writing(*args):
+            with closing(sqlite3.connect(scac_game.DB_PATH, timeout=0)) as other:
+                other.execute("BEGIN IMMEDIATE")
+                other.execute("ROLLBACK")
+            scores.append(original.__name__)
+            return original(*args)
+        return score_while_writing
+    monkeypatch.setattr(scac_game, '_score_similarity', scorer(scac_game._score_similarity))
+    monkeypatch.setattr(scac_game, '_similarity_index_rows', scorer(scac_game._similarity_index_rows))
+    scac_game.import_scac_data(_catalog(size))
+    assert scores
+    assert scac_game.get_similar_pairs()
+
+def test_failed_similarity_refresh_still_invalidates_the_catalog(fresh_db, monkeypatch):
+    scac_game.import_scac_data(_catalog(3))
+    assert len(scac_game.get_all_scacs()) == 3
+    def fail(*args):
+        raise sqlite3.OperationalError("disk I/O error")
+    monkeypatch.setattr(scac_game, 'refresh_similarity', fail)
+    version = scac_game.get_catalog_version()
+    with pytest.raises(sqlite3.OperationalError):
+        scac_game.import_scac_data(_catalog(5, prefix='Renamed'))
+    assert scac_game.get_catalog_version() > version
+    # The rows were committed before the refresh, so the cached catalog must show them
+    assert list(scac_game.get_all_scacs()['carrier_name'][:1]) == ['Renamed Freight Lines 0']
+    assert len(scac_game.get_all_scacs()) == 5
+
+def _scores(values):
+    return pd.DataFrame({
+        'Player': [f"Player {i % 3}" for i in range(len(values))],
+        'score': values,
+        'correct_answers': [1] * len(values),
+        'total_questions': [10] * len(values),
+        'timestamp': [f"2024-01-01 00:00:{i:02d}" for i in range(len(values))],
+    })
+
+def test_import_scores_reports_skipped_rows(fresh_db):
+    data = _scores([10, 12.5, 'lots', 20, 30, float('inf')])
+    data.loc[4, 'Player'] = ' '
+    report = scac_game.import_scores_data(data, chunksize=4)
+    assert (report['inserted'], report['skipped'], report['failed']) == (2, 4, 0)
+    assert report['errors'] == [
+        "Row 2: non-numeric score values",
+        "Row 1: non-integer score values",
+        "Row 4: missing Player",
+        "Row 5: non-integer score values",
+    ]
+    with closing(sqlite3.connect(fresh_db)) as conn:
+        assert sorted(row[0] for row in conn.execute("SELECT score FROM scores")) == [10, 20]
+
+def test_import_scores_counts_a_failed_chunk_and_keeps_going(fresh_db, monkeypatch):
+    original = scac_game.run_write
+    calls = []
+    def fail_second_chunk(work, *args, **kwargs):
+        calls.append(work)
+        if len(calls) == 2:
+            raise sqlite3.OperationalError("database is locked")
+        return original(work, *args, **kwargs)
+    monkeypatch.setattr(scac_game, 'run_write', fail_second_chunk)
+    report = scac_game.import_scores_data(_scores(list(range(10))), chunksize=4)
+    assert (report['inserted'], report['skipped'], report['failed']) == (6, 0, 4)
+    assert report['errors'] == ["Rows 4-7: database is locked"]
+    with closing(sqlite3.connect(fresh_db)) as conn:
+        assert conn.execute("SELECT count(*) FROM scores").fetchone()[0] == 6
+        # player_stats only reflects the chunks that landed
+        assert conn.execute("SELECT sum(games_played) FROM player_stats").fetchone()[0] == 6
@@ -0,0 +1,150 @@
+import random
+from datetime import datetime, timedelta
+
+import scac_game
+
+def _save(player, score, timestamp, correct=3, total=5):
+    scac_game.run_write(lambda conn: scac_game._insert_score(conn, player, score, correct, total, timestamp.isoformat()))
+
+def _lead_changes():
+    return scac_game.get_connection().execute("SELECT Player, score, lead_from FROM lead_changes ORDER BY id").fetchall()
+
+def test_saved_scores_keep_lead_history_in_step_with_rebuild(fresh_db):
+    rng = random.Random(0)
+    start = datetime(2025, 1, 1)
+    for i in range(300):
+        _save(rng.choice(['ann', 'bob', 'cat', 'dan']), rng.randint(0, 400 + i), start + timedelta(hours=i))
+    incremental = _lead_changes()
+    assert len(incremental) > 3
+    scac_game.run_write(scac_game.rebuild_lead_history)
+    assert _lead_changes() == incremental
+
+def test_rebuild_lead_history_replays_scores_in_time_order(fresh_db):
+    scac_game.import_scores_data(scac_game.pd.DataFrame({
+        'Player': ['bob', 'ann', 'cat', 'bob', 'ann'],
+        'score': [150, 100, 150, 90, 200],
+        'correct_answers': [3, 2, 3, 2, 4],
+        'total_questions': [5] * 5,
+        # Out of order on purpose: the history follows timestamps, not insertion order
+        'timestamp': ['2025-01-02', '2025-01-01', '2025-01-02T12:00', '2025-01-04', '2025-01-03'],
+    }))
+    assert _lead_changes() == [('ann', 100, '2025-01-01'), ('bob', 150, '2025-01-02'), ('ann', 200, '2025-01-03')]
+    scac_game.delete_leaderboard_user('ann')
+    assert _lead_changes() == [('bob', 150, '2025-01-02')]
+
+def test_time_in_lead_counts_only_the_current_spell(fresh_db):
+    now = datetime(2026, 10, 17)
+    _save('ann', 100, datetime(2025, 1, 1))
+    _save('bob', 150, datetime(2025, 1, 2))
+    _save('ann', 200, datetime(2025, 1, 3))
+    player, seconds = scac_game.get_current_lead(now)
+    assert player == 'ann' and round(seconds) == (now - datetime(2025, 1, 3)).total_seconds()
+    totals = scac_game.get_total_lead_seconds(now)
+    assert round(totals['ann']) == (now - datetime(2025, 1, 3) + timedelta(days=1)).total_seconds()
+    assert round(totals['bob']) == 86400
+
+def test_leaderboard_shows_time_in_lead_for_the_leader_only(fresh_db):
+    now = datetime.now()
+    _save('ann', 100, now - timedelta(days=4, minutes=30))
+    _save('bob', 150, now - timedelta(days=3, minutes=30))
+    _save('ann', 200, now - timedelta(days=2, minutes=30))
+    rows = scac_game.load_leaderboard_page()['rows'].set_index('Player')
+    assert rows.loc['ann', 'time_in_lead'] == '2d 0h'
+    assert rows.loc['ann', 'total_lead_time'] == '3d 0h'
+    assert rows.loc['bob', 'time_in_lead'] == ''
+    assert rows.loc['bob', 'total_lead_time'] == '1d 0h'
+    # Past the first page nobody is the leader
+    page = scac_game.load_leaderboard_page(limit=1)
+    second = scac_game.load_leaderboard_page(page['next'], limit=1)['rows']
+    assert list(second['time_in_lead']) == ['']
+
+def _tied_board():
+    """Players with many ties on best score, and some on when they reached it too"""
+    rng = random.Random(1)
+    start = datetime(2025, 1, 1)
+    names = [f"p{i:02d}" for i in range(40)] + ['a_b', 'axb', 'a%c', 'abc', 'A\\x', 'Abe']
+    for name in names:
+        for _ in range(rng.randint(1, 3)):
+            _save(name, rng.choice([100, 150, 150, 200]), start + timedelta(days=rng.choice([0, 0, 1, 2])))
+
+def _full_board():
+    rows = scac_game.get_connection().execute(f"SELECT Player FROM player_stats ORDER BY {scac_game.LEADERBOARD_ORDER}")
+    return [player for (player,) in rows]
+
+def _all_pages(limit, prefix=None):
+    pages, after = [], None
+    while True:
+        page = scac_game.load_leaderboard_page(after, limit=limit, prefix=prefix)
+        pages.append(page['rows'])
+        after = page['next']
+        if after is None:
+            return scac_game.pd.concat(pages, ignore_index=True)
+
+def test_keyset_pages_cover_the_board_once_despite_ties(fresh_db):
+    _tied_board()
+    board = _full_board()
+    for limit in (1, 3, 7, 100):
+        rows = _all_pages(limit)
+        assert list(rows['Player']) == board
+        assert list(rows['rank']) == list(range(1, len(board) + 1))
+
+def test_player_rank_matches_the_board(fresh_db):
+    _tied_board()
+    board = _full_board()
+    for rank, player in enumerate(board, 1):
+        standing = scac_game.get_player_rank(player)
+        assert standing['rank'] == rank and standing['players'] == len(board)
+    assert scac_game.get_player_rank('nobody') is None
+
+def test_prefix_search_matches_literally_and_ignores_case(fresh_db):
+    _tied_board()
+    board = _full_board()
+    def search(prefix):
+        rows = _all_pages(2, prefix)
+        assert list(rows['rank']) == [board.index(player) + 1 for player in rows['Player']]
+        return set(rows['Player'])
+    assert search('a_') == {'a_b'}
+    assert search('A%') == {'a%c'}
+    assert search('a\\') == {'A\\x'}
+    assert search('AB') == {'abc', 'Abe'}
+    assert search('p0') == {f"p0{i}" for i in range(10)}
+    assert search('zz') == set()
+
+def test_leaderboard_errors_are_logged(fresh_db, monkeypatch, caplog):
+    def fail(*args):
+        raise scac_game.sqlite3.OperationalError("disk I/O error")
+    monkeypatch.setattr(scac_game, 'load_leaderboard_page', fail)
+    page = scac_game.get_leaderboard_page(prefix='a')
+    assert page['next'] is None and len(page['rows']) == 0
+    assert caplog.records[-1].name == scac_game.logger.name and caplog.records[-1].exc_info
+
+def _player_stats():
+    return scac_game.get_connection().execute("""
+        SELECT Player, best_score, best_correct, games_played, ROUND(accuracy_sum, 6), accuracy_games,
+               last_played, best_score_at
+        FROM player_stats ORDER BY Player
+    """).fetchall()
+
+def test_incremental_player_stats_match_a_rebuild(fresh_db):
+    rng = random.Random(2)
+    players = ['ann', 'bob', 'cat', 'dan', 'eve']
+    start = datetime(2025, 1, 1)
+    for step in range(12):
+        for _ in range(25):
+            total = rng.choice([0, 5, 10])
+            # Out-of-order timestamps and repeated best scores exercise best_score_at
+            _save(rng.choice(players), rng.choice([0, 50, 100, 100, 150]),
+                  start + timedelta(hours=rng.randint(0, 500)), rng.randint(0, total), total)
+        if step % 4 == 1:
+            scac_game.delete_leaderboard_user(rng.choice(players))
+        if step % 4 == 3:
+            scac_game.import_scores_data(scac_game.pd.DataFrame({
+                'Player': [rng.choice(players + ['fay']) for _ in range(20)],
+                'score': [rng.choice([50, 100, 200]) for _ in range(20)],
+                'correct_answers': [3] * 20,
+                'total_questions': [5] * 20,
+                'timestamp': [(start + timedelta(hours=rng.randint(0, 500))).isoformat() for _ in range(20)],
+            }))
+        incremental = _player_stats()
+        scac_game.run_write(scac_game.rebuild_player_stats)
+        assert _player_stats() == incremental
@@ -0,0 +1,68 @@
+"""LeitnerScheduler and the scac_mastery table apply the same box rule"""
+import random
+
+import pytest
+
+import scac_game
+
+HOUR = 3600
+
+def _answer(player, scac_id, is_correct, answered_at):
+    return {'kind': 'answer', 'Player': player, 'scac_id': scac_id, 'question_type': 'carrier_from_scac',
+            'is_correct': is_correct, 'time_taken': 3.0, 'points': 10, 'is_bonus': False,
+            'timestamp': '2025-01-01T00:00:00', 'answered_at': answered_at}
+
+@pytest.mark.parametrize('batch_size', [1, 7])
+def test_record_mastery_matches_the_scheduler(fresh_db, batch_size):
+    rng = random.Random(batch_size)
+    scheduler = scac_game.LeitnerScheduler([], now=0)
+    answers = []
+    now = 1_700_000_000.0
+    for _ in range(200):
+        now += rng.choice([1, 60, HOUR, 30 * HOUR, 5 * 24 * HOUR])
+        answer = _answer('ann', rng.randint(1, 8), rng.random() < 0.7, now)
+        scheduler.record(answer['scac_id'], answer['is_correct'], now=now)
+        answers.append(answer)
+    for start in range(0, len(answers), batch_size):
+        batch = answers[start:start + batch_size]
+        scac_game.run_write(lambda conn: scac_game._write_records(conn, batch))
+    stored = scac_game.load_mastery('ann')
+    assert stored == {scac_id: tuple(card) for scac_id, card in scheduler.cards.items()}
+    assert len({box for box, _, _, _ in stored.values()}) > 1  # Cards really moved between boxes
+
+def test_scheduler_built_from_stored_mastery_picks_up_where_it_left_off(fresh_db):
+    now = 1_700_000_000.0
+    answers = [_answer('ann', 1, True, now), _answer('ann', 2, False, now), _answer('ann', 1, True, now + 1)]
+    scac_game.run_write(lambda conn: scac_game._write_records(conn, answers))
+    scheduler = scac_game.LeitnerScheduler([1, 2, 3], scac_game.load_mastery('ann'), now=now + 2)
+    assert scheduler.next_card(now=now + 2) == 3  # Nothing due yet
+    assert scheduler.next_card(excluded={3}, now=now + 10 * 60 + 1) == 2  # The miss, 10 minutes on
+
+def test_missed_card_comes_back_when_due_before_unseen_cards():
+    now = 1_000_000.0
+    scheduler = scac_game.LeitnerScheduler([1, 2, 3, 4], now=now, rng=random.Random(0))
+    first = scheduler.next_card(now=now)
+    scheduler.record(first, False, now=now)
+    # Not due yet: an unseen card comes first
+    second = scheduler.next_card(now=now + 60)
+    assert second != first
+    scheduler.record(second, True, now=now + 60)
+    # Once due the missed card beats the remaining unseen cards
+    assert scheduler.next_card(now=now + 10 * 60) == first
+    # Among due cards the lower box comes first...
+    later = now + 2 * 24 * HOUR
+    assert scheduler.next_card(now=later) == first
+    # ...then, within a box, the card missed more often
+    scheduler.record(first, True, now=later)
+    assert scheduler.cards[first][0] == scheduler.cards[second][0] == 2
+    assert scheduler.next_card(now=later + 24 * HOUR) == first
+    scheduler.record(first, True, now=later + 24 * HOUR)
+    assert scheduler.next_card(now=later + 24 * HOUR) == second
+
+def test_next_card_brings_waiting_cards_forward_once_everything_is_seen():
+    scheduler = scac_game.LeitnerScheduler([1, 2], now=0, rng=random.Random(0))
+    scheduler.record(1, True, now=0)
+    scheduler.record(2, True, now=5)
+    assert scheduler.next_card(now=10) == 1  # Earliest due first
+    assert scheduler.next_card(excluded={1}, now=10) == 2
+    assert scheduler.next_card(excluded={1, 2}, now=10) is None
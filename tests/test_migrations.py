@@ -0,0 +1,84 @@
+import sqlite3
+from contextlib import closing
+
+import scac_game
+
+def _schema(conn, kind):
+    return {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = ?", (kind,))}
+
+def test_new_database_tracks_table_versions(fresh_db):
+    conn = scac_game.get_connection()
+    assert scac_game._schema_version(conn) == len(scac_game.SCHEMA_MIGRATIONS)
+    assert 'catalog_version' not in _schema(conn, 'table')
+    assert {f"{table}_version_{event}" for table in scac_game.TRACKED_TABLES
+            for event in ('insert', 'update', 'delete')} <= _schema(conn, 'trigger')
+    before = scac_game.get_table_versions()
+    scac_game.add_scac('ABCD', 'Alpha Freight', 'LTL', None)
+    scac_game.save_score('ann', 120, 4, 5)
+    after = scac_game.get_table_versions()
+    assert after['scacs'] > before['scacs'] and after['scores'] > before['scores']
+
+# The schema the app created before migrations existed (user_version 0)
+BASELINE_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS scacs
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        scac_code TEXT UNIQUE,
+        carrier_name TEXT,
+        ship_mode TEXT,
+        details TEXT)''',
+    '''CREATE TABLE IF NOT EXISTS scores
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        player_name TEXT,
+        score INTEGER,
+        correct_answers INTEGER,
+        total_questions INTEGER,
+        timestamp DATETIME)''',
+]
+BASELINE_SCACS = [
+    ('ABCD', 'Alpha Freight Lines', 'LTL', 'Regional coverage'),
+    ('ABCE', 'Alpha Freight Line', 'TL', None),
+    ('WXYZ', 'Zulu Transport', 'SP (Small Parcel)', 'No additional details available'),
+]
+BASELINE_SCORES = [
+    ('ann', 120, 4, 5, '2025-01-01T10:00:00'),
+    ('bob', 150, 5, 5, '2025-01-02T10:00:00'),
+    ('ann', 200, 5, 5, '2025-01-03T10:00:00'),
+    ('cat', 0, 0, 0, '2025-01-04T10:00:00'),
+]
+
+def test_baseline_database_upgrades_to_the_current_schema(tmp_path, monkeypatch):
+    path = tmp_path / 'baseline.db'
+    with closing(sqlite3.connect(path)) as old:
+        for statement in BASELINE_SCHEMA:
+            old.execute(statement)
+        old.executemany("INSERT INTO scacs (scac_code, carrier_name, ship_mode, details) VALUES (?, ?, ?, ?)",
+                        BASELINE_SCACS)
+        old.executemany("""INSERT INTO scores (player_name, score, correct_answers, total_questions, timestamp)
+                           VALUES (?, ?, ?, ?, ?)""", BASELINE_SCORES)
+        old.commit()
+    monkeypatch.setattr(scac_game, 'DB_PATH', str(path))
+    conn = scac_game.get_connection()
+    assert scac_game._schema_version(conn) == 0
+    scac_game.init_database()
+    scac_game.bump_catalog_version()
+
+    assert scac_game._schema_version(conn) == len(scac_game.SCHEMA_MIGRATIONS)
+    assert [row[1] for row in conn.execute("PRAGMA table_info(scores)")] == scac_game.SCORES_COLUMNS
+    assert conn.execute("SELECT Player, score, correct_answers, total_questions, timestamp FROM scores ORDER BY id"
+                        ).fetchall() == BASELINE_SCORES
+    # Everything derived from the old rows is built during the upgrade
+    stats = conn.execute("SELECT Player, best_score, games_played FROM player_stats ORDER BY Player").fetchall()
+    assert stats == [('ann', 200, 2), ('bob', 150, 1), ('cat', 0, 1)]
+    assert conn.execute("SELECT Player, score FROM lead_changes ORDER BY id").fetchall() == [
+        ('ann', 120), ('bob', 150), ('ann', 200)]
+    assert conn.execute("SELECT COUNT(*) FROM scacs WHERE content_hash IS NULL").fetchone()[0] == 0
+    assert scac_game.get_similar_pairs()
+    assert list(scac_game.load_leaderboard_page()['rows']['Player']) == ['ann', 'bob', 'cat']
+    assert len(scac_game.get_question_bank()) == len(BASELINE_SCACS)
+
+    # Running it again changes nothing, and the upgraded database takes new games
+    schema = conn.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall()
+    scac_game.init_database()
+    assert conn.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall() == schema
+    assert scac_game.save_score('dan', 300, 5, 5)
+    assert scac_game.get_player_rank('dan')['rank'] == 1
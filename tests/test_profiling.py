@@ -0,0 +1,39 @@
+import pytest
+
+import scac_game
+
+@pytest.fixture
+def profiling(fresh_db):
+    was_enabled = scac_game.profiling_enabled()
+    scac_game.set_profiling(True)
+    scac_game.clear_profiled_reruns()
+    yield
+    scac_game.clear_profiled_reruns()
+    scac_game.set_profiling(was_enabled)
+
+def test_profiled_calls_and_sql_land_in_the_rerun(profiling):
+    with scac_game.profile_rerun('leaderboard') as rerun:
+        scac_game.get_current_lead()
+        scac_game.get_current_lead()
+    stats = rerun['functions']['get_current_lead']
+    assert stats['calls'] == 2 and len(stats['times']) == 2
+    assert stats['sql'] >= 2 and rerun['sql'] >= stats['sql']
+    assert scac_game.get_profiled_reruns() == [rerun]
+    rows, _ = scac_game.summarize_profile([rerun])
+    assert rows[0]['function'] == 'get_current_lead' and rows[0]['calls'] == 2
+
+def test_ring_buffer_keeps_only_the_latest_reruns(profiling):
+    for i in range(scac_game.PROFILE_RERUNS + 5):
+        with scac_game.profile_rerun(f"rerun {i}"):
+            scac_game.get_current_lead()
+    reruns = scac_game.get_profiled_reruns()
+    assert len(reruns) == scac_game.PROFILE_RERUNS
+    assert reruns[0]['label'] == 'rerun 5'
+    assert reruns[-1]['label'] == f"rerun {scac_game.PROFILE_RERUNS + 4}"
+
+def test_nothing_is_recorded_when_disabled(profiling):
+    scac_game.set_profiling(False)
+    with scac_game.profile_rerun('off') as rerun:
+        scac_game.get_current_lead()
+    assert rerun is None
+    assert scac_game.get_profiled_reruns() == []
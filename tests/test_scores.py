@@ -0,0 +1,35 @@
+import logging
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+import scac_game
+
+def _player_stats(player):
+    return scac_game.get_connection().execute(
+        "SELECT best_score, best_correct, games_played FROM player_stats WHERE Player = ?", (player,)).fetchone()
+
+def test_save_score_updates_player_stats(fresh_db):
+    assert scac_game.save_score('ann', 120, 4, 5)
+    assert scac_game.save_score('ann', 90, 5, 5)
+    assert _player_stats('ann') == (120, 5, 2)
+
+def test_save_score_logs_when_the_database_stays_locked(fresh_db, monkeypatch, caplog):
+    monkeypatch.setattr(scac_game, 'DB_WRITE_RETRIES', 1)
+    monkeypatch.setattr(scac_game, 'DB_RETRY_BASE_DELAY', 0)
+    scac_game.get_connection().execute("PRAGMA busy_timeout = 0")
+    with closing(sqlite3.connect(scac_game.DB_PATH)) as other:
+        other.execute("BEGIN IMMEDIATE")
+        with caplog.at_level(logging.ERROR, logger=scac_game.logger.name):
+            assert not scac_game.save_score('ann', 120, 4, 5)
+        other.execute("ROLLBACK")
+    assert 'Score for ann not saved' in caplog.text
+    assert _player_stats('ann') is None
+
+def test_save_score_raises_other_errors(fresh_db, monkeypatch):
+    def broken_insert(*args):
+        raise TypeError("bad record")
+    monkeypatch.setattr(scac_game, '_insert_score', broken_insert)
+    with pytest.raises(TypeError):
+        scac_game.save_score('ann', 120, 4, 5)
@@ -0,0 +1,136 @@
+"""The similarity index: parity with the get_similar_carriers full scan, and how it holds the write lock"""
+import random
+import sqlite3
+import string
+from contextlib import closing
+
+import pandas as pd
+import pytest
+
+import scac_game
+
+BASE_NAMES = ['Swift Transportation', 'Knight Transportation', 'Werner Enterprises', 'JB Hunt Transport',
+              'Old Dominion Freight Line', 'Estes Express Lines', 'XPO Logistics', 'FedEx Freight',
+              'Saia Motor Freight Line', 'R+L Carriers', 'UPS', 'ABF Freight System']
+
+def _variant(rng, name):
+    """The name with a few random edits, so some variants land just above or below the threshold"""
+    chars = list(name)
+    for _ in range(rng.choice([0, 0, 1, 1, 2, 3])):
+        k = rng.randrange(len(chars) + 1)
+        edit = rng.choice(['insert', 'delete', 'replace', 'case'])
+        if edit == 'insert' or not chars:
+            chars.insert(k, rng.choice(string.ascii_letters + ' '))
+        elif edit == 'delete':
+            del chars[min(k, len(chars) - 1)]
+        elif edit == 'replace':
+            chars[min(k, len(chars) - 1)] = rng.choice(string.ascii_letters)
+        else:
+            chars = [c.swapcase() if rng.random() < 0.3 else c for c in chars]
+    return ''.join(chars) or 'X'
+
+def _random_name(rng):
+    if rng.random() < 0.1:
+        return ''.join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 3)))
+    return _variant(rng, rng.choice(BASE_NAMES))
+
+def _random_catalog(rng, size, first_code=0):
+    return pd.DataFrame({
+        'scac_code': [f"S{first_code + i:04d}" for i in range(size)],
+        'carrier_name': [_random_name(rng) for _ in range(size)],
+        'ship_mode': [rng.choice(['LTL', 'TL', 'IM (Intermodal)']) for _ in range(size)],
+        'details': None,
+    })
+
+def _reference_pairs():
+    """Every (scac_id, similar_id) that get_similar_carriers reports, by scanning the whole catalog"""
+    catalog = scac_game.get_all_scacs()
+    return {(scac_id, row['id'])
+            for scac_id, name in zip(catalog['id'], catalog['carrier_name'])
+            for row in scac_game.get_similar_carriers(name, catalog)}
+
+def _assert_parity():
+    assert set(scac_game.get_similar_pairs()) == _reference_pairs()
+
+@pytest.mark.parametrize('seed', range(3))
+def test_import_matches_full_scan(fresh_db, seed):
+    scac_game.import_scac_data(_random_catalog(random.Random(seed), 150))
+    assert len(_reference_pairs()) > 100  # The catalogs really do contain near duplicates
+    _assert_parity()
+
+@pytest.mark.parametrize('seed', range(3))
+def test_large_import_rebuild_matches_full_scan(fresh_db, monkeypatch, seed):
+    monkeypatch.setattr(scac_game, 'SIMILARITY_REFRESH_LIMIT', 20)
+    rng = random.Random(seed)
+    scac_game.import_scac_data(_random_catalog(rng, 150))
+    _assert_parity()
+    # Re-import with a mix of renamed, unchanged and new rows
+    catalog = _random_catalog(rng, 180)
+    stored_names = list(scac_game.get_all_scacs()['carrier_name'])
+    for i in range(0, 150, 3):
+        catalog.at[i, 'carrier_name'] = stored_names[i]
+    scac_game.import_scac_data(catalog)
+    _assert_parity()
+
+@pytest.mark.parametrize('seed', range(3))
+def test_full_rebuild_matches_full_scan(fresh_db, seed):
+    scac_game.import_scac_data(_random_catalog(random.Random(seed), 150))
+    conn = scac_game.get_connection()
+    conn.execute("DELETE FROM carrier_similarity")
+    scac_game.refresh_similarity()
+    _assert_parity()
+    conn.execute("DELETE FROM carrier_similarity")
+    scac_game.run_write(scac_game.rebuild_similarity_index)
+    _assert_parity()
+
+@pytest.mark.parametrize('seed', range(3))
+def test_incremental_updates_match_full_scan(fresh_db, seed):
+    rng = random.Random(seed)
+    scac_game.import_scac_data(_random_catalog(rng, 80))
+    for step in range(60):
+        ids = list(scac_game.get_all_scacs()['id'])
+        action = rng.choice(['add', 'update', 'delete'])
+        if action == 'add':
+            assert scac_game.add_scac(f"N{step:03d}", _random_name(rng), 'LTL', None)
+        elif action == 'update':
+            assert scac_game.update_scac(rng.choice(ids), f"U{step:03d}", _random_name(rng), 'TL', None)
+        else:
+            scac_game.delete_scac(rng.choice(ids))
+        if step % 10 == 9:
+            _assert_parity()
+    # A small import refreshes only the rows it touched
+    scac_game.import_scac_data(_random_catalog(rng, 30, first_code=40))
+    _assert_parity()
+
+def test_scoring_runs_outside_the_write_lock(fresh_db, monkeypatch):
+    scac_game.import_scac_data(_random_catalog(random.Random(0), 60))
+    score = scac_game._similarity_index_rows
+    def score_while_writing(rows):
+        # Another connection can still take the write lock while the index is scored
+        with closing(sqlite3.connect(scac_game.DB_PATH, timeout=0)) as other:
+            other.execute("BEGIN IMMEDIATE")
+            other.execute("ROLLBACK")
+        return score(rows)
+    monkeypatch.setattr(scac_game, '_similarity_index_rows', score_while_writing)
+    scac_game.refresh_similarity()
+    _assert_parity()
+
+def test_catalog_change_during_scoring_is_rescored(fresh_db, monkeypatch):
+    scac_game.import_scac_data(_random_catalog(random.Random(1), 60))
+    catalog = scac_game.get_all_scacs()
+    score = scac_game._similarity_index_rows
+    calls = []
+    def score_then_rename(rows):
+        result = score(rows)
+        if not calls:
+            # Another process renames a carrier to a near copy of another one meanwhile
+            with closing(sqlite3.connect(scac_game.DB_PATH)) as other:
+                other.execute("UPDATE scacs SET carrier_name = ? WHERE id = ?",
+                              (catalog['carrier_name'][1].upper(), int(catalog['id'][0])))
+                other.commit()
+        calls.append(len(rows))
+        return result
+    monkeypatch.setattr(scac_game, '_similarity_index_rows', score_then_rename)
+    scac_game.refresh_similarity()
+    assert len(calls) == 2
+    _assert_parity()
@@ -0,0 +1,138 @@
+import random
+
+import pytest
+
+import scac_game
+
+ROWS = [
+    (1, 'ABCD', 'Alpha Freight', 'LTL', 'Regional coverage'),
+    (2, None, 'No Code Carrier', 'TL', None),
+    (3, 'EFGH', None, 'LTL', 'Regional coverage'),
+    (4, 'IJKL', 'India Logistics', None, 'National coverage'),
+    (5, 'MNOP', 'Mike Transport', 'SP (Small Parcel)', None),
+    (6, 'QRST', 'Quebec Lines', 'TL', ''),
+    (7, 'UVWX', 'Uniform Carriers ✓', 'IM (Intermodal)', 'Ships coast to coast'),
+    (8, 'YZAB', 'Yankee Freight', 'LTL', None),
+]
+COMPLETE_IDS = {1, 5, 6, 7, 8}
+
+def test_snapshot_round_trips_nulls():
+    snapshot = scac_game.CatalogSnapshot(scac_game._encode_catalog_snapshot(3, ROWS))
+    assert snapshot.version == 3
+    columns = snapshot.columns()
+    assert list(zip(*(columns[name] for name in scac_game.CATALOG_COLUMNS))) == ROWS
+    assert snapshot.scac_codes[1] is None and snapshot.carrier_names[2] is None
+    assert snapshot.ship_modes[3] is None and snapshot.family_keys[2] is None
+
+def test_empty_snapshot_round_trips():
+    snapshot = scac_game.CatalogSnapshot(scac_game._encode_catalog_snapshot(1, []))
+    assert len(snapshot) == 0 and snapshot.columns()['scac_code'] == []
+
+def _insert_rows(rows):
+    # Straight into the table, the way older databases and imports left them
+    scac_game.run_write(lambda conn: conn.executemany(
+        "INSERT INTO scacs (id, scac_code, carrier_name, ship_mode, details) VALUES (?, ?, ?, ?, ?)", rows))
+    scac_game.bump_catalog_version()
+
+def test_catalog_with_nulls_loads(fresh_db):
+    _insert_rows(ROWS)
+    version, snapshot = scac_game.get_catalog_snapshot()
+    assert snapshot.path is not None  # Built and mapped from its file
+    assert len(scac_game.get_all_scacs()) == len(ROWS)
+    assert scac_game.get_all_scacs()['carrier_name'].isna().sum() == 1
+
+def test_question_bank_skips_incomplete_rows(fresh_db):
+    _insert_rows(ROWS)
+    bank = scac_game.get_question_bank()
+    assert len(bank) == len(COMPLETE_IDS)
+    assert None not in bank.mode_buckets
+    assert all(bank.ids[i] in COMPLETE_IDS for bucket in bank.mode_buckets.values() for i in bucket)
+    random.seed(0)
+    for _ in range(300):
+        question = scac_game.generate_question(bank, [])
+        assert question['scac_id'] in COMPLETE_IDS
+        assert None not in question.get('choices', [])
+    # Every complete row can still be asked, one after another
+    used = []
+    while (question := scac_game.generate_question(bank, used)) is not None:
+        used.append(question['scac_id'])
+    assert set(used) == COMPLETE_IDS
+
+@pytest.mark.parametrize('adaptive', [False, True])
+def test_game_never_asks_about_incomplete_rows(fresh_db, adaptive):
+    _insert_rows(ROWS)
+    bank = scac_game.get_question_bank()
+    scheduler = scac_game.LeitnerScheduler(bank.ids) if adaptive else None
+    session = scac_game.GameSession(bank, 'tester', record_answers=False, scheduler=scheduler)
+    session.start()
+    asked = []
+    while session.current_question is not None and not session.is_over:
+        asked.append(session.current_question['scac_id'])
+        session.submit('')
+        session.next_question()
+    assert asked and set(asked) <= COMPLETE_IDS
+
+def test_snapshot_carries_similar_rows():
+    pairs = [(1, 8), (8, 1), (7, 1), (1, 5), (3, 1), (99, 1)]  # 99 is not in the catalog
+    snapshot = scac_game.CatalogSnapshot(scac_game._encode_catalog_snapshot(3, ROWS, pairs))
+    similar = {snapshot.ids[k]: [snapshot.ids[j] for j in
+                                 snapshot.similar_rows[snapshot.similar_offsets[k]:snapshot.similar_offsets[k + 1]]]
+               for k in range(len(snapshot))}
+    assert similar == {1: [5, 8], 2: [], 3: [1], 4: [], 5: [], 6: [], 7: [1], 8: [1]}
+    bank = scac_game.QuestionBank(snapshot)
+    # Row 3 (id 3) has no carrier name, so it neither gets nor appears in similar carriers
+    assert bank.similar_carriers(2) == []
+    assert [bank.ids[j] for j in bank.similar_carriers(0)] == [5, 8]
+
+def test_cold_worker_builds_the_bank_from_the_snapshot_file(fresh_db):
+    scac_game.import_scac_data(scac_game.pd.DataFrame({
+        'scac_code': ['ABCD', 'ABCE', 'WXYZ'],
+        'carrier_name': ['Alpha Freight Lines', 'Alpha Freight Line', 'Zulu Transport'],
+        'ship_mode': ['LTL', 'TL', 'LTL'],
+    }))
+    warm = scac_game.get_question_bank()
+    expected = {i: warm.similar_carriers(i) for i in range(len(warm))}
+    assert any(expected.values())
+    # A new worker process: nothing cached, the snapshot file already written
+    state = scac_game._catalog_state()
+    state['snapshot'] = None
+    state.pop('question_bank', None)
+    statements = []
+    scac_game.get_connection().set_trace_callback(statements.append)
+    try:
+        cold = scac_game.get_question_bank()
+    finally:
+        scac_game.get_connection().set_trace_callback(None)
+    assert cold is not warm
+    assert {i: cold.similar_carriers(i) for i in range(len(cold))} == expected
+    assert not [sql for sql in statements if 'FROM scacs' in sql or 'carrier_similarity' in sql]
+    # Matchers are built as questions ask for them, not up front
+    assert cold.answer_matchers == {}
+
+FAMILY_ROWS = [
+    (1, 'SWFT', 'Swift Transportation (TL)', 'TL', None),
+    (2, 'SWFL', 'Swift Transportation (LTL)', 'LTL', None),
+    (3, 'SWLY', 'Swiftly Logistics', 'IM (Intermodal)', None),
+    (4, 'ASWF', 'Air-SWIFT Express', 'Air', None),
+    (5, 'TAYL', 'Taylor Truck Lines', 'SP (Small Parcel)', None),
+    (6, 'OCNX', 'Ocean Express', 'Ocean', None),
+    (7, 'OCNY', 'Oceanic Swift Carriers', 'Ocean', None),
+]
+
+def _original_distractor_modes(rows, carrier_name):
+    """The original rule: ship modes of carriers whose name does not contain the
+    first word of the cleaned name, ignoring case"""
+    catalog = scac_game.pd.DataFrame(rows, columns=list(scac_game.CATALOG_COLUMNS))
+    first_word = scac_game.clean_carrier_name(carrier_name).split()[0]
+    others = catalog[~catalog['carrier_name'].str.contains(first_word, case=False, regex=False, na=False)]
+    return set(others['ship_mode'])
+
+def test_distractor_modes_exclude_names_containing_the_family_word():
+    bank = scac_game.QuestionBank(scac_game.CatalogSnapshot(scac_game._encode_catalog_snapshot(1, FAMILY_ROWS)))
+    # 'swift' is inside 'Swiftly' and 'Air-SWIFT' too, so IM and Air are family modes,
+    # and Ocean is still offered through Ocean Express
+    assert bank.family_keys[0] == 'swift'
+    assert bank.distractor_ship_modes('swift') == ['SP (Small Parcel)', 'Ocean']
+    assert bank.family_mode_counts('swift') == {'TL': 1, 'LTL': 1, 'IM (Intermodal)': 1, 'Air': 1, 'Ocean': 1}
+    for i, row in enumerate(FAMILY_ROWS):
+        assert set(bank.distractor_ship_modes(bank.family_keys[i])) == _original_distractor_modes(FAMILY_ROWS, row[2])
@@ -0,0 +1,41 @@
+import pytest
+
+import scac_game
+
+pytestmark = pytest.mark.skipif(not scac_game.SQL_TRACE, reason="SQL tracing is off (SCAC_SQL_TRACE=0)")
+
+@pytest.fixture
+def traced(fresh_db):
+    conn = scac_game.get_connection()
+    conn.execute("CREATE TEMP TABLE trace_probe (n INTEGER)")
+    scac_game.reset_sql_stats()
+    yield conn
+    conn.execute("DROP TABLE temp.trace_probe")
+
+def _stats(statement):
+    return next(row for row in scac_game.get_sql_stats() if row['statement'] == statement)
+
+def test_connections_are_traced(traced):
+    assert isinstance(traced, scac_game.TracedConnection)
+    assert isinstance(traced.execute("SELECT 1"), scac_game.TracedCursor)
+
+def test_statements_are_grouped_with_their_rows(traced):
+    traced.executemany("INSERT INTO trace_probe (n) VALUES (?)", ((n,) for n in range(5)))
+    for limit in (2, 3):
+        traced.execute(f"SELECT n FROM trace_probe WHERE n IN (0, 1, 2, 3) LIMIT {limit}").fetchall()
+    assert list(traced.execute("SELECT n FROM trace_probe WHERE n >= ?", (3,))) == [(3,), (4,)]
+    
+    inserted = _stats("INSERT INTO trace_probe (n) VALUES (?)")
+    assert (inserted['count'], inserted['rows_changed']) == (1, 5)
+    # Literals and IN lists are folded, so both LIMITs share one entry
+    selected = _stats("SELECT n FROM trace_probe WHERE n IN (?) LIMIT ?")
+    assert (selected['count'], selected['rows']) == (2, 5)
+    iterated = _stats("SELECT n FROM trace_probe WHERE n >= ?")
+    assert (iterated['count'], iterated['rows']) == (1, 2)
+    assert all(row['max_ms'] <= row['total_ms'] for row in (inserted, selected, iterated))
+
+def test_reset_clears_the_stats(traced):
+    traced.execute("SELECT count(*) FROM trace_probe").fetchone()
+    assert scac_game.get_sql_stats()
+    scac_game.reset_sql_stats()
+    assert scac_game.get_sql_stats() == []
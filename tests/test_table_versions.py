@@ -0,0 +1,38 @@
+"""Writes from other connections (other worker processes) invalidate this process's caches"""
+import sqlite3
+from contextlib import closing
+
+import scac_game
+
+def _other_write(sql, params=()):
+    with closing(sqlite3.connect(scac_game.DB_PATH)) as other:
+        other.execute(sql, params)
+        other.commit()
+
+def test_write_on_another_connection_reloads_the_catalog(fresh_db):
+    scac_game.add_scac('ABCD', 'Alpha Freight', 'LTL', None)
+    assert list(scac_game.get_all_scacs()['scac_code']) == ['ABCD']
+    bank = scac_game.get_question_bank()
+    _other_write("INSERT INTO scacs (scac_code, carrier_name, ship_mode) VALUES ('EFGH', 'Echo Lines', 'TL')")
+    assert list(scac_game.get_all_scacs()['scac_code']) == ['ABCD', 'EFGH']
+    assert len(scac_game.get_question_bank()) == len(bank) + 1
+    _other_write("UPDATE scacs SET carrier_name = 'Echo Lines Inc' WHERE scac_code = 'EFGH'")
+    assert 'Echo Lines Inc' in set(scac_game.get_all_scacs()['carrier_name'])
+    _other_write("DELETE FROM scacs WHERE scac_code = 'ABCD'")
+    assert list(scac_game.get_all_scacs()['scac_code']) == ['EFGH']
+
+def test_unchanged_database_keeps_the_cached_catalog(fresh_db):
+    scac_game.add_scac('ABCD', 'Alpha Freight', 'LTL', None)
+    first = scac_game.get_catalog_snapshot()
+    # A write to an untracked table moves data_version but not the scacs counter
+    _other_write("CREATE TABLE scratch (x)")
+    assert scac_game.get_catalog_snapshot() is first
+
+def test_score_on_another_connection_reloads_the_cached_leaderboard(fresh_db):
+    scac_game.save_score('ann', 120, 4, 5)
+    assert list(scac_game.get_leaderboard_page()['rows']['Player']) == ['ann']
+    # Another worker saves a game, the same way this one would
+    with closing(sqlite3.connect(scac_game.DB_PATH)) as other:
+        scac_game._insert_score(other, 'bob', 90, 3, 5, '2025-01-01T00:00:00')
+        other.commit()
+    assert list(scac_game.get_leaderboard_page()['rows']['Player']) == ['ann', 'bob']
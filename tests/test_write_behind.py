@@ -0,0 +1,135 @@
+"""The write-behind queue: batching, retries, dead letters, and the shutdown spool and replay"""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import textwrap
+import threading
+from contextlib import closing
+
+import scac_game
+
+def _scores():
+    return scac_game.get_connection().execute("SELECT Player, score FROM scores ORDER BY id").fetchall()
+
+def test_queued_scores_and_answers_are_committed(fresh_db):
+    before = scac_game.get_write_queue_stats()
+    scac_game.enqueue_score('ann', 120, 4, 5)
+    scac_game.enqueue_answer_event('ann', 1, 'carrier_from_scac', True, 2.5, 10)
+    scac_game.enqueue_score('bob', 80, 3, 5)
+    assert scac_game.flush_writes(timeout=10)
+    assert _scores() == [('ann', 120), ('bob', 80)]
+    events = scac_game.get_connection().execute("SELECT Player, scac_id, is_correct FROM answer_events").fetchall()
+    assert events == [('ann', 1, 1)]
+    after = scac_game.get_write_queue_stats()
+    assert after['written'] - before['written'] == 3 and after['pending'] == 0
+
+def test_bad_record_is_dead_lettered_without_blocking_the_queue(fresh_db):
+    before = scac_game.get_write_queue_stats()
+    scac_game.enqueue_score('ann', 120, 4, 5)
+    scac_game._enqueue_write({'kind': 'score', 'Player': 'broken'})  # No score: cannot be written
+    scac_game.enqueue_score('bob', 80, 3, 5)
+    assert scac_game.flush_writes(timeout=10)
+    scac_game.enqueue_score('cat', 95, 4, 5)
+    assert scac_game.flush_writes(timeout=10)
+    assert _scores() == [('ann', 120), ('bob', 80), ('cat', 95)]
+    with open(scac_game._dead_letter_path(), encoding='utf-8') as f:
+        dead_letters = [json.loads(line) for line in f]
+    assert [entry['record'] for entry in dead_letters] == [{'kind': 'score', 'Player': 'broken'}]
+    assert 'KeyError' in dead_letters[0]['error']
+    after = scac_game.get_write_queue_stats()
+    assert after['dead_lettered'] - before['dead_lettered'] == 1
+    assert after['failed_batches'] == before['failed_batches']
+
+def test_locked_database_is_retried_until_the_batch_commits(fresh_db, monkeypatch):
+    monkeypatch.setattr(scac_game, 'DB_BUSY_TIMEOUT', 0.01)
+    monkeypatch.setattr(scac_game, 'DB_WRITE_RETRIES', 0)
+    monkeypatch.setattr(scac_game, 'DB_RETRY_BASE_DELAY', 0.01)
+    before = scac_game.get_write_queue_stats()
+    with closing(sqlite3.connect(scac_game.DB_PATH)) as other:
+        other.execute("BEGIN IMMEDIATE")
+        scac_game.enqueue_score('ann', 120, 4, 5)
+        assert not scac_game.flush_writes(timeout=0.3)
+        other.execute("ROLLBACK")
+    assert scac_game.flush_writes(timeout=10)
+    assert _scores() == [('ann', 120)]
+    after = scac_game.get_write_queue_stats()
+    assert after['failed_batches'] > before['failed_batches']
+    assert after['dead_lettered'] == before['dead_lettered']
+
+def test_batch_committing_at_shutdown_is_not_spooled_too(fresh_db, monkeypatch):
+    state = scac_game._write_behind_state()
+    entered, release = threading.Event(), threading.Event()
+    write_records = scac_game._write_records
+    def slow_write(conn, records):
+        if not release.is_set():
+            entered.set()
+            release.wait(10)
+        return write_records(conn, records)
+    monkeypatch.setattr(scac_game, '_write_records', slow_write)
+    scac_game.enqueue_score('ann', 120, 4, 5)
+    assert entered.wait(10)  # The worker is committing ann's batch
+    scac_game.enqueue_score('bob', 80, 3, 5)
+    spooler = threading.Thread(target=scac_game._spool_pending_writes, args=(state, 0.05))
+    spooler.start()
+    try:
+        spooler.join(0.3)
+        assert spooler.is_alive()  # Waiting for the commit to finish
+        release.set()
+        spooler.join(10)
+        with open(scac_game._write_spool_path(), encoding='utf-8') as f:
+            spooled = [json.loads(line) for line in f]
+        assert [record['Player'] for record in spooled] == ['bob']
+        assert _scores() == [('ann', 120)]
+    finally:
+        release.set()
+        spooler.join(10)
+        state['stopping'] = False
+
+def test_exit_hook_is_registered_once(monkeypatch):
+    state = scac_game._write_behind_state()
+    registered = []
+    monkeypatch.setattr(scac_game.atexit, 'register', lambda *args: registered.append(args))
+    monkeypatch.setattr(scac_game, '_write_worker', lambda state: None)  # Exits at once
+    monkeypatch.setitem(state, 'worker', None)
+    monkeypatch.setitem(state, 'exit_hook', False)
+    for _ in range(3):
+        scac_game._ensure_write_worker(state)
+        state['worker'].join(10)
+    assert len(registered) == 1
+
+def _run(script, db_path):
+    env = dict(os.environ, SCAC_DB_PATH=str(db_path), SCAC_DB_BUSY_TIMEOUT='0.01', SCAC_DB_WRITE_RETRIES='0')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', textwrap.dedent(script)], cwd=root, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+def test_spooled_writes_are_replayed_once_by_the_next_process(tmp_path):
+    db_path = tmp_path / 'spool.db'
+    # The first process cannot commit (another connection holds the write lock) and stops
+    _run("""
+        import sqlite3
+        import scac_game
+        scac_game.init_database()
+        blocker = sqlite3.connect(scac_game.DB_PATH)
+        blocker.execute("BEGIN IMMEDIATE")
+        for i in range(3):
+            scac_game.enqueue_score(f"player{i}", 100 + i, 4, 5)
+        scac_game._spool_pending_writes(scac_game._write_behind_state(), timeout=0.2)
+    """, db_path)
+    with open(f"{db_path}.pending.jsonl", encoding='utf-8') as f:
+        assert len(f.readlines()) == 3
+    # The next process replays the spool when its worker starts
+    output = _run("""
+        import scac_game
+        scac_game.init_database()
+        scac_game._ensure_write_worker(scac_game._write_behind_state())
+        assert scac_game.flush_writes(timeout=10)
+        print(scac_game.get_connection().execute("SELECT COUNT(*) FROM scores").fetchone()[0])
+        print(scac_game.get_write_queue_stats()['replayed'])
+    """, db_path)
+    assert output.split() == ['3', '3']
+    assert not os.path.exists(f"{db_path}.pending.jsonl")